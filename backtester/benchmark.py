@@ -0,0 +1,70 @@
+import os
+import copy
+import tempfile
+import argparse
+import tracemalloc
+
+from storage.kline_store import KlineStore
+from time_operators.time_operator import TimeOperator
+from simulator.exchange import SimulatedExchange
+from simulator.server import SimulatorServer
+from simulator.benchmark import random_walk_columns
+from backtester.ta_indicators.ema import EMA
+
+
+def peak_memory(indicator, ranges: dict) -> float:
+    """
+    Peak traced memory in MB of a double EMA loop sweep
+    """
+    tracemalloc.start()
+    indicator.all_combinantion(**ranges)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def benchmark(candles=100000, symbols=2, combinations=4):
+    """
+    Peak memory of a double EMA sweep over 1m candles of the local simulator, the strategies reading the prepared
+    data in place (Backtester.strategy_data) and with a deep copy of it per combination as before
+    """
+    time_operator = TimeOperator()
+    interval_ms = time_operator.interval_to_milliseconds("1m")
+    start = time_operator.generate_current_timestamp() - candles * interval_ms
+    start -= start % interval_ms
+
+    # The backtester's client caches klines in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="backtester-"))
+    store = KlineStore("./simulated")
+    names = [f"SYM{i}USDT" for i in range(symbols)]
+    for i, symbol in enumerate(names):
+        columns = random_walk_columns(start, interval_ms, candles, seed=i)
+        store.write(symbol, "1m", columns, start, int(columns["open_time"][-1]))
+
+    server = SimulatorServer(SimulatedExchange(store, names, "1m"), port=0)
+    server.start(replay=False)
+    try:
+        indicator = EMA("key", "secret", True, "1m", start, names, "double_ema", -0.00085,
+                        base_url=server.base_url, wss_base_url=server.wss_base_url)
+    finally:
+        server.stop()
+
+    ranges = {"EMA_S_range": range(5, 5 + combinations), "EMA_L_range": range(50, 51)}
+    shared = peak_memory(indicator, ranges)
+
+    backtester = indicator.backtester
+    backtester.strategy_data = lambda: copy.deepcopy(backtester.data)
+    copied = peak_memory(indicator, ranges)
+
+    print(f"double EMA sweep, {symbols} x {candles} candles, {combinations} combinations: "
+          f"peak {shared:.0f} MB with the shared data, {copied:.0f} MB with a copy per combination")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak memory of a backtest sweep against the local simulator")
+    parser.add_argument("--candles", type=int, default=100000)
+    parser.add_argument("--symbols", type=int, default=2)
+    parser.add_argument("--combinations", type=int, default=4)
+    args = parser.parse_args()
+
+    benchmark(args.candles, args.symbols, args.combinations)
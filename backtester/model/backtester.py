@@ -1,5 +1,7 @@
 from time_operators.time_operator import TimeOperator
 from connectors.binanceConnect import BinanceClient
+from backtester.model.panel import MarketPanel
+from backtester.model.shared_data import SharedMarketData
 
 import pandas as pd
 import numpy as np
@@ -12,6 +14,9 @@ plt.style.use("seaborn")
 class Backtester(TimeOperator):
     """ Class for the backtesting simple trading strategies """
 
+    # Days of a CAGR / annualization period
+    PERIOD_DAYS = {"month": 30.44, "year": 365.25, "day": 1}
+
     def __init__(self,
                  key: str,
                  secret: str,
@@ -20,7 +25,10 @@ class Backtester(TimeOperator):
                  start: int,
                  symbols: list,
                  tc: float,
-                 period_cagr="month"):
+                 period_cagr="month",
+                 workers=4,
+                 base_url=None,
+                 wss_base_url=None):
         self.symbols = symbols
         self.api_key = key
         self.api_secret = secret
@@ -31,34 +39,68 @@ class Backtester(TimeOperator):
         self.available_intervals = ["1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d", "3d",
                                     "1w", "1M"]
         self.tc = tc
+        self.workers = workers
         self.results = {}
         self.time = TimeOperator()
-        self.client = BinanceClient(self.api_key, self.api_secret, self.use_testnet)
+        self.client = BinanceClient(self.api_key, self.api_secret, self.use_testnet, base_url=base_url,
+                                    wss_base_url=wss_base_url)
         self.performance_data = pd.DataFrame
         self.data = self.prepare_data()
+        # All the symbols aligned in (time x symbols) arrays
+        self.panel = MarketPanel.from_frames(self.data)
+        self.results_panel = None
+        # Data and panel published in shared memory, see share_data
+        self.shared_data = None
         self.cstrategy_data = []
         self.tp = self.calculate_tp(self.period_cagr)
 
+    def __getstate__(self):
+        """
+        Sweep worker processes get the backtester without the client, its sessions and locks can't be pickled, and
+        without the last results. Once the data is shared (share_data) only the shared memory handle is pickled instead
+        of the data and the panel.
+        """
+        state = self.__dict__.copy()
+        state["client"] = None
+        state["results"] = {}
+        state["results_panel"] = None
+        if self.shared_data is not None:
+            state["data"] = None
+            state["panel"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.shared_data is not None:
+            self.data = self.shared_data.frames()
+            self.panel = self.shared_data.panel()
+
+    def share_data(self) -> SharedMarketData:
+        """
+        Publishes the prepared data and panel once in shared memory, unpickled copies of the backtester read them in
+        place (read-only) instead of receiving a copy
+        """
+        if self.shared_data is None:
+            self.shared_data = SharedMarketData.publish(self.data, self.panel)
+        return self.shared_data
+
+    def release_data(self):
+        """
+        Removes the shared memory block of share_data
+        """
+        if self.shared_data is not None:
+            self.shared_data.release()
+            self.shared_data = None
+
     def calculate_tp(self, period="month") -> dict:
         """Calculating trading periods"""
 
-        tp = {}
-        if period == "month":
-            for pair, data in self.data.items():
-                counts = data.Close.count()
-                tp[pair] = counts / (data.index[-1] - data.index[0]).days / 30.44
-        elif period == "year":
-            for pair, data in self.data.items():
-                counts = data.Close.count()
-                tp[pair] = counts / (data.index[-1] - data.index[0]).days / 365.25
-        elif period == "day":
-            for pair, data in self.data.items():
-                counts = data.Close.count()
-                tp[pair] = counts / (data.index[-1] - data.index[0]).days / 1
-        else:
+        if period not in self.PERIOD_DAYS:
             print("Wrong period chosen!")
+            return {}
 
-        return tp
+        tp = self.panel.count() / self.panel.days() / self.PERIOD_DAYS[period]
+        return dict(zip(self.panel.symbols, tp))
 
     def dict_to_json(self, data: dict):
         return json.dumps(data)
@@ -73,7 +115,8 @@ class Backtester(TimeOperator):
             raw = self.client.get_historicals(symbol=symbol,
                                               period=period,
                                               start=self.start,
-                                              end=self.time.generate_current_timestamp())
+                                              end=self.time.generate_current_timestamp(),
+                                              workers=self.workers)
             return raw
 
     def prepare_data(self, drop_columns=False) -> dict:
@@ -93,32 +136,102 @@ class Backtester(TimeOperator):
 
         return self.data.copy()
 
+    def strategy_data(self) -> dict:
+        """
+        Returns a DataFrame per symbol for a strategy to add its indicator and position columns to. Its prepared data
+        columns are read-only views of self.data: they aren't copied and the strategy can't change them.
+        """
+        frames = {}
+        for symbol, data in self.data.items():
+            columns = {}
+            for column in data.columns:
+                values = data[column].to_numpy().view()
+                values.flags.writeable = False
+                columns[column] = values
+            frames[symbol] = pd.DataFrame(columns, index=data.index, copy=False)
+
+        return frames
+
+    def backtest_panel(self, to_backtest_data: dict) -> MarketPanel:
+        """
+        Strategy returns and trades of all the symbols at once. Rows are kept like DataFrame.dropna() of every
+        symbol would keep them, the panel mask marks them.
+        """
+        panel = MarketPanel.from_frames(to_backtest_data, columns=["returns", "position"])
+        position = panel["position"]
+        previous_position = panel.shift(position)
+
+        trades = np.abs(position - previous_position)
+        trades = np.where(np.isnan(trades) & panel.mask, 0.0, trades)
+        strategy = previous_position * panel["returns"] + trades * self.tc
+
+        kept = ~np.isnan(strategy)
+        for i, symbol in enumerate(panel.symbols):
+            complete = to_backtest_data[symbol].notna().all(axis=1).to_numpy()
+            kept[panel.rows[symbol][~complete], i] = False
+
+        panel.mask = kept
+        panel["returns"] = np.where(kept, panel["returns"], np.nan)
+        panel["strategy"] = np.where(kept, strategy, np.nan)
+        panel["trades"] = np.where(kept, trades, np.nan)
+
+        return panel
+
+    def panel_to_frames(self, panel: MarketPanel, frames: dict, fields: list, columns=None) -> dict:
+        """
+        Returns the kept rows of every symbol's DataFrame with panel fields added as columns
+
+        :param columns: DataFrame columns to keep, by default all of them
+        """
+        results = {}
+        for i, symbol in enumerate(panel.symbols):
+            rows = panel.rows[symbol]
+            keep = panel.mask[rows, i]
+            frame = frames[symbol] if columns is None else frames[symbol][list(columns)]
+            data = frame.take(np.flatnonzero(keep))
+            for field in fields:
+                data[field] = panel[field][rows[keep], i]
+            results[symbol] = data
+
+        return results
+
     def backtest(self, to_backtest_data):
         """ Calculate backtest scores """
 
-        backtested = {}
-
-        for pairs, data in to_backtest_data.items():
-            data.copy().dropna(inplace=True)
-            data["strategy"] = data["position"].shift(1) * data["returns"]
-            data["trades"] = data.position.diff().fillna(0).abs()
-            data.strategy = data.strategy + data.trades * self.tc
-            data.dropna(inplace=True)
-
-            backtested[pairs] = data
-
-        return backtested
-
-    def test_strategy(self, test_data):
-        results_data = {}
-        backtested_data = self.backtest(test_data)
-        for pairs, data in backtested_data.items():
-            data["creturns"] = data["returns"].cumsum().apply(np.exp)
-            data["cstrategy"] = data["strategy"].cumsum().apply(np.exp)
-            data.dropna(inplace=True)
-
-            results_data[pairs] = data
-        return results_data
+        panel = self.backtest_panel(to_backtest_data)
+        return self.panel_to_frames(panel, to_backtest_data, ["strategy", "trades"])
+
+    def test_strategy(self, test_data, columns=None):
+        """
+        Backtests the positions of every symbol
+
+        :param columns: columns of test_data to keep in the results besides strategy, trades, creturns and cstrategy,
+                        by default all of them. Parameter sweeps keep none, they only read the final returns.
+        """
+        panel = self.backtest_panel(test_data)
+        panel["creturns"] = np.where(panel.mask, np.exp(np.nancumsum(panel["returns"], axis=0)), np.nan)
+        panel["cstrategy"] = np.where(panel.mask, np.exp(np.nancumsum(panel["strategy"], axis=0)), np.nan)
+
+        self.results_panel = panel
+        return self.panel_to_frames(panel, test_data, ["strategy", "trades", "creturns", "cstrategy"], columns)
+
+    def performance_metrics(self, results: dict) -> dict:
+        """
+        Returns performance metrics of all the backtested symbols at once, metric name -> array of symbol values
+        """
+        panel = MarketPanel.from_frames(results, columns=["returns", "strategy"])
+        strategy = panel["strategy"]
+        tp = np.array([self.tp.get(symbol, np.nan) for symbol in panel.symbols])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            strategy_multiple = np.exp(np.nansum(strategy, axis=0))
+            periods = panel.days() / self.PERIOD_DAYS.get(self.period_cagr, np.nan)
+            return {"symbols": panel.symbols,
+                    "strategy_multiple": strategy_multiple,
+                    "bh_multiple": np.exp(np.nansum(panel["returns"], axis=0)),
+                    "cagr": strategy_multiple ** (1 / periods) - 1,
+                    "ann_mean": np.nanmean(strategy, axis=0) * tp,
+                    "ann_std": np.nanstd(strategy, axis=0, ddof=1) * np.sqrt(tp)}
 
     def plot_performance(self):
         if self.results is not None:
@@ -130,54 +243,33 @@ class Backtester(TimeOperator):
 
     def measure_performance(self, cagr=True):
         """ Calculates and prints various Performance Metrics."""
-        performance_df = pd.DataFrame(columns=["Asset",
-                                               "Multiple_Strategy",
-                                               "Multiple_Hodl",
-                                               "Percent_of_increase_Strategy",
-                                               "Percent_of_increase_Hodl",
-                                               "Out_Underperformed",
-                                               "CAGR",
-                                               "Percent_ANN_mean",
-                                               "Percent_ANN_std"])
-        columns = list(performance_df)
-        pf_data = []
-
-        for pairs, result in self.results.items():
-            data = result
-            strategy_multiple = round(self.calculate_multiple(data.strategy), 9)
-            strategy_multiple_percentage = round((strategy_multiple - 1) * 100, 3)
-            bh_multiple = round(self.calculate_multiple(data.returns), 9)
-            bh_multiple_percentage = round((bh_multiple - 1) * 100, 2)
-            outperf = round(strategy_multiple - bh_multiple, 9)
-            cagr = round(self.calculate_cagr(data.strategy), 9)
-            ann_mean = round(round(self.calculate_annualized_mean(data.strategy, pairs), 8) * 100, 9)
-            ann_std = round(round(self.calculate_annualized_std(data.strategy, pairs), 8) * 100, 9)
-
-            values = [pairs,
-                      strategy_multiple,
-                      bh_multiple,
-                      strategy_multiple_percentage,
-                      bh_multiple_percentage,
-                      outperf,
-                      cagr,
-                      ann_mean,
-                      ann_std]
-            zipped = zip(columns, values)
-            data_dict = dict(zipped)
-            pf_data.append(data_dict)
-
-        self.performance_data = performance_df.append(pf_data, True)
+        metrics = self.performance_metrics(self.results)
+
+        strategy_multiple = np.round(metrics["strategy_multiple"], 9)
+        bh_multiple = np.round(metrics["bh_multiple"], 9)
+
+        self.performance_data = pd.DataFrame({
+            "Asset": metrics["symbols"],
+            "Multiple_Strategy": strategy_multiple,
+            "Multiple_Hodl": bh_multiple,
+            "Percent_of_increase_Strategy": np.round((strategy_multiple - 1) * 100, 3),
+            "Percent_of_increase_Hodl": np.round((bh_multiple - 1) * 100, 2),
+            "Out_Underperformed": np.round(strategy_multiple - bh_multiple, 9),
+            "CAGR": np.round(metrics["cagr"], 9),
+            "Percent_ANN_mean": np.round(np.round(metrics["ann_mean"], 8) * 100, 9),
+            "Percent_ANN_std": np.round(np.round(metrics["ann_std"], 8) * 100, 9)})
         return self.dataframe_to_json(self.performance_data)
 
     def print_performance(self):
-        for pairs, result in self.results.items():
-            data = result
-            strategy_multiple = round(self.calculate_multiple(data.strategy), 9)
-            bh_multiple = round(self.calculate_multiple(data.returns), 9)
+        metrics = self.performance_metrics(self.results)
+
+        for i, pairs in enumerate(metrics["symbols"]):
+            strategy_multiple = round(metrics["strategy_multiple"][i], 9)
+            bh_multiple = round(metrics["bh_multiple"][i], 9)
             outperf = round(strategy_multiple - bh_multiple, 9)
-            cagr = round(self.calculate_cagr(data.strategy), 4)
-            ann_mean = round(self.calculate_annualized_mean(data.strategy, pairs), 9)
-            ann_std = round(self.calculate_annualized_std(data.strategy, pairs), 9)
+            cagr = round(metrics["cagr"][i], 4)
+            ann_mean = round(metrics["ann_mean"][i], 9)
+            ann_std = round(metrics["ann_std"][i], 9)
 
             print(100 * "=")
             print("SIMPLE PRICE & VOLUME STRATEGY | INSTRUMENT :       {} ".format(pairs, 5))
@@ -197,23 +289,3 @@ class Backtester(TimeOperator):
             print("Annualized Std (RISK POSITION):                     {}".format(round(ann_std * 100, 6)))
             print(100 * "=")
             print("\n")
-
-    def calculate_multiple(self, series):
-        return np.exp(series.sum())
-
-    def calculate_cagr(self, series):
-        try:
-            if self.period_cagr == "year":
-                return np.exp(series.sum()) ** (1 / ((series.index[-1] - series.index[0]).days / 365.25)) - 1
-            elif self.period_cagr == "month":
-                return np.exp(series.sum()) ** (1 / ((series.index[-1] - series.index[0]).days / 30.44)) - 1
-            elif self.period_cagr == "day":
-                return np.exp(series.sum()) ** (1 / ((series.index[-1] - series.index[0]).days / 1)) - 1
-        except Exception as e:
-            print(e)
-
-    def calculate_annualized_mean(self, series, pair):
-        return series.mean() * self.tp[pair]
-
-    def calculate_annualized_std(self, series, pair):
-        return series.std() * np.sqrt(self.tp[pair])
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+import pickle
+import copy
+import os
+
+# Indicator backtester of a worker process, set once by the pool initializer
+_indicator = None
+
+
+def init_worker(payload: bytes):
+    global _indicator
+    _indicator = pickle.loads(payload)
+
+
+def run_chunk(method: str, chunk: int, combinations: list, kwargs: dict):
+    """
+    Backtests a chunk of combinations in a worker process
+
+    :return: compact chunk record: (chunk, combination numbers, symbol numbers, creturns, cstrategy, failures) where
+             the combination numbers are positions in the chunk and failures are (combination, error) tuples
+    """
+    symbols = list(_indicator.backtester.data)
+    numbers, symbol_numbers, creturns, cstrategy, failures = [], [], [], [], []
+    for number, combination in enumerate(combinations):
+        try:
+            getattr(_indicator, method)(*combination, **kwargs)
+            backtested = _indicator.run_backtest(columns=[])
+            for pair, result in backtested.items():
+                numbers.append(number)
+                symbol_numbers.append(symbols.index(pair))
+                creturns.append(result["creturns"].iloc[-1])
+                cstrategy.append(result["cstrategy"].iloc[-1])
+        except Exception as e:
+            failures.append((combination, repr(e)))
+
+    return (chunk,
+            np.array(numbers, dtype=np.int32),
+            np.array(symbol_numbers, dtype=np.int16),
+            np.array(creturns, dtype=np.float64),
+            np.array(cstrategy, dtype=np.float64),
+            failures)
+
+
+class SweepExecutor:
+    """
+    Runs the per-combination backtests of a parameter sweep in a process pool. The combinations are sharded into
+    chunks, every worker receives the indicator once, attaches to its data published in shared memory
+    (Backtester.share_data) and sends back compact arrays per chunk.
+    """
+
+    def __init__(self, indicator, method: str, workers=None, chunk_size=None):
+        """
+        :param indicator: backtesting indicator instance, e.g. EMA, with the strategy method and run_backtest
+        :param method: name of the strategy method called with the parameters of every combination
+        :param workers: number of processes, by default the number of CPUs
+        :param chunk_size: combinations per chunk, by default about 4 chunks per worker
+        """
+        self.indicator = indicator
+        self.method = method
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.failures = []
+
+    def payload(self) -> bytes:
+        """
+        Returns the pickled indicator the workers start from, without results of earlier backtests (its dict and
+        DataFrame attributes). The pickled backtester holds only the shared memory handle of the data.
+        """
+        indicator = copy.copy(self.indicator)
+        for name, value in vars(indicator).items():
+            if isinstance(value, (dict, pd.DataFrame)):
+                setattr(indicator, name, type(value)())
+        return pickle.dumps(indicator)
+
+    def chunks(self, combinations: list) -> list:
+        size = self.chunk_size or max(1, -(-len(combinations) // (self.workers * 4)))
+        return [combinations[offset:offset + size] for offset in range(0, len(combinations), size)]
+
+    def run(self, combinations: list, columns: list, constants=None, logs=True, **kwargs) -> pd.DataFrame:
+        """
+        Backtests every combination and returns Asset, the parameter columns, the constant columns, creturns and
+        cstrategy of every backtested symbol, in the order of the in-process loop
+
+        :param columns: names of the parameter columns, in the order of the combination tuples
+        :param constants: column name -> value of parameters that are the same for all the combinations
+        :param kwargs: keyword arguments of the strategy method
+        """
+        combinations = [tuple(combination) for combination in combinations]
+        chunks = self.chunks(combinations)
+        symbols = list(self.indicator.backtester.data)
+        records = dict()
+        self.failures = []
+
+        # The workers attach to the data in shared memory instead of receiving a copy of it each. The indicator is
+        # pickled explicitly so that also forked workers unpickle it with the shared memory handle.
+        backtester = self.indicator.backtester
+        published = backtester.shared_data is None
+        backtester.share_data()
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                     initargs=(self.payload(),)) as pool:
+                futures = {pool.submit(run_chunk, self.method, i, chunk, kwargs): i for i, chunk in enumerate(chunks)}
+                progress = tqdm(total=len(combinations), disable=not logs)
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        chunk, numbers, symbol_numbers, creturns, cstrategy, failures = future.result()
+                        records[chunk] = (numbers, symbol_numbers, creturns, cstrategy)
+                    except Exception as e:
+                        failures = [(combination, repr(e)) for combination in chunks[i]]
+
+                    self.failures.extend(failures)
+                    if failures and logs:
+                        print(f"Chunk {i}: {len(failures)} of {len(chunks[i])} combinations failed, "
+                              f"first {failures[0][0]}: {failures[0][1]}")
+                    progress.update(len(chunks[i]))
+                progress.close()
+        finally:
+            if published:
+                backtester.release_data()
+
+        rows = {name: [] for name in ["Asset"] + list(columns) + ["creturns", "cstrategy"]}
+        for i, chunk in enumerate(chunks):
+            if i in records:
+                numbers, symbol_numbers, creturns, cstrategy = records[i]
+                rows["Asset"].extend(symbols[number] for number in symbol_numbers)
+                for j, name in enumerate(columns):
+                    rows[name].extend(chunk[number][j] for number in numbers)
+                rows["creturns"].extend(creturns)
+                rows["cstrategy"].extend(cstrategy)
+
+        frame = pd.DataFrame(rows)
+        for j, (name, value) in enumerate((constants or dict()).items()):
+            frame.insert(1 + len(columns) + j, name, value)
+        return frame
@@ -0,0 +1,41 @@
+from itertools import product
+
+from backtester.model.sweep import ParameterSweep
+from backtester.model.executor import SweepExecutor
+
+
+class SweepIndicator:
+    """
+    Base of the indicator backtests of backtester/ta_indicators: runs the combinations of all_combinantion on
+    ParameterSweep (vectorized) or SweepExecutor (worker processes) instead of the indicator's own loop.
+    Indicators set self.backtester and self.performance_data and implement calculate_performance.
+    """
+
+    def run_sweep(self, strategy: str, ranges: list, columns: list, vectorized=False, workers=None,
+                  sweep_options=None, constants=None, **parameters) -> bool:
+        """
+        Backtest every combination of the ranges and keep the best ones (calculate_performance). Returns False when
+        neither the vectorized sweep nor the workers are chosen, the caller then runs its loop.
+
+        :param strategy: ParameterSweep strategy and name of the strategy method called by the workers
+        :param columns: parameter columns of the ranges in self.performance_data
+        :param sweep_options: ParameterSweep keywords, e.g. technical, shifting, warmup or parameters
+        :param constants: column name -> value of parameters that are the same for all the combinations
+        :param parameters: keywords of the strategy method that are the same for all the combinations
+        """
+        if vectorized and workers:
+            raise ValueError("Choose either the vectorized sweep or the worker processes.")
+        if vectorized and (parameters.get("fixed_stop_loss") or parameters.get("trailing_stop_loss")):
+            raise ValueError("The vectorized sweep backtests only the ATR stop loss, run it with vectorized=False.")
+
+        if vectorized:
+            sweep = ParameterSweep(self.backtester, strategy, **(sweep_options or dict()))
+            self.performance_data = sweep.run(*ranges, constants=constants)
+        elif workers:
+            executor = SweepExecutor(self, strategy, workers)
+            self.performance_data = executor.run(list(product(*ranges)), columns, constants, **parameters)
+        else:
+            return False
+
+        self.calculate_performance()
+        return True
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+class MarketPanel:
+    """
+    Per-symbol DataFrames aligned on one time index: every field is a contiguous (time x symbols) float64 array
+    and a mask marks the rows a symbol has data in. Calculations over all the symbols are single array expressions.
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, symbols: list, fields: dict, mask=None, rows=None):
+        """
+        :param fields: field name -> (time x symbols) array, NaN where a symbol has no value
+        :param mask: (time x symbols) bool array of rows with data, by default rows without NaN in every field
+        :param rows: symbol -> positions of its DataFrame rows in the index, see from_frames
+        """
+        self.index = index
+        self.symbols = list(symbols)
+        self.fields = {name: np.ascontiguousarray(values, dtype=np.float64) for name, values in fields.items()}
+        if mask is None:
+            mask = np.ones((len(index), len(self.symbols)), dtype=bool)
+            for values in self.fields.values():
+                mask &= ~np.isnan(values)
+        self.mask = mask
+        self.rows = rows if rows is not None else dict()
+
+    @classmethod
+    def from_frames(cls, frames: dict, columns=None):
+        """
+        Builds a panel of a {symbol: DataFrame} dict, the index is the union of all the DataFrame indexes. A row has to
+        be in a DataFrame once, a duplicated index raises ValueError.
+
+        :param columns: columns to take, by default the numeric columns all the DataFrames have
+        """
+        symbols = list(frames)
+        for symbol, frame in frames.items():
+            if not frame.index.is_unique:
+                raise ValueError(f"The index of {symbol} has duplicated rows.")
+        if columns is None:
+            columns = None
+            for frame in frames.values():
+                numeric = [column for column in frame.columns if pd.api.types.is_numeric_dtype(frame[column])]
+                columns = numeric if columns is None else [column for column in columns if column in numeric]
+            columns = columns or []
+
+        index = pd.DatetimeIndex([])
+        for frame in frames.values():
+            index = index.union(frame.index)
+
+        fields = {column: np.full((len(index), len(symbols)), np.nan) for column in columns}
+        rows = dict()
+        for i, symbol in enumerate(symbols):
+            frame = frames[symbol]
+            rows[symbol] = index.get_indexer(frame.index)
+            for column in columns:
+                fields[column][rows[symbol], i] = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        return cls(index, symbols, fields, rows=rows)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.fields[field]
+
+    def __setitem__(self, field: str, values: np.ndarray):
+        self.fields[field] = np.ascontiguousarray(values, dtype=np.float64)
+
+    def column(self, field: str, symbol: str) -> np.ndarray:
+        return self.fields[field][:, self.symbols.index(symbol)]
+
+    def to_frame(self, field: str) -> pd.DataFrame:
+        """
+        Returns a field as a (time x symbols) DataFrame
+        """
+        return pd.DataFrame(self.fields[field], index=self.index, columns=self.symbols)
+
+    # ROW OPERATIONS ---------------------------------------------------------------------------------------------------
+
+    def previous_rows(self) -> np.ndarray:
+        """
+        Returns the row of the previous valid value of every symbol at every row, -1 before the first one
+        """
+        rows = np.where(self.mask, np.arange(len(self.index))[:, None], -1)
+        last = np.maximum.accumulate(rows, axis=0)
+        previous = np.full_like(last, -1)
+        previous[1:] = last[:-1]
+        return previous
+
+    def shift(self, values: np.ndarray) -> np.ndarray:
+        """
+        Shifts values of every symbol by one of its own rows (like DataFrame.shift(1) before the alignment)
+        """
+        previous = self.previous_rows()
+        shifted = values[np.maximum(previous, 0), np.arange(values.shape[1])]
+        return np.where((previous >= 0) & self.mask, shifted, np.nan)
+
+    def log_returns(self, field="Close") -> np.ndarray:
+        values = self.fields[field]
+        return np.where(self.mask, np.log(values / self.shift(values)), np.nan)
+
+    # SUMMARIES --------------------------------------------------------------------------------------------------------
+
+    def count(self) -> np.ndarray:
+        return self.mask.sum(axis=0)
+
+    def first_valid(self) -> pd.DatetimeIndex:
+        return self.index[self.mask.argmax(axis=0)]
+
+    def last_valid(self) -> pd.DatetimeIndex:
+        return self.index[len(self.index) - 1 - self.mask[::-1].argmax(axis=0)]
+
+    def days(self) -> np.ndarray:
+        """
+        Whole days between the first and the last row of every symbol
+        """
+        return np.asarray((self.last_valid() - self.first_valid()).days, dtype=np.float64)
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+from backtester.model.panel import MarketPanel
+
+
+class SharedMarketData:
+    """
+    Prepared market data of a Backtester (symbol DataFrames and their panel) published once in a named shared memory
+    block. A pickled instance is only the block name and the array layout: unpickling it in another process attaches
+    to the block and the DataFrames / panel read the arrays in place, read-only and without a copy.
+    """
+
+    # Byte alignment of every array in the block
+    ALIGNMENT = 64
+
+    def __init__(self, memory: shared_memory.SharedMemory, layout: dict, owner=False):
+        """
+        :param layout: frames: symbol -> index and column array specs, panel: index, field, mask and row array specs.
+                       An array spec is a (byte offset, shape, dtype) tuple.
+        :param owner: the instance published the block and unlinks it
+        """
+        self.memory = memory
+        self.layout = layout
+        self.owner = owner
+
+    @classmethod
+    def publish(cls, frames: dict, panel: MarketPanel = None):
+        """
+        Copies the DataFrames (a DatetimeIndex and numeric or bool columns) and the panel into a new shared memory block
+        """
+        arrays = []
+        size = 0
+
+        def add(values) -> tuple:
+            nonlocal size
+            values = np.ascontiguousarray(values)
+            if values.dtype == object:
+                raise ValueError("Only numeric and bool arrays can be shared")
+            offset = size
+            size += -(-values.nbytes // cls.ALIGNMENT) * cls.ALIGNMENT
+            arrays.append((offset, values))
+            return offset, values.shape, values.dtype.str
+
+        layout = {"frames": dict(), "panel": None}
+        for symbol, frame in frames.items():
+            layout["frames"][symbol] = {"index": add(frame.index.asi8),
+                                        "index_name": frame.index.name,
+                                        "tz": str(frame.index.tz) if frame.index.tz is not None else None,
+                                        "columns": {column: add(frame[column].to_numpy()) for column in frame.columns}}
+        if panel is not None:
+            layout["panel"] = {"index": add(panel.index.asi8),
+                               "tz": str(panel.index.tz) if panel.index.tz is not None else None,
+                               "symbols": list(panel.symbols),
+                               "fields": {name: add(values) for name, values in panel.fields.items()},
+                               "mask": add(panel.mask),
+                               "rows": {symbol: add(rows) for symbol, rows in panel.rows.items()}}
+
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for offset, values in arrays:
+            np.ndarray(values.shape, dtype=values.dtype, buffer=memory.buf, offset=offset)[...] = values
+
+        return cls(memory, layout, owner=True)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def array(self, spec: tuple) -> np.ndarray:
+        """
+        Returns a read-only view of an array of the block
+        """
+        offset, shape, dtype = spec
+        values = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.memory.buf, offset=offset)
+        values.flags.writeable = False
+        return values
+
+    @staticmethod
+    def to_index(values: np.ndarray, name, tz) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(values.view("datetime64[ns]"), name=name)
+        return index.tz_localize("UTC").tz_convert(tz) if tz is not None else index
+
+    def frames(self) -> dict:
+        """
+        Returns the symbol DataFrames backed by the shared arrays
+        """
+        frames = dict()
+        for symbol, spec in self.layout["frames"].items():
+            index = self.to_index(self.array(spec["index"]), spec["index_name"], spec["tz"])
+            columns = {column: self.array(column_spec) for column, column_spec in spec["columns"].items()}
+            frames[symbol] = pd.DataFrame(columns, index=index, copy=False)
+        return frames
+
+    def panel(self):
+        """
+        Returns the MarketPanel backed by the shared arrays, None when no panel was published
+        """
+        spec = self.layout["panel"]
+        if spec is None:
+            return None
+        return MarketPanel(self.to_index(self.array(spec["index"]), None, spec["tz"]),
+                           spec["symbols"],
+                           {name: self.array(field) for name, field in spec["fields"].items()},
+                           mask=self.array(spec["mask"]),
+                           rows={symbol: self.array(rows) for symbol, rows in spec["rows"].items()})
+
+    def release(self):
+        """
+        Closes the block and removes it if this instance published it
+        """
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __getstate__(self):
+        return {"name": self.memory.name, "layout": self.layout}
+
+    def __setstate__(self, state):
+        self.memory = shared_memory.SharedMemory(name=state["name"])
+        self.layout = state["layout"]
+        self.owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
@@ -0,0 +1,476 @@
+import numpy as np
+import pandas as pd
+from itertools import product
+
+
+def ema_rows(matrix: np.ndarray, spans) -> np.ndarray:
+    """
+    Returns the exponential moving average (adjust=False) of every row of a matrix with the span of the row, all the
+    rows at once: y[t] = decay * y[t - 1] + alpha * x[t] is summed up by doubling the covered rows every step.
+    Leading NaNs of a row stay NaN and its average starts at its first value, like Series.ewm does. Rows must not
+    have NaNs after their first value.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    rows, n = matrix.shape
+    alpha = 2 / (np.asarray(spans, dtype=np.float64) + 1)
+    valid = ~np.isnan(matrix)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), n)
+
+    averages = np.where(valid, alpha[:, None] * matrix, 0.0)
+    started = first < n
+    averages[started, first[started]] = matrix[started, first[started]]
+
+    factor = 1 - alpha
+    step = 1
+    while step < n:
+        averages[:, step:] = averages[:, step:] + factor[:, None] * averages[:, :-step]
+        factor = factor * factor
+        step *= 2
+
+    averages[np.arange(n)[None, :] < first[:, None]] = np.nan
+    return averages
+
+
+def ema_matrix(values: np.ndarray, spans) -> np.ndarray:
+    """
+    Returns a (spans x time) matrix of exponential moving averages (adjust=False) of a series
+    """
+    return ema_rows(np.broadcast_to(values, (len(spans), len(values))), spans)
+
+
+def rolling_mean_rows(matrix: np.ndarray, windows) -> np.ndarray:
+    """
+    Returns the rolling mean of every row of a matrix with the window of the row, NaN before a window is full of
+    values. Rows must not have NaNs after their first value.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    rows, n = matrix.shape
+    windows = np.asarray(windows, dtype=np.int64)
+    if (windows < 1).any():
+        raise ValueError("Windows must be at least 1.")
+    valid = ~np.isnan(matrix)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), n)
+
+    # Sums of the differences to the first value of a row keep the cumulative sums small
+    reference = matrix[np.arange(rows), np.minimum(first, n - 1)]
+    sums = np.zeros((rows, n + 1))
+    sums[:, 1:] = np.cumsum(np.where(valid, matrix - reference[:, None], 0.0), axis=1)
+
+    start = np.arange(n)[None, :] - windows[:, None] + 1
+    means = (sums[:, 1:] - np.take_along_axis(sums, np.maximum(start, 0), axis=1)) / windows[:, None]
+    means += reference[:, None]
+    means[start < first[:, None]] = np.nan
+    return means
+
+
+def sma_matrix(values: np.ndarray, windows) -> np.ndarray:
+    """
+    Returns a (windows x time) matrix of simple moving averages of a series, NaN before a window is full
+    """
+    return rolling_mean_rows(np.broadcast_to(values, (len(windows), len(values))), windows)
+
+
+def rolling_extreme_matrix(values: np.ndarray, windows, maximum=True) -> np.ndarray:
+    """
+    Returns a (windows x time) matrix of rolling maximums (or minimums) of a series, NaN before a window is full.
+    Level j of a sparse table holds the extremes of 2^j values, a window is covered by two overlapping blocks.
+    """
+    windows = np.asarray(windows, dtype=np.int64)
+    if (windows < 1).any():
+        raise ValueError("Windows must be at least 1.")
+    extreme = np.maximum if maximum else np.minimum
+    n = len(values)
+
+    table = [np.asarray(values, dtype=np.float64)]
+    while 2 ** len(table) <= windows.max():
+        size = 2 ** (len(table) - 1)
+        level = table[-1].copy()
+        level[size:] = extreme(table[-1][size:], table[-1][:-size])
+        table.append(level)
+    table = np.vstack(table)
+
+    levels = np.floor(np.log2(windows)).astype(np.int64)
+    t = np.arange(n)[None, :]
+    blocks = table[levels]
+    second = np.take_along_axis(blocks, np.clip(t - windows[:, None] + 2 ** levels[:, None], 0, n - 1), axis=1)
+    extremes = extreme(blocks, second)
+    extremes[t < windows[:, None] - 1] = np.nan
+    return extremes
+
+
+def rsi_matrix(close: np.ndarray, windows) -> np.ndarray:
+    """
+    Returns a (windows x time) matrix of the RSI of the strategies: EMAs of the up and down percent changes
+    """
+    change = np.full(len(close), np.nan)
+    change[1:] = close[1:] / close[:-1] - 1
+    up = np.where(change > 0, change, 0.0)
+    down = np.where(change < 0, -change, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = ema_matrix(up, windows) / ema_matrix(down, windows)
+        return 100 - (100 / (rs + 1))
+
+
+def shift_columns(matrix: np.ndarray, shifts, first=None) -> np.ndarray:
+    """
+    Shifts every row of a matrix by its number of columns (DataFrame.shift), NaN where the value would come from
+    before the first column of the row or from past the last column
+
+    :param first: first column of every row, the row of a DataFrame that dropped the columns before it
+    """
+    rows, n = matrix.shape
+    shifts = np.asarray(shifts, dtype=np.int64)
+    first = np.zeros(rows, dtype=np.int64) if first is None else first
+    source = np.arange(n)[None, :] - shifts[:, None]
+    valid = (source >= first[:, None]) & (source < n)
+    shifted = np.take_along_axis(matrix, np.clip(source, 0, n - 1), axis=1)
+    return np.where(valid, shifted, np.nan)
+
+
+def shift_rows(matrix: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """
+    Shifts every row of a matrix by one column, NaN up to the first column a row is evaluated from
+    """
+    return shift_columns(matrix, np.ones(len(matrix), dtype=np.int64), first)
+
+
+def from_column(complete: np.ndarray, first: np.ndarray, last=None) -> np.ndarray:
+    """
+    Returns the complete columns of every row from its first column on (and before its last one)
+    """
+    n = complete.shape[1]
+    columns = np.arange(n)[None, :]
+    last = np.full(len(first), n) if last is None else last
+    return complete & (columns >= first[:, None]) & (columns < last[:, None])
+
+
+class ParameterSweep:
+    """
+    Evaluates blocks of parameter combinations of a strategy at once: the indicators of every parameter value are
+    computed once per symbol, a block of combinations becomes a (combinations x time) position matrix and is reduced
+    to the final creturns / cstrategy of the per-combination backtests.
+
+    The rows the DataFrame strategies drop (indicator warm-ups, the leading and lagging Ichimoku spans, the shifted
+    STO-RSI-MACD positions) are not evaluated and the ATR stop loss only adds columns, its warm-up rows are skipped
+    exactly (see atr_warmup). The RSI divergence strategy isn't swept: its peaks come from scipy's argrelextrema and
+    a sequential walk over consecutive extremes per combination, sweep it with the per-combination backtests.
+    """
+
+    # Strategy -> names of its parameters, in the order of the combination tuples
+    STRATEGIES = {
+        "double_sma": ["SMA_S", "SMA_L"],
+        "triple_sma": ["SMA_S", "SMA_M", "SMA_L"],
+        "double_ema": ["EMA_S", "EMA_L"],
+        "triple_ema": ["EMA_S", "EMA_M", "EMA_L"],
+        "macd": ["EMA_S", "EMA_M", "SIGNAL"],
+        "ichimoku_cloud": ["Conversation_window", "Base_window", "Span_window", "Leading_shift", "Lagging_shift"],
+        "ichimoku_cloud_rsi": ["Conversation_window", "Base_window", "Span_window", "Leading_shift",
+                               "Lagging_shift"],
+        "sto_rsi_macd": ["k_period", "smoothing_k", "d_period", "ema_fast", "ema_slow", "ema_sign", "rsi_window",
+                         "lags", "shift_position"],
+    }
+
+    def __init__(self, backtester, strategy: str, technical=True, shifting=False, warmup=0, block_size=256,
+                 parameters=None):
+        """
+        :param backtester: Backtester holding the prepared data (its panel) and transaction costs
+        :param warmup: rows after the first row with all the indicators that aren't evaluated, e.g. the rows an ATR
+                       stop loss has no value for and which the DataFrame backtest drops
+        :param block_size: number of combinations evaluated at once, bounds the memory to a few block x time arrays
+        :param parameters: strategy parameters that are the same for all the combinations, rsi_window and
+                           ema_window of ichimoku_cloud_rsi
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Strategy {strategy} can't be swept, choose one of {list(self.STRATEGIES)}")
+
+        self.backtester = backtester
+        self.strategy = strategy
+        self.technical = technical
+        self.shifting = shifting
+        self.warmup = warmup
+        self.block_size = block_size
+        self.parameters = {"rsi_window": 14, "ema_window": 200, **(parameters or dict())}
+
+    @staticmethod
+    def atr_warmup(atr_window=14, atr_stop_loss=True, ema_calc=True, own_smoothing=False) -> int:
+        """
+        Returns the rows ExitRules.atr_stop_loss leaves without an ATR, which the DataFrame backtest drops. The stop
+        loss only flags rows (ST_active), it doesn't change positions.
+        """
+        if not atr_stop_loss or not ema_calc:
+            return 0
+        return 1 if own_smoothing else atr_window - 1
+
+    def series(self, symbol: str) -> dict:
+        """
+        Returns the prices and log returns of a symbol, the rows the backtester has data for
+        """
+        panel = self.backtester.panel
+        i = panel.symbols.index(symbol)
+        valid = panel.mask[:, i]
+        return {field: panel[field][valid, i] for field in ["Close", "High", "Low", "returns"]
+                if field in panel.fields}
+
+    # POSITIONS --------------------------------------------------------------------------------------------------------
+
+    def crossover(self, fast: np.ndarray, slow: np.ndarray, first: np.ndarray) -> np.ndarray:
+        if self.shifting:
+            fast_1, slow_1 = shift_rows(fast, first), shift_rows(slow, first)
+            up = (fast > slow) & (fast_1 < slow_1)
+            down = (fast < slow) & (fast_1 > slow_1)
+        else:
+            up, down = fast > slow, fast < slow
+        return self.to_positions(up, down)
+
+    def triple_crossover(self, short: np.ndarray, medium: np.ndarray, long: np.ndarray, first: np.ndarray,
+                         shifted_long=True) -> np.ndarray:
+        up = (short > medium) & (medium > long)
+        down = (short < medium) & (medium < long)
+        if self.shifting:
+            # Same comparisons as the strategy classes: the shifted short MA against the current medium one and the
+            # shifted medium MA against the shifted (EMA) or current (SMA) long one
+            short_1, medium_1 = shift_rows(short, first), shift_rows(medium, first)
+            long_ref = shift_rows(long, first) if shifted_long else long
+            up &= (short_1 < medium) & (medium_1 < long_ref)
+            down &= (short_1 > medium) & (medium_1 > long_ref)
+        return self.to_positions(up, down)
+
+    def to_positions(self, up: np.ndarray, down: np.ndarray, technical=None) -> np.ndarray:
+        if not (self.technical if technical is None else technical):
+            up, down = down, up
+        positions = np.zeros(up.shape)
+        positions[up] = 1
+        positions[down] = -1
+        return positions
+
+    def indicators(self, series: dict, combinations: np.ndarray) -> dict:
+        """
+        Returns the indicators of every parameter value of the combinations, shared by all the blocks of a symbol
+        """
+        close = series["Close"]
+        if self.strategy in ["double_sma", "triple_sma"]:
+            windows = np.unique(combinations)
+            return {"windows": windows, "sma": sma_matrix(close, windows)}
+
+        if self.strategy in ["ichimoku_cloud", "ichimoku_cloud_rsi"]:
+            windows = np.unique(combinations[:, :3])
+            cache = {"windows": windows,
+                     "mid": (rolling_extreme_matrix(series["High"], windows, maximum=True) +
+                             rolling_extreme_matrix(series["Low"], windows, maximum=False)) / 2}
+            if self.strategy == "ichimoku_cloud_rsi":
+                cache["ema"] = ema_matrix(close, [self.parameters["ema_window"]])[0]
+                cache["rsi"] = rsi_matrix(close, [self.parameters["rsi_window"]])[0]
+            return cache
+
+        if self.strategy == "sto_rsi_macd":
+            return self.stochastic_indicators(series, combinations)
+
+        spans = np.unique(combinations[:, :2] if self.strategy == "macd" else combinations)
+        cache = {"spans": spans, "ema": ema_matrix(close, spans)}
+        if self.strategy == "macd":
+            self.signal_indicators(cache, combinations[:, 2])
+        return cache
+
+    @staticmethod
+    def signal_indicators(cache: dict, signal_spans: np.ndarray):
+        # The EMA is linear with the same start, so the signal line of two EMAs is the difference of their
+        # smoothed EMAs: every EMA is smoothed once per signal span
+        for span in np.unique(signal_spans):
+            cache[("signal", span)] = ema_rows(cache["ema"], np.full(len(cache["spans"]), span))
+
+    def stochastic_indicators(self, series: dict, combinations: np.ndarray) -> dict:
+        close = series["Close"]
+        spans = np.unique(combinations[:, 3:5])
+        cache = {"spans": spans, "ema": ema_matrix(close, spans)}
+        self.signal_indicators(cache, combinations[:, 5])
+
+        cache["rsi_windows"] = np.unique(combinations[:, 6])
+        cache["rsi"] = rsi_matrix(close, cache["rsi_windows"])
+
+        # %K of every (k_period, smoothing_k) pair
+        periods = np.unique(combinations[:, 0])
+        highs = rolling_extreme_matrix(series["High"], periods, maximum=True)
+        lows = rolling_extreme_matrix(series["Low"], periods, maximum=False)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw = (close - lows) * 100 / (highs - lows)
+        pairs = np.unique(combinations[:, :2], axis=0)
+        raw = raw[np.searchsorted(periods, pairs[:, 0])]
+        stochastic = ema_rows(raw, pairs[:, 1])
+
+        # A flat High / Low range leaves NaNs inside %K, Series.ewm carries its average over them
+        valid = ~np.isnan(raw)
+        first = valid.argmax(axis=1)
+        for row in np.flatnonzero(valid.sum(axis=1) < len(close) - first):
+            stochastic[row] = pd.Series(raw[row]).ewm(span=int(pairs[row, 1]), adjust=False).mean().to_numpy()
+        cache["stochastic"] = stochastic
+        cache["pairs"] = {tuple(pair): row for row, pair in enumerate(pairs.tolist())}
+        return cache
+
+    def macd_lines(self, combinations: np.ndarray, cache: dict):
+        fast_rows = np.searchsorted(cache["spans"], combinations[:, 0])
+        slow_rows = np.searchsorted(cache["spans"], combinations[:, 1])
+        signal = np.empty((len(combinations), cache["ema"].shape[1]))
+        for span in np.unique(combinations[:, 2]):
+            selected = combinations[:, 2] == span
+            smoothed = cache[("signal", span)]
+            signal[selected] = smoothed[fast_rows[selected]] - smoothed[slow_rows[selected]]
+        return cache["ema"][fast_rows] - cache["ema"][slow_rows], signal
+
+    def positions(self, combinations: np.ndarray, cache: dict, series: dict):
+        """
+        Returns the (combinations x time) positions and the rows every combination keeps, the rows the DataFrame
+        strategy doesn't drop
+
+        :param cache: indicator matrices of the symbol, see indicators
+        """
+        n = len(series["Close"])
+        if self.strategy in ["double_sma", "triple_sma"]:
+            averages = [cache["sma"][np.searchsorted(cache["windows"], combinations[:, j])]
+                        for j in range(combinations.shape[1])]
+            # The DataFrame strategies drop the rows before the longest window is full
+            first = combinations.max(axis=1) - 1
+            complete = from_column(np.ones((len(combinations), n), dtype=bool), first)
+            if self.strategy == "double_sma":
+                return self.crossover(averages[0], averages[1], first), complete
+            return self.triple_crossover(*averages, first, shifted_long=False), complete
+
+        if self.strategy in ["ichimoku_cloud", "ichimoku_cloud_rsi"]:
+            return self.ichimoku_positions(combinations, cache, series)
+        if self.strategy == "sto_rsi_macd":
+            return self.sto_rsi_macd_positions(combinations, cache, series)
+
+        first = np.zeros(len(combinations), dtype=np.int64)
+        complete = np.ones((len(combinations), n), dtype=bool)
+        if self.strategy == "macd":
+            macd, signal = self.macd_lines(combinations, cache)
+            return self.crossover(macd, signal, first), complete
+
+        averages = [cache["ema"][np.searchsorted(cache["spans"], combinations[:, j])]
+                    for j in range(combinations.shape[1])]
+        if self.strategy == "double_ema":
+            return self.crossover(averages[0], averages[1], first), complete
+        return self.triple_crossover(*averages, first, shifted_long=True), complete
+
+    def ichimoku_positions(self, combinations: np.ndarray, cache: dict, series: dict):
+        close = series["Close"]
+        mid = [cache["mid"][np.searchsorted(cache["windows"], combinations[:, j])] for j in range(3)]
+        tenkan, kijun = mid[0], mid[1]
+        span_a = shift_columns((tenkan + kijun) / 2, combinations[:, 3])
+        span_b = shift_columns(mid[2], combinations[:, 3])
+        chikou = shift_columns(np.broadcast_to(close, span_a.shape), -combinations[:, 4])
+        complete = ~(np.isnan(span_a) | np.isnan(span_b) | np.isnan(chikou))
+
+        if self.strategy == "ichimoku_cloud":
+            up = (close > span_a) & (close > span_b) & (span_a > span_b) & (tenkan > kijun) & \
+                 (chikou > span_a) & (chikou > span_b)
+            down = (close < span_a) & (close < span_b) & (span_a < span_b) & (tenkan < kijun) & \
+                   (chikou < span_a) & (chikou < span_b)
+        else:
+            # The strategy compares the span comparison itself (0 or 1) with the EMA
+            ema, rsi = cache["ema"], cache["rsi"]
+            up = (close > span_a) & (close > span_b) & ((span_a > span_b) > ema) & (rsi > 70)
+            down = (close < span_a) & (close < span_b) & ((span_a < span_b) < ema) & (rsi < 30)
+            complete &= ~np.isnan(rsi)
+            complete[:, 0] = False
+        return self.to_positions(up, down, technical=True), complete
+
+    def sto_rsi_macd_positions(self, combinations: np.ndarray, cache: dict, series: dict):
+        n = len(series["Close"])
+        stochastic = cache["stochastic"][[cache["pairs"][(k, s)] for k, s in combinations[:, :2].tolist()]]
+        signal = rolling_mean_rows(stochastic, combinations[:, 2])
+        rsi = cache["rsi"][np.searchsorted(cache["rsi_windows"], combinations[:, 6])]
+        macd, macd_signal = self.macd_lines(combinations[:, 3:6], cache)
+        diff = macd - macd_signal
+
+        # The strategy drops the incomplete rows before it looks back at earlier rows
+        complete = ~(np.isnan(signal) | np.isnan(rsi))
+        complete[:, 0] = False
+        first = np.where(complete.any(axis=1), complete.argmax(axis=1), n)
+
+        lags = combinations[:, 7]
+        buy_trigger = np.zeros(stochastic.shape, dtype=bool)
+        sell_trigger = np.zeros(stochastic.shape, dtype=bool)
+        for lag in range(1, int(lags.max(initial=0)) + 1):
+            shifts = np.full(len(combinations), lag)
+            stochastic_lag, signal_lag = shift_columns(stochastic, shifts, first), shift_columns(signal, shifts, first)
+            lagged = (lags >= lag)[:, None]
+            buy_trigger |= lagged & (stochastic_lag < 20) & (signal_lag < 20)
+            sell_trigger |= lagged & (stochastic_lag > 80) & (signal_lag > 80)
+
+        between = (stochastic >= 20) & (stochastic <= 80) & (signal >= 20) & (signal <= 80)
+        up = buy_trigger & between & (rsi > 50) & (diff > 0)
+        down = sell_trigger & between & (rsi < 50) & (diff < 0)
+        positions = shift_columns(self.to_positions(up, down, technical=True), combinations[:, 8], first)
+
+        # Without lags the strategy fails like the DataFrame backtest does
+        first[lags < 1] = n
+        return positions, from_column(complete & ~np.isnan(positions), first)
+
+    # EVALUATION -------------------------------------------------------------------------------------------------------
+
+    def evaluate(self, series: dict, combinations: np.ndarray, cache=None):
+        """
+        Returns final creturns, cstrategy and the number of evaluated rows of every combination
+
+        :param series: prices and returns of the symbol, see series
+        :param cache: indicators of the symbol, computed of the given combinations if missing
+        """
+        cache = cache if cache is not None else self.indicators(series, combinations)
+        positions, complete = self.positions(combinations, cache, series)
+        returns = series["returns"]
+        n = len(returns)
+
+        # The kept rows are one run, the DataFrame strategies drop rows only at the start and at the end
+        first = np.where(complete.any(axis=1), complete.argmax(axis=1), n)
+        last = n - complete[:, ::-1].argmax(axis=1)
+        if (complete.sum(axis=1) != np.maximum(last - first, 0)).any():
+            raise ValueError(f"Strategy {self.strategy} drops rows inside the data, sweep it without vectorized.")
+
+        # strategy[t] = position[t - 1] * returns[t] + |position[t] - position[t - 1]| * tc, evaluated from
+        # the second row after the first one (the first has no previous position) or after the warm-up
+        previous = positions[:, :-1]
+        with np.errstate(invalid="ignore"):
+            strategy = previous * returns[1:] + np.abs(positions[:, 1:] - previous) * self.backtester.tc
+        start = first + max(1, int(self.warmup))
+        columns = np.arange(1, n)[None, :]
+        kept = (columns >= start[:, None]) & (columns < last[:, None])
+
+        creturns = np.exp(np.where(kept, returns[1:], 0.0).sum(axis=1))
+        cstrategy = np.exp(np.where(kept, strategy, 0.0).sum(axis=1))
+        return creturns, cstrategy, kept.sum(axis=1)
+
+    def run(self, *ranges, constants=None) -> pd.DataFrame:
+        """
+        Evaluates every combination of the parameter ranges for every symbol of the backtester
+
+        :param constants: column name -> value of parameters that are the same for all the combinations
+        :return: DataFrame with Asset, the parameter columns, the constant columns, creturns and cstrategy of each
+                 evaluated combination
+        """
+        names = self.STRATEGIES[self.strategy]
+        if len(ranges) != len(names):
+            raise ValueError(f"Strategy {self.strategy} takes {len(names)} parameter ranges: {names}")
+
+        combinations = np.array(list(product(*ranges)), dtype=np.int64).reshape(-1, len(names))
+        symbols = self.backtester.panel.symbols
+        creturns = np.full((len(combinations), len(symbols)), np.nan)
+        cstrategy = np.full((len(combinations), len(symbols)), np.nan)
+        rows = np.zeros((len(combinations), len(symbols)), dtype=np.int64)
+        for i, symbol in enumerate(symbols):
+            series = self.series(symbol)
+            cache = self.indicators(series, combinations)
+            for offset in range(0, len(combinations), self.block_size):
+                block = slice(offset, offset + self.block_size)
+                creturns[block, i], cstrategy[block, i], rows[block, i] = \
+                    self.evaluate(series, combinations[block], cache)
+
+        # Rows in the order of the per-combination backtests (combinations, then symbols). Combinations without a
+        # single evaluated row fail in the DataFrame backtest as well.
+        evaluated = rows.ravel() > 0
+        frame = pd.DataFrame(np.repeat(combinations, len(symbols), axis=0)[evaluated], columns=names)
+        frame.insert(0, "Asset", np.tile(np.array(symbols, dtype=object), len(combinations))[evaluated])
+        for name, value in (constants or dict()).items():
+            frame[name] = value
+        frame["creturns"] = creturns.ravel()[evaluated]
+        frame["cstrategy"] = cstrategy.ravel()[evaluated]
+        return frame
@@ -1,13 +1,13 @@
 import pandas as pd
 from backtester.model.backtester import Backtester
+from backtester.model.indicator import SweepIndicator
 from strategies.ta_indicators.ema import EMAStrategy
 from exit_rules.backtesting_exit_rules import ExitRules
 from tqdm import tqdm
-import copy
 from itertools import product
 
 
-class EMA:
+class EMA(SweepIndicator):
     def __init__(self,
                  key: str,
                  secret: str,
@@ -17,7 +17,9 @@ class EMA:
                  symbols: list,
                  strategy: str,
                  tc: float,
-                 period_cagr="month"):
+                 period_cagr="month",
+                 base_url=None,
+                 wss_base_url=None):
         self.backtester = Backtester(key=key,
                                      secret=secret,
                                      use_testnet=use_testnet,
@@ -25,7 +27,9 @@ class EMA:
                                      interval=interval,
                                      start=start,
                                      tc=tc,
-                                     period_cagr=period_cagr)
+                                     period_cagr=period_cagr,
+                                     base_url=base_url,
+                                     wss_base_url=wss_base_url)
         self.ema_data = {}
         self.triple_ema_data = {}
         self.backtested_data = {}
@@ -45,7 +49,7 @@ class EMA:
                    own_smoothing=False,
                    technical=True,
                    shifting=False):
-        new_data = copy.deepcopy(self.backtester.data)
+        new_data = self.backtester.strategy_data()
 
         for pairs, data in new_data.items():
 
@@ -75,7 +79,7 @@ class EMA:
                    own_smoothing=False,
                    technical=True,
                    shifting=False):
-        new_data = copy.deepcopy(self.backtester.data)
+        new_data = self.backtester.strategy_data()
 
         for pairs, data in new_data.items():
 
@@ -92,16 +96,16 @@ class EMA:
                                                                      ema_calc=ema_calc,
                                                                      own_smoothing=own_smoothing)
 
-    def run_backtest(self):
+    def run_backtest(self, columns=None):
         if self.ema_data is None:
             print("Implement strategy firstly.")
         else:
-            self.backtested_data = self.backtester.test_strategy(self.ema_data)
+            self.backtested_data = self.backtester.test_strategy(self.ema_data, columns)
             return self.backtested_data
 
     def measure_performance(self, print_performance=False):
         if self.backtested_data is not None:
-            self.backtester.results = copy.deepcopy(self.backtested_data)
+            self.backtester.results = self.backtested_data
             scores = self.backtester.measure_performance()
             if print_performance:
                 self.backtester.print_performance()
@@ -153,7 +157,26 @@ class EMA:
 
             return self.backtester.dict_to_json(scores)
 
-    def all_combinantion(self, EMA_S_range=None, EMA_M_range=None, EMA_L_range=None, technical=True, shifting=False):
+    def all_combinantion(self, EMA_S_range=None, EMA_M_range=None, EMA_L_range=None, technical=True, shifting=False,
+                         vectorized=False, atr_window=14, workers=None,
+                         fixed_stop_loss=False, trailing_stop_loss=False):
+        """
+        Backtest every combination of the ranges and keep the 3 best of every asset in self.performance_data
+
+        :param vectorized: evaluate blocks of combinations at once with ParameterSweep instead of a backtest per
+                           combination
+        :param atr_window: window of the ATR stop loss of the strategy methods, its warm-up rows are not evaluated
+        :param workers: run the combinations in a process pool of this many workers (SweepExecutor) instead of
+                        one after another
+        :param fixed_stop_loss: backtest with the fixed stop loss instead of the ATR stop loss
+        :param trailing_stop_loss: backtest with the trailing stop loss instead of the ATR stop loss
+        """
+        stop_losses = {"atr_stop_loss": not (fixed_stop_loss or trailing_stop_loss),
+                       "fixed_stop_loss": fixed_stop_loss,
+                       "trailing_stop_loss": trailing_stop_loss}
+        # Keywords shared by all the combinations
+        parameters = dict(atr_window=atr_window, technical=technical, shifting=shifting, **stop_losses)
+        sweep_options = dict(technical=technical, shifting=shifting, warmup=atr_window - 1)
 
         comb_creturns = []
         comb_cstrategy = []
@@ -162,11 +185,16 @@ class EMA:
 
         if self.strategy == "double_ema":
 
+            if self.run_sweep("double_ema", [EMA_S_range, EMA_L_range], ["EMA_S", "EMA_L"], vectorized, workers,
+                              sweep_options, **parameters):
+                return
             combinations = list(product(EMA_S_range, EMA_L_range))
+
             for ema_s, ema_l in tqdm(combinations):
                 try:
-                    self.double_ema(ema_s, ema_l, technical, shifting)
-                    self.run_backtest()
+                    self.double_ema(ema_s, ema_l, atr_window=atr_window, technical=technical,
+                                    shifting=shifting, **stop_losses)
+                    self.run_backtest(columns=[])
                     for pair, result in self.backtested_data.items():
                         comb_pair.append(pair)
                         comb_s.append(ema_s)
@@ -190,11 +218,16 @@ class EMA:
             self.calculate_performance()
 
         elif self.strategy == "triple_ema":
+            if self.run_sweep("triple_ema", [EMA_S_range, EMA_M_range, EMA_L_range], ["EMA_S", "EMA_M", "EMA_L"],
+                              vectorized, workers, sweep_options, **parameters):
+                return
             combinations = list(product(EMA_S_range, EMA_M_range, EMA_L_range))
+
             for ema_s, ema_m, ema_l in tqdm(combinations):
                 try:
-                    self.triple_ema(ema_s, ema_m, ema_l, technical=technical, shifting=shifting)
-                    self.run_backtest()
+                    self.triple_ema(ema_s, ema_m, ema_l, atr_window=atr_window, technical=technical,
+                                    shifting=shifting, **stop_losses)
+                    self.run_backtest(columns=[])
                     for pair, result in self.backtested_data.items():
                         comb_pair.append(pair)
                         comb_s.append(ema_s)
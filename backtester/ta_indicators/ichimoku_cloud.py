@@ -1,13 +1,14 @@
 import pandas as pd
 from backtester.model.backtester import Backtester
+from backtester.model.sweep import ParameterSweep
+from backtester.model.indicator import SweepIndicator
 from strategies.ta_indicators.ichimoku_cloud import IchimokuCloudStrategy
 from exit_rules.backtesting_exit_rules import ExitRules
 from tqdm import tqdm
-import copy
 from itertools import product
 
 
-class IchimokuCloud:
+class IchimokuCloud(SweepIndicator):
     def __init__(self,
                  key: str,
                  secret: str,
@@ -17,7 +18,9 @@ class IchimokuCloud:
                  symbols: list,
                  strategy: str,
                  tc: float,
-                 period_cagr="month"):
+                 period_cagr="month",
+                 base_url=None,
+                 wss_base_url=None):
         self.backtester = Backtester(key=key,
                                      secret=secret,
                                      use_testnet=use_testnet,
@@ -25,7 +28,9 @@ class IchimokuCloud:
                                      interval=interval,
                                      start=start,
                                      tc=tc,
-                                     period_cagr=period_cagr)
+                                     period_cagr=period_cagr,
+                                     base_url=base_url,
+                                     wss_base_url=wss_base_url)
         self.ichimoku_data = {}
         self.backtested_data = {}
         self.strategy = strategy
@@ -46,7 +51,7 @@ class IchimokuCloud:
                        ema_calc=True,
                        own_smoothing=False,
                        ):
-        new_data = copy.deepcopy(self.backtester.data)
+        new_data = self.backtester.strategy_data()
 
         for pairs, data in new_data.items():
 
@@ -71,16 +76,16 @@ class IchimokuCloud:
                                                                           ema_calc=ema_calc,
                                                                           own_smoothing=own_smoothing)
 
-    def run_backtest(self):
+    def run_backtest(self, columns=None):
         if self.ichimoku_data is None:
             print("Implement strategy firstly.")
         else:
-            self.backtested_data = self.backtester.test_strategy(self.ichimoku_data)
+            self.backtested_data = self.backtester.test_strategy(self.ichimoku_data, columns)
             return self.backtested_data
 
     def measure_performance(self, print_performance=False, plot_performance=False):
         if self.backtested_data is not None:
-            self.backtester.results = copy.deepcopy(self.backtested_data)
+            self.backtester.results = self.backtested_data
             scores = self.backtester.measure_performance()
             if print_performance:
                 self.backtester.print_performance()
@@ -158,9 +163,18 @@ class IchimokuCloud:
                          fixed_stop_loss=False,
                          trailing_stop_loss=False,
                          ema_calc=True,
-                         own_smoothing=False
+                         own_smoothing=False,
+                         workers=None,
+                         vectorized=False
                          ):
+        """
+        Backtest every combination of the ranges and keep the 3 best of every asset in self.performance_data
 
+        :param vectorized: evaluate blocks of combinations at once with ParameterSweep instead of a backtest per
+                           combination
+        :param workers: run the combinations in a process pool of this many workers (SweepExecutor) instead of
+                        one after another
+        """
         comb_creturns = []
         comb_cstrategy = []
         comb_pair = []
@@ -179,11 +193,20 @@ class IchimokuCloud:
 
         if self.strategy == "ichimoku_cloud":
 
-            combinations = list(product(conversion_window_range,
-                                        base_window_range,
-                                        span_window_range,
-                                        leading_shift_range,
-                                        lagging_shift_range))
+            ranges = [conversion_window_range, base_window_range, span_window_range, leading_shift_range,
+                      lagging_shift_range]
+            # Parameters shared by all the combinations, also stored as columns like the loop does
+            parameters = dict(stop_loss=stop_loss, atr_window=atr_window, atr_stop_loss=atr_stop_loss,
+                              fixed_stop_loss=fixed_stop_loss, trailing_stop_loss=trailing_stop_loss,
+                              ema_calc=ema_calc, own_smoothing=own_smoothing)
+            columns = ["Conversation_window", "Base_window", "Span_window", "Leading_shift", "Lagging_shift"]
+            constants = {name.capitalize(): value for name, value in parameters.items()}
+            warmup = ParameterSweep.atr_warmup(atr_window, atr_stop_loss, ema_calc, own_smoothing)
+            if self.run_sweep("ichimoku_cloud", ranges, columns, vectorized, workers, dict(warmup=warmup), constants,
+                              **parameters):
+                return
+            combinations = list(product(*ranges))
+
             for conv_range, base_wid, span_wid, lead_shift, lag_shift in tqdm(combinations):
                 try:
                     self.ichimoku_cloud(conversion_window=conv_range,
@@ -199,7 +222,7 @@ class IchimokuCloud:
                                         ema_calc=ema_calc,
                                         own_smoothing=own_smoothing
                                         )
-                    self.run_backtest()
+                    self.run_backtest(columns=[])
                     for pair, result in self.backtested_data.items():
                         comb_pair.append(pair)
                         comb_conversion_window.append(conv_range)
@@ -1,14 +1,14 @@
 import pandas as pd
 
 from backtester.model.backtester import Backtester
+from backtester.model.indicator import SweepIndicator
 from strategies.ta_indicators.rsi_divergence import RSIDivergenceStrategy
 from exit_rules.backtesting_exit_rules import ExitRules
 from tqdm import tqdm
-import copy
 from itertools import product
 
 
-class RSI:
+class RSI(SweepIndicator):
     def __init__(self,
                  key: str,
                  secret: str,
@@ -18,7 +18,9 @@ class RSI:
                  symbols: list,
                  strategy: str,
                  tc: float,
-                 period_cagr="month"):
+                 period_cagr="month",
+                 base_url=None,
+                 wss_base_url=None):
         self.backtester = Backtester(key=key,
                                      secret=secret,
                                      use_testnet=use_testnet,
@@ -26,7 +28,9 @@ class RSI:
                                      interval=interval,
                                      start=start,
                                      tc=tc,
-                                     period_cagr=period_cagr)
+                                     period_cagr=period_cagr,
+                                     base_url=base_url,
+                                     wss_base_url=wss_base_url)
         self.rsi_data = {}
         self.triple_ema_data = {}
         self.backtested_data = {}
@@ -52,7 +56,7 @@ class RSI:
             ema_calc=True,
             own_smoothing=False,
             ):
-        new_data = copy.deepcopy(self.backtester.data)
+        new_data = self.backtester.strategy_data()
         for pairs, data in new_data.items():
             strategy = RSIDivergenceStrategy(data)
             self.rsi_data[pairs] = strategy.rsi(window=window,
@@ -75,16 +79,16 @@ class RSI:
                                                                      ema_calc=ema_calc,
                                                                      own_smoothing=own_smoothing)
 
-    def run_backtest(self):
+    def run_backtest(self, columns=None):
         if self.rsi_data is None:
             print("Implement strategy firstly.")
         else:
-            self.backtested_data = self.backtester.test_strategy(self.rsi_data)
+            self.backtested_data = self.backtester.test_strategy(self.rsi_data, columns)
             return self.backtested_data
 
     def measure_performance(self, print_performance=False):
         if self.backtested_data is not None:
-            self.backtester.results = copy.deepcopy(self.backtested_data)
+            self.backtester.results = self.backtested_data
             scores = self.backtester.measure_performance()
             if print_performance:
                 self.backtester.print_performance()
@@ -131,7 +135,14 @@ class RSI:
                          ema_s_range=None,
                          ema_m_range=None,
                          rsi_buy_range=None,
-                         rsi_sell_range=None):
+                         rsi_sell_range=None,
+                         workers=None):
+        """
+        Backtest every combination of the ranges and keep the 3 best of every asset in self.performance_data
+
+        :param workers: run the combinations in a process pool of this many workers (SweepExecutor) instead of
+                        one after another
+        """
 
         comb_creturns = []
         comb_cstrategy = []
@@ -140,17 +151,16 @@ class RSI:
 
         if self.strategy == "rsi":
 
-            combinations = list(product(window_range,
-                                        frame_range,
-                                        k_range,
-                                        ema_s_range,
-                                        ema_m_range,
-                                        rsi_buy_range,
-                                        rsi_sell_range))
+            ranges = [window_range, frame_range, k_range, ema_s_range, ema_m_range, rsi_buy_range, rsi_sell_range]
+            columns = ["window", "frame", "K", "EMA_S", "EMA_M", "rsi_buy_thresh", "rsi_sell_thresh"]
+            if self.run_sweep("rsi", ranges, columns, workers=workers):
+                return
+            combinations = list(product(*ranges))
+
             for window, frame, k, ema_s, ema_m, rsi_buy, rsi_sell in tqdm(combinations):
                 try:
                     self.rsi(window, frame, k, ema_s, ema_m, rsi_buy, rsi_sell)
-                    self.run_backtest()
+                    self.run_backtest(columns=[])
                     for pair, result in self.backtested_data.items():
                         comb_pair.append(pair)
                         comb_window.append(window)
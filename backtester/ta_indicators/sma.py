@@ -1,13 +1,13 @@
 import pandas as pd
 from backtester.model.backtester import Backtester
+from backtester.model.indicator import SweepIndicator
 from strategies.ta_indicators.sma import SMAStrategy
 from exit_rules.backtesting_exit_rules import ExitRules
 from tqdm import tqdm
-import copy
 from itertools import product
 
 
-class SMA:
+class SMA(SweepIndicator):
     def __init__(self,
                  key: str,
                  secret: str,
@@ -17,7 +17,9 @@ class SMA:
                  symbols: list,
                  strategy: str,
                  tc: float,
-                 period_cagr="month"):
+                 period_cagr="month",
+                 base_url=None,
+                 wss_base_url=None):
         self.backtester = Backtester(key=key,
                                      secret=secret,
                                      use_testnet=use_testnet,
@@ -25,7 +27,9 @@ class SMA:
                                      interval=interval,
                                      start=start,
                                      tc=tc,
-                                     period_cagr=period_cagr)
+                                     period_cagr=period_cagr,
+                                     base_url=base_url,
+                                     wss_base_url=wss_base_url)
         self.sma_data = {}
         self.triple_sma_data = {}
         self.backtested_data = {}
@@ -45,7 +49,7 @@ class SMA:
                    own_smoothing=False,
                    technical=True,
                    shifting=False):
-        new_data = copy.deepcopy(self.backtester.data)
+        new_data = self.backtester.strategy_data()
 
         for pairs, data in new_data.items():
 
@@ -53,11 +57,11 @@ class SMA:
             self.sma_data[pairs] = strategy.double_sma(sma_s, sma_l, technical, shifting)
 
             if fixed_stop_loss and not trailing_stop_loss and not atr_stop_loss:
-                self.sma_data[pairs] = StopLoss(data).fixed_stop_loss(stop_loss)
+                self.sma_data[pairs] = ExitRules(data).fixed_stop_loss(stop_loss)
             elif trailing_stop_loss and not fixed_stop_loss and not atr_stop_loss:
-                self.sma_data[pairs] = StopLoss(data).trailing_stop_loss(stop_loss)
+                self.sma_data[pairs] = ExitRules(data).trailing_stop_loss(stop_loss)
             elif atr_stop_loss and not fixed_stop_loss and not trailing_stop_loss:
-                self.sma_data[pairs] = StopLoss(data).atr_stop_loss(window=atr_window,
+                self.sma_data[pairs] = ExitRules(data).atr_stop_loss(window=atr_window,
                                                                     stop_loss=stop_loss,
                                                                     ema_calc=ema_calc,
                                                                     own_smoothing=own_smoothing)
@@ -75,7 +79,7 @@ class SMA:
                    own_smoothing=False,
                    technical=True,
                    shifting=False):
-        new_data = copy.deepcopy(self.backtester.data)
+        new_data = self.backtester.strategy_data()
 
         for pairs, data in new_data.items():
 
@@ -92,16 +96,16 @@ class SMA:
                                                                      ema_calc=ema_calc,
                                                                      own_smoothing=own_smoothing)
 
-    def run_backtest(self):
+    def run_backtest(self, columns=None):
         if self.sma_data is None:
             print("Implement strategy firstly.")
         else:
-            self.backtested_data = self.backtester.test_strategy(self.sma_data)
+            self.backtested_data = self.backtester.test_strategy(self.sma_data, columns)
             return self.backtested_data
 
     def measure_performance(self, print_performance=False):
         if self.backtested_data is not None:
-            self.backtester.results = copy.deepcopy(self.backtested_data)
+            self.backtester.results = self.backtested_data
             scores = self.backtester.measure_performance()
             if print_performance:
                 self.backtester.print_performance()
@@ -153,7 +157,26 @@ class SMA:
 
             return self.backtester.dict_to_json(scores)
 
-    def all_combinantion(self, SMA_S_range=None, SMA_M_range=None, SMA_L_range=None, technical=True, shifting=False):
+    def all_combinantion(self, SMA_S_range=None, SMA_M_range=None, SMA_L_range=None, technical=True, shifting=False,
+                         vectorized=False, atr_window=14, workers=None,
+                         fixed_stop_loss=False, trailing_stop_loss=False):
+        """
+        Backtest every combination of the ranges and keep the 3 best of every asset in self.performance_data
+
+        :param vectorized: evaluate blocks of combinations at once with ParameterSweep instead of a backtest per
+                           combination
+        :param atr_window: window of the ATR stop loss of the strategy methods, its warm-up rows are not evaluated
+        :param workers: run the combinations in a process pool of this many workers (SweepExecutor) instead of
+                        one after another
+        :param fixed_stop_loss: backtest with the fixed stop loss instead of the ATR stop loss
+        :param trailing_stop_loss: backtest with the trailing stop loss instead of the ATR stop loss
+        """
+        stop_losses = {"atr_stop_loss": not (fixed_stop_loss or trailing_stop_loss),
+                       "fixed_stop_loss": fixed_stop_loss,
+                       "trailing_stop_loss": trailing_stop_loss}
+        # Keywords shared by all the combinations
+        parameters = dict(atr_window=atr_window, technical=technical, shifting=shifting, **stop_losses)
+        sweep_options = dict(technical=technical, shifting=shifting, warmup=atr_window - 1)
 
         comb_creturns = []
         comb_cstrategy = []
@@ -162,11 +185,16 @@ class SMA:
 
         if self.strategy == "double_sma":
 
+            if self.run_sweep("double_sma", [SMA_S_range, SMA_L_range], ["SMA_S", "SMA_L"], vectorized, workers,
+                              sweep_options, **parameters):
+                return
             combinations = list(product(SMA_S_range, SMA_L_range))
+
             for sma_s, sma_l in tqdm(combinations):
                 try:
-                    self.double_sma(sma_s, sma_l, technical, shifting)
-                    self.run_backtest()
+                    self.double_sma(sma_s, sma_l, atr_window=atr_window, technical=technical,
+                                    shifting=shifting, **stop_losses)
+                    self.run_backtest(columns=[])
                     for pair, result in self.backtested_data.items():
                         comb_pair.append(pair)
                         comb_s.append(sma_s)
@@ -190,11 +218,16 @@ class SMA:
             self.calculate_performance()
 
         elif self.strategy == "triple_sma":
+            if self.run_sweep("triple_sma", [SMA_S_range, SMA_M_range, SMA_L_range], ["SMA_S", "SMA_M", "SMA_L"],
+                              vectorized, workers, sweep_options, **parameters):
+                return
             combinations = list(product(SMA_S_range, SMA_M_range, SMA_L_range))
+
             for sma_s, sma_m, sma_l in tqdm(combinations):
                 try:
-                    self.triple_sma(sma_s, sma_m, sma_l, technical=technical, shifting=shifting)
-                    self.run_backtest()
+                    self.triple_sma(sma_s, sma_m, sma_l, atr_window=atr_window, technical=technical,
+                                    shifting=shifting, **stop_losses)
+                    self.run_backtest(columns=[])
                     for pair, result in self.backtested_data.items():
                         comb_pair.append(pair)
                         comb_s.append(sma_s)
@@ -1,13 +1,14 @@
 import pandas as pd
 from backtester.model.backtester import Backtester
+from backtester.model.sweep import ParameterSweep
+from backtester.model.indicator import SweepIndicator
 from strategies.ta_indicators.sto_rsi_macd import STORSIMACDStrategy
 from exit_rules.backtesting_exit_rules import ExitRules
 from tqdm import tqdm
-import copy
 from itertools import product
 
 
-class STO_RSI_MACD:
+class STO_RSI_MACD(SweepIndicator):
     def __init__(self,
                  key: str,
                  secret: str,
@@ -17,7 +18,9 @@ class STO_RSI_MACD:
                  symbols: list,
                  strategy: str,
                  tc: float,
-                 period_cagr="month"):
+                 period_cagr="month",
+                 base_url=None,
+                 wss_base_url=None):
         self.backtester = Backtester(key=key,
                                      secret=secret,
                                      use_testnet=use_testnet,
@@ -25,7 +28,9 @@ class STO_RSI_MACD:
                                      interval=interval,
                                      start=start,
                                      tc=tc,
-                                     period_cagr=period_cagr)
+                                     period_cagr=period_cagr,
+                                     base_url=base_url,
+                                     wss_base_url=wss_base_url)
         self.sto_rsi_macd_data = {}
         self.backtested_data = {}
         self.strategy = strategy
@@ -49,7 +54,7 @@ class STO_RSI_MACD:
                      ema_calc=True,
                      own_smoothing=False,
                      ):
-        new_data = copy.deepcopy(self.backtester.data)
+        new_data = self.backtester.strategy_data()
         for pairs, data in new_data.items():
             strategy = STORSIMACDStrategy(data)
             self.sto_rsi_macd_data[pairs] = strategy.sto_rsi_macd(k_period,
@@ -72,16 +77,16 @@ class STO_RSI_MACD:
                                                                               ema_calc=ema_calc,
                                                                               own_smoothing=own_smoothing)
 
-    def run_backtest(self):
+    def run_backtest(self, columns=None):
         if self.sto_rsi_macd_data is None:
             print("Implement strategy firstly.")
         else:
-            self.backtested_data = self.backtester.test_strategy(self.sto_rsi_macd_data)
+            self.backtested_data = self.backtester.test_strategy(self.sto_rsi_macd_data, columns)
             return self.backtested_data
 
     def measure_performance(self, print_performance=False):
         if self.backtested_data is not None:
-            self.backtester.results = copy.deepcopy(self.backtested_data)
+            self.backtester.results = self.backtested_data
             scores = self.backtester.measure_performance()
             if print_performance:
                 self.backtester.print_performance()
@@ -109,7 +114,7 @@ class STO_RSI_MACD:
                     comb_ema_sign.append(int(self.performance_data["ema_sign"].iloc[int(idx)]))
                     comb_rsi_window.append(int(self.performance_data["rsi_window"].iloc[int(idx)]))
                     comb_lags.append(int(self.performance_data["lags"].iloc[int(idx)]))
-                    comb_shift_position.append(int(self.performance_data["shit_position"].iloc[int(idx)]))
+                    comb_shift_position.append(int(self.performance_data["shift_position"].iloc[int(idx)]))
                     creturns.append(float(self.performance_data["creturns"].iloc[int(idx)]))
                     cstrategy.append(float(self.performance_data["cstrategy"].iloc[int(idx)]))
                 scores[asset] = [{"k_period": comb_k_period},
@@ -120,7 +125,7 @@ class STO_RSI_MACD:
                                  {"ema_sign": comb_ema_sign},
                                  {"rsi_window": comb_rsi_window},
                                  {"lags": comb_lags},
-                                 {"shit_position": comb_shift_position},
+                                 {"shift_position": comb_shift_position},
                                  {"creturns": creturns},
                                  {"cstrategy": cstrategy}]
 
@@ -135,8 +140,17 @@ class STO_RSI_MACD:
                          ema_sign_range=None,
                          rsi_window_range=None,
                          lags_range=None,
-                         shift_position_range=None):
+                         shift_position_range=None,
+                         workers=None,
+                         vectorized=False):
+        """
+        Backtest every combination of the ranges and keep the 3 best of every asset in self.performance_data
 
+        :param workers: run the combinations in a process pool of this many workers (SweepExecutor) instead of
+                        one after another
+        :param vectorized: evaluate blocks of combinations at once with ParameterSweep instead of a backtest per
+                           combination
+        """
         comb_creturns = []
         comb_cstrategy = []
         comb_pair = []
@@ -145,22 +159,22 @@ class STO_RSI_MACD:
 
         if self.strategy == "sto_rsi_macd":
 
-            combinations = list(product(k_period_range,
-                                        smoothing_k_range,
-                                        d_period_range,
-                                        ema_fast_range,
-                                        ema_slow_range,
-                                        ema_sign_range,
-                                        rsi_window_range,
-                                        lags_range,
-                                        shift_position_range
-                                        ))
+            ranges = [k_period_range, smoothing_k_range, d_period_range, ema_fast_range, ema_slow_range, ema_sign_range,
+                      rsi_window_range, lags_range, shift_position_range]
+            columns = ["k_period", "smoothing_k", "d_period", "ema_fast", "ema_slow", "ema_sign", "rsi_window", "lags",
+                       "shift_position"]
+            # The strategy method backtests with the default ATR stop loss
+            if self.run_sweep("sto_rsi_macd", ranges, columns, vectorized, workers,
+                              dict(warmup=ParameterSweep.atr_warmup())):
+                return
+            combinations = list(product(*ranges))
+
             for k_period, smoothing_k, d_period, ema_fast, ema_slow, ema_sign, rsi_window, lags, shift_position in tqdm(
                     combinations):
                 try:
                     self.sto_rsi_macd(k_period, smoothing_k, d_period, ema_fast, ema_slow, ema_sign, rsi_window, lags,
                                       shift_position)
-                    self.run_backtest()
+                    self.run_backtest(columns=[])
                     for pair, result in self.backtested_data.items():
                         comb_pair.append(pair)
                         comb_k_period.append(k_period)
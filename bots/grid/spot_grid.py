@@ -4,7 +4,6 @@ import threading
 import numpy as np
 import os
 import json
-from tqdm import tqdm
 
 from connectors.binanceConnect import BinanceClient
 from time_operators.time_operator import TimeOperator
@@ -40,15 +39,28 @@ class StaticGridBot(BinanceClient, TimeOperator):
                  # STRATEGY
                  grid_line_delay=True,
                  sale_base_asset=True,
+                 recenter=False,
+
+                 # MARKET DATA
+                 use_order_book=False,
+                 use_user_data_stream=True,
+                 use_ticker_stream=False,
+
+                 # CONNECTION (e.g. the local simulator)
+                 base_url=None,
+                 wss_base_url=None,
 
                  ):
         """
         :param strategy_type: "params here to be added"
+        :param recenter: once the price leaves the grid range, move the grid (and its resting orders) to be centered
+                         on the price instead of waiting for it to come back
         """
         self.api_key = key
         self.api_secret = secret
         self.use_testnet = use_testnet
-        self.client = BinanceClient(self.api_key, self.api_secret, self.use_testnet)
+        self.client = BinanceClient(self.api_key, self.api_secret, self.use_testnet, base_url=base_url,
+                                    wss_base_url=wss_base_url)
         self.time = TimeOperator()
         self.base_symbol = base_symbol
         self.quote_symbol = quote_symbol
@@ -89,6 +101,7 @@ class StaticGridBot(BinanceClient, TimeOperator):
         self.take_profit = take_profit
 
         # GRID BOT
+        self.symbol_filters = self.client.get_symbol_filters(self.symbol)
         self.grid_created = False
         self.current_price = 0.0
         self.grid_width = self.calculate_grid_width()
@@ -96,22 +109,37 @@ class StaticGridBot(BinanceClient, TimeOperator):
         self.closed_orders_id = []
         self.minimum_required_balance = self.minimum_required_balance()
         self.sale_base_asset = sale_base_asset
+        self.recenter = recenter
         self.filled_sell_orders = []
         self.sell_grid_prices = []
         self.buy_grid_prices = []
         self.starting_quote_balance = round(float(self._get_quote_balance()), config.PRECISION)
 
+        # Local order book (prices without REST calls)
+        self.order_book = self.client.get_order_book_manager().track(self.symbol) if use_order_book else None
+
+        # Ticker prices pushed by the bookTicker stream, REST requests (cached and batched) only while it's down
+        if use_ticker_stream:
+            self.client.get_ticker_service().stream([self.symbol])
+
+        # Order updates pushed by the user data stream (orderId -> order), polled only while it's disconnected
+        self.order_updates = dict()
+        self.order_updates_lock = threading.Lock()
+        self.user_stream = None
+        self.user_stream_connections = 0
+        self.poll_orders = True
+        if use_user_data_stream:
+            self.user_stream = self.client.get_user_data_stream()
+            self.user_stream.execution_reports(self.on_execution_report)
+
     # EXCHANGE METHODS -------------------------------------------------------------------------------------------------
 
     def _get_base_balance(self) -> float:
         """
         Return a base symbol SPOT wallet balance
         """
-        assets_balance = self.client.get_account_balance()
         try:
-            for asset, value in assets_balance.items():
-                if asset == str(self.base_symbol).upper():
-                    return value
+            return self.client.get_asset_balance(str(self.base_symbol).upper())
         except Exception as e:
             print(f"Error while getting base balance of {e}.")
 
@@ -119,30 +147,112 @@ class StaticGridBot(BinanceClient, TimeOperator):
         """
         Return a quote symbol SPOT wallet balance
         """
-        assets_balance = self.client.get_account_balance()
         try:
-            for asset, value in assets_balance.items():
-                if asset == str(self.quote_symbol).upper():
-                    return value
+            return self.client.get_asset_balance(str(self.quote_symbol).upper())
         except Exception as e:
             print(f"Error while getting quote balance of {e}.")
 
+    def _round_price(self, price: float) -> float:
+        """
+        Round a price to the symbol tick size (config.PRECISION if exchange info is not available)
+        """
+        if self.symbol_filters is not None:
+            return self.symbol_filters.round_price(price)
+        return round(float(price), config.PRECISION)
+
+    def _round_quantity(self, quantity: float) -> float:
+        """
+        Round a quantity down to the symbol lot step size
+        """
+        if self.symbol_filters is not None:
+            return self.symbol_filters.round_quantity(quantity)
+        return float(quantity)
+
+    def _limit_order_params(self, symbol: str, side: str, price: float, quantity: float):
+        """
+        Returns keywords of a limit order or None if the order breaks the symbol filters
+        """
+        # Round locally, an order breaking the filters would be rejected by the exchange anyway
+        price = self._round_price(price)
+        if self.market_order_type == "quantity":
+            quantity = self._round_quantity(quantity)
+            if self.symbol_filters is not None and not self.symbol_filters.is_valid_order(price, quantity):
+                print(f"{side} order of {quantity} {symbol} at {price} breaks the symbol filters, not sending it.")
+                return None
+
+        return dict(symbol=symbol,
+                    side=str(side).upper(),
+                    type="LIMIT",
+                    price=price,
+                    amount=quantity,
+                    quantity_type=self.market_order_type)
+
     def _market_limit_order(self, symbol: str, side: str, price: float, quantity: float):
         """
         Create Market Limit Order
         params: symbol="BTCUSDT", side="BUY", price="40000.0", quantity="0.01"
         """
+        order_params = self._limit_order_params(symbol, side, price, quantity)
+        if order_params is None:
+            return None
+
         try:
-            order = self.client.sell_order(symbol=symbol,
-                                           side=str(side).upper(),
-                                           type="LIMIT",
-                                           price=price,
-                                           amount=quantity,
-                                           quantity_type=self.market_order_type)
+            order = self.client.new_order(**order_params)
             return order
         except Exception as e:
             print(f"Error while making a market limit order of {e}.")
 
+    def _batch_limit_orders(self, symbol: str, side: str, prices: list, quantity: float) -> list:
+        """
+        Place limit orders at all prices concurrently, returns the orders which were accepted
+        """
+        orders = [self._limit_order_params(symbol, side, price, quantity) for price in prices]
+        orders = [order for order in orders if order is not None]
+
+        placed = []
+        for order_params, order in zip(orders, self.client.batch_orders(orders)):
+            if order is None or "orderId" not in order:
+                print(f"{side} limit order at {order_params['price']} failed.")
+                continue
+            placed.append(order)
+
+        return placed
+
+    def _replace_limit_orders(self, symbol: str, side: str, orders: list, prices: list, quantity: float) -> list:
+        """
+        Moves resting orders of one side to new prices, sending the cancel-replace requests in one batch. Orders are
+        paired with prices closest to the market first, orders left without a price are canceled. Returns the orders
+        of the side to track: the replacements and the old orders which couldn't be canceled (e.g. filled meanwhile)
+        """
+        descending = str(side).upper() == config.SIDE_BUY
+        orders = sorted(orders, key=lambda order: float(order["price"]), reverse=descending)
+        prices = sorted(prices, reverse=descending)
+
+        requests = [self._limit_order_params(symbol, side, price, quantity) for price in prices]
+        requests = [request for request in requests if request is not None][:len(orders)]
+        for request, order in zip(requests, orders):
+            request["cancel_order_id"] = int(order["orderId"])
+
+        replaced = set()
+        placed = []
+        for request, response in zip(requests, self.client.batch_orders(requests)):
+            # STOP_ON_FAILURE: a failed cancel (order already filled) comes back as None and places nothing
+            if response is None:
+                print(f"{side} order {request['cancel_order_id']} couldn't be moved to {request['price']}.")
+                continue
+            replaced.add(request["cancel_order_id"])
+            if response.get("newOrderResult") == "SUCCESS":
+                placed.append(response["newOrderResponse"])
+            else:
+                print(f"{side} limit order at {request['price']} failed after canceling the old one.")
+
+        for order in orders[len(requests):]:
+            canceled = self._cancel_order(symbol, int(order["orderId"]))
+            if canceled is not None and canceled.get("status") == config.CANCELED_ORDER:
+                replaced.add(int(order["orderId"]))
+
+        return [order for order in orders if int(order["orderId"]) not in replaced] + placed
+
     def _check_order_status(self, symbol: str, orderId: int):
         """
         Cheking order of a stutus with symbol and orderId
@@ -155,6 +265,58 @@ class StaticGridBot(BinanceClient, TimeOperator):
         except Exception as e:
             print(f"Error while checking order status of: {e}.")
 
+    def on_execution_report(self, event: dict):
+        if event["s"] != self.symbol:
+            return
+
+        order = dict()
+        order["orderId"] = int(event["i"])
+        order["side"] = event["S"]
+        order["status"] = event["X"]
+        order["price"] = event["p"]
+        order["executedQty"] = event["z"]
+
+        with self.order_updates_lock:
+            self.order_updates[order["orderId"]] = order
+
+    def _get_order(self, order: dict):
+        """
+        Latest state of a placed order, from the user data stream or polled when stream events could be missing
+        """
+        if self.poll_orders:
+            status = self._check_order_status(self.symbol, int(order["orderId"]))
+            if status is not None and status.get("status") in [config.FILLED_ORDER, config.CANCELED_ORDER]:
+                with self.order_updates_lock:
+                    self.order_updates.pop(int(order["orderId"]), None)
+            return status
+
+        with self.order_updates_lock:
+            update = self.order_updates.get(int(order["orderId"]))
+            if update is not None and update["status"] in [config.FILLED_ORDER, config.CANCELED_ORDER]:
+                del self.order_updates[update["orderId"]]
+
+        return update if update is not None else order
+
+    def _forget_order_updates(self):
+        """
+        Drops stream updates of orders the grid doesn't track anymore, e.g. filled orders it has replaced
+        """
+        tracked = {int(order["orderId"]) for order in self.buy_orders_list + self.sell_orders_list
+                   if order is not None and "orderId" in order}
+        with self.order_updates_lock:
+            for order_id in [order_id for order_id in self.order_updates if order_id not in tracked]:
+                del self.order_updates[order_id]
+
+    def _update_poll_orders(self):
+        """
+        Poll order statuses while the user data stream is down and once after every reconnect
+        """
+        if self.user_stream is None or not self.user_stream.connected:
+            self.poll_orders = True
+        else:
+            self.poll_orders = self.user_stream.connections != self.user_stream_connections
+            self.user_stream_connections = self.user_stream.connections
+
     def _cancel_order(self, symbol: str, orderId: int):
         """
         Canceling order with symbol and orderId
@@ -182,6 +344,11 @@ class StaticGridBot(BinanceClient, TimeOperator):
         pass
 
     def _get_ticker_price(self, ticker):
+        # Mid price of the local order book once it's in sync, REST ticker otherwise
+        if self.order_book is not None and self.order_book.synced and ticker == self.symbol:
+            mid_price = self.order_book.mid_price()
+            if mid_price is not None:
+                return mid_price
         return self.client.get_current_price(tick=ticker)
 
     # GRID METHODS -----------------------------------------------------------------------------------------------------
@@ -192,7 +359,7 @@ class StaticGridBot(BinanceClient, TimeOperator):
         """
         if self.upper_price > self.lower_price:
             grid_width = float((self.upper_price - self.lower_price) / self.num_grids)
-            return round(grid_width, config.PRECISION)
+            return self._round_price(grid_width)
         else:
             print("Upper price of a grid is not greater than lower price.")
 
@@ -205,9 +372,9 @@ class StaticGridBot(BinanceClient, TimeOperator):
 
         for i in range(self.num_grids):
             new_price += self.grid_width
-            prices.append(round(new_price, config.PRECISION))
+            prices.append(self._round_price(new_price))
 
-        prices.append(round(self.upper_price, config.PRECISION))
+        prices.append(self._round_price(self.upper_price))
         return prices
 
     def find_closest_price(self, current_price: float, prices: list) -> float:
@@ -238,7 +405,7 @@ class StaticGridBot(BinanceClient, TimeOperator):
 
     def quantity_price(self) -> float:
         ticker_price = self.client.get_current_price(self.symbol)
-        quantity_price = float(ticker_price) * float(self.quantity)
+        quantity_price = ticker_price * float(self.quantity)
         return quantity_price
 
     def minimum_required_balance(self) -> float:
@@ -323,31 +490,13 @@ class StaticGridBot(BinanceClient, TimeOperator):
             if len(buy_prices) >= 1 and trade_decision:
 
                 print("PLACING BUY LIMIT ORDERS")
-                for buy_price in tqdm(buy_prices):
-                    try:
-                        buy_order = self._market_limit_order(symbol=self.symbol,
-                                                             side="BUY",
-                                                             price=buy_price,
-                                                             quantity=self.quantity)
-                    except Exception as e:
-                        print(f"Error while making BUY LIMIT ORDER of {e} Retrying...")
-                        continue
-                    self.buy_orders_list.append(buy_order)
+                self.buy_orders_list += self._batch_limit_orders(self.symbol, "BUY", buy_prices, self.quantity)
 
                 enough_base_asset = self.is_enough_base_to_sell()
 
                 if enough_base_asset:
                     print("PLACING SELL LIMIT ORDERS")
-                    for sell_price in tqdm(sell_prices):
-                        try:
-                            sell_order = self._market_limit_order(symbol=self.symbol,
-                                                                  side="SELL",
-                                                                  price=sell_price,
-                                                                  quantity=self.quantity)
-                        except Exception as e:
-                            print(f"Error while making SELL LIMIT ORDER of {e} Retrying...")
-                            continue
-                        self.sell_orders_list.append(sell_order)
+                    self.sell_orders_list += self._batch_limit_orders(self.symbol, "SELL", sell_prices, self.quantity)
                 else:
                     num_of_needed_sells = len(self.sell_grid_prices)
                     current_base = self._get_base_balance()
@@ -355,22 +504,11 @@ class StaticGridBot(BinanceClient, TimeOperator):
                     if float(current_base) > 0:
                         amount_of_possible_sells = int(float(num_of_needed_sells) * float(self.quantity) / float(current_base))
                         if amount_of_possible_sells > 0:
-                            i = 1
-                            for sell_price in tqdm(sell_prices):
-                                try:
-                                    if i <= amount_of_possible_sells:
-                                        sell_order = self._market_limit_order(symbol=self.symbol,
-                                                                              side="SELL",
-                                                                              price=sell_price,
-                                                                              quantity=self.quantity)
-                                        self.sell_orders_list.append(sell_order)
-                                        i += 1
-                                    else:
-                                        print("Can't be place (not enough balance).")
-
-                                except Exception as e:
-                                    print(f"Error while making SELL LIMIT ORDER of {e} Retrying...")
-                                    continue
+                            self.sell_orders_list += self._batch_limit_orders(self.symbol, "SELL",
+                                                                              sell_prices[:amount_of_possible_sells],
+                                                                              self.quantity)
+                            for _ in sell_prices[amount_of_possible_sells:]:
+                                print("Can't be place (not enough balance).")
 
                         else:
                             print(f"No sell orders has been filled.")
@@ -400,10 +538,33 @@ class StaticGridBot(BinanceClient, TimeOperator):
             self.grid_created = False
             print("Current price is out of range.")
 
+    def recenter_grid(self, center_price: float):
+        """
+        Moves the grid range to be centered on a price and its resting orders to the new grid prices, with a
+        cancel-replace request per order sent in one batch (a round trip instead of one per level). The number of
+        orders of a side doesn't grow, so the balance they need stays the same.
+        """
+        half_range = (float(self.upper_price) - float(self.lower_price)) / 2
+        self.upper_price = self._round_price(float(center_price) + half_range)
+        self.lower_price = self._round_price(float(center_price) - half_range)
+        self.grid_prices = self.get_grid_prices()
+
+        closest_price = self.find_closest_price(center_price, self.grid_prices)
+        self.sell_grid_prices = self.get_sell_grid_prices(closest_price, self.grid_prices)
+        self.buy_grid_prices = self.get_buy_grid_prices(closest_price, self.grid_prices)
+        print(f"Grid re-centered on {center_price}: {self.lower_price} - {self.upper_price}")
+
+        buy_orders = [order for order in self.buy_orders_list if order is not None and "orderId" in order]
+        sell_orders = [order for order in self.sell_orders_list if order is not None and "orderId" in order]
+        self.buy_orders_list = self._replace_limit_orders(self.symbol, config.SIDE_BUY, buy_orders,
+                                                          self.buy_grid_prices, self.quantity)
+        self.sell_orders_list = self._replace_limit_orders(self.symbol, config.SIDE_SELL, sell_orders,
+                                                           self.sell_grid_prices, self.quantity)
+
     def check_buy_orders(self):
         for idx, buy_order in enumerate(self.buy_orders_list):
             try:
-                order = self._check_order_status(self.symbol, int(buy_order["orderId"]))
+                order = self._get_order(buy_order)
                 order_status = order["status"]
                 order_price = order["price"]
                 # print(f"Order: {idx+1} of status : {order['status']}")
@@ -411,7 +572,7 @@ class StaticGridBot(BinanceClient, TimeOperator):
                 if order_status == config.FILLED_ORDER:
                     self.closed_orders_id.append(order["orderId"])
                     print(f"Buy order executed at price: {order_price}")
-                    new_sell_price = round((float(order_price) + float(self.grid_width)), config.PRECISION)
+                    new_sell_price = self._round_price(float(order_price) + float(self.grid_width))
                     print(f"Creating new sell order at price: {new_sell_price}")
                     new_sell_order = self._market_limit_order(symbol=self.symbol,
                                                               side=config.SIDE_SELL,
@@ -439,7 +600,7 @@ class StaticGridBot(BinanceClient, TimeOperator):
     def check_sell_orders(self):
         for idx, sell_order in enumerate(self.sell_orders_list):
             try:
-                order = self._check_order_status(self.symbol, int(sell_order["orderId"]))
+                order = self._get_order(sell_order)
                 order_status = order["status"]
                 order_price = order["price"]
                 # print(f"Order: {idx+1} of status : {order['status']}")
@@ -448,7 +609,7 @@ class StaticGridBot(BinanceClient, TimeOperator):
                     self.closed_orders_id.append(order["orderId"])
                     self.filled_sell_orders.append(order["orderId"])
                     print(f"Sell order executed at price: {order_price}")
-                    new_buy_price = round((float(order_price) - float(self.grid_width)), config.PRECISION)
+                    new_buy_price = self._round_price(float(order_price) - float(self.grid_width))
                     print(f"Creating new buy order at price: {new_buy_price}")
                     new_buy_order = self._market_limit_order(symbol=self.symbol,
                                                              side=config.SIDE_BUY,
@@ -485,7 +646,7 @@ class StaticGridBot(BinanceClient, TimeOperator):
         # print(f"Fetching historical data of symbol: {symbol}, interval: {interval}, of last {days} days...")
         # self.data = self.get_historical_klines(symbol=symbol, period=interval, start=start_str,
         #                                        end=self.time.generate_current_timestamp())
-        self.current_price = float(self._get_ticker_price(self.symbol))
+        self.current_price = self._get_ticker_price(self.symbol)
         # self.current_price = self.data["Close"].iloc[-1]
         print(f"CURRENT PRICE: {self.current_price}")
 
@@ -595,7 +756,7 @@ class StaticGridBot(BinanceClient, TimeOperator):
 
                 checking = True
 
-                self.current_price = float(self._get_ticker_price(self.symbol))
+                self.current_price = self._get_ticker_price(self.symbol)
 
                 if self.stop_loss_active:
                     print(f"Checking if STOP LOSS is hit with current price: {self.current_price}")
@@ -616,6 +777,8 @@ class StaticGridBot(BinanceClient, TimeOperator):
                         print(f"Grid trading bot stopped due to TAKE PROFIT HIT PRICE")
 
                 if checking:
+                    self._update_poll_orders()
+
                     print("Checking buy statuses")
                     self.check_buy_orders()
 
@@ -625,6 +788,11 @@ class StaticGridBot(BinanceClient, TimeOperator):
                         print("Checking sell statuses")
                         self.check_sell_orders()
 
+                    if self.recenter and not self.lower_price <= self.current_price <= self.upper_price:
+                        print(f"Price {self.current_price} left the grid, re-centering it")
+                        self.recenter_grid(self.current_price)
+
+                    self._forget_order_updates()
 
                     # self.report_trade_performance()
 
@@ -0,0 +1,61 @@
+from connectors.dispatcher import MessageDispatcher
+
+
+class KlineStreamBot:
+    """
+    Kline stream of the TA bots: frames are queued on a dispatcher and the bot's on_kline_stream runs on its worker
+    thread, the connection runs in the background. Bots set self.client, self.symbol, self.bar_length and
+    self.available_intervals, call init_kline_stream in their constructor and implement get_most_recent and
+    on_kline_stream.
+    """
+
+    def init_kline_stream(self):
+        self.dispatcher = None
+        self.stream = None
+        # Set on a stream reconnect, the next stream message backfills candles missed in the meantime
+        self.backfill_pending = False
+
+    def get_kline_stream(self, symbol, interval):
+        self.client.subscribe_symbol = symbol
+        self.client.subscribe_interval = interval
+
+        # The socket thread only queues frames, strategy and orders run on the dispatcher thread
+        self.dispatcher = MessageDispatcher(self.on_kline_stream, policy=MessageDispatcher.CONFLATE).start()
+
+        return self.client.start_ws(self.client.on_open_kline,
+                                    self.client.on_close,
+                                    self.client.on_error,
+                                    self.dispatcher.on_message,
+                                    reconnect=self.on_stream_reconnect)
+
+    def on_stream_reconnect(self, runner):
+        self.backfill_pending = True
+
+    def add_stream_candle(self, start_time, candle: list):
+        """
+        Add a stream candle to self.data (a new bar or an update of the latest one), the first candle after a
+        reconnect also backfills the candles missed meanwhile
+        """
+        self.data.loc[start_time] = candle
+        if self.backfill_pending:
+            self.backfill_pending = False
+            self.data = self.client.backfill_frame(self.symbol, self.bar_length, self.data)
+
+    def stop_kline_stream(self):
+        """
+        Close the stream and stop the dispatcher, frames still queued are dropped. Callable from on_kline_stream.
+        """
+        self.client.ws.close()
+        if self.dispatcher is not None:
+            self.dispatcher.stop(drain=False)
+
+    def start_trading(self, historical_days, block=True):
+        """
+        :param block: wait until the stream is stopped (trades limit), False returns right away to run more bots
+        """
+        # self.save_balances()
+        if self.bar_length in self.available_intervals:
+            self.get_most_recent(symbol=self.symbol, interval=self.bar_length, days=historical_days)
+            self.stream = self.get_kline_stream(self.symbol, self.bar_length)
+            if block:
+                self.stream.join()
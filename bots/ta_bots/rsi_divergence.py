@@ -2,18 +2,18 @@ import pandas as pd
 import time
 import numpy as np
 import os
-import threading
 import json
 
 from connectors.binanceConnect import BinanceClient
 from time_operators.time_operator import TimeOperator
+from bots.ta_bots.kline_stream_bot import KlineStreamBot
 
 from strategies.ta_indicators.rsi_divergence import RSIDivergenceStrategy
 
 from exit_rules.trading_exit_rules import ExitRules
 
 
-class RSIDiveergenceBOT(BinanceClient, TimeOperator):
+class RSIDiveergenceBOT(KlineStreamBot, BinanceClient, TimeOperator):
     def __init__(self,
                  key: str,
                  secret: str,
@@ -88,6 +88,7 @@ class RSIDiveergenceBOT(BinanceClient, TimeOperator):
         self.trailing_stop_loss_long = pd.DataFrame(columns=['ST_long_price'])
         self.trailing_stop_loss_short = pd.DataFrame(columns=['ST_short_price'])
         self.ws = None
+        self.init_kline_stream()
         self.prepared_data = None
 
         # STOP LOSS
@@ -165,7 +166,7 @@ class RSIDiveergenceBOT(BinanceClient, TimeOperator):
 
             # stop trading session
             if self.trades >= self.trades_limit:  # stop stream after trades limit
-                self.client.ws.close()
+                self.stop_kline_stream()
                 # self.save_balances()
                 if self.position == 1:
                     order = self.client.sell_order(symbol=self.symbol, side="SELL", type="MARKET",
@@ -181,7 +182,7 @@ class RSIDiveergenceBOT(BinanceClient, TimeOperator):
                     print("STOP")
 
             # Feed self.data historic data with websocket data (add new bar / update latest bar)
-            self.data.loc[start_time] = [open, high, low, close, volume, complete]
+            self.add_stream_candle(start_time, [open, high, low, close, volume, complete])
             print(f"Last Close price of {self.symbol} : {self.data['Close'].iloc[-1]} | Position: {self.position}")
 
             # Prepare features and define strategy/trading positions whenever the latest bar is complete
@@ -560,33 +561,3 @@ class RSIDiveergenceBOT(BinanceClient, TimeOperator):
         print("{} | Base_Units = {} | Quote_Units = {} | Price = {} ".format(time, base_units, quote_units, price))
         print("{} | Profit = {} | CumProfits = {} ".format(time, real_profit, self.cum_profits))
         print(100 * "-" + "\n")
-
-    def get_kline_stream(self, symbol, interval):
-        self.client.subscribe_symbol = symbol
-        self.client.subscribe_interval = interval
-
-        try:
-            t = threading.Thread(target=self.client.start_ws(
-                self.client.on_open_kline,
-                self.client.on_close,
-                self.client.on_error,
-                self.on_kline_stream
-            ))
-            t.start()
-        except TimeoutError:
-            print("Probably WebSocket connection timed out. Waiting for resuming...")
-            time.sleep(2)
-            print("Resuming connection...")
-            t = threading.Thread(target=self.client.start_ws(
-                self.client.on_open_kline,
-                self.client.on_close,
-                self.client.on_error,
-                self.on_kline_stream
-            ))
-            t.start()
-
-    def start_trading(self, historical_days):
-        # self.save_balances()
-        if self.bar_length in self.available_intervals:
-            self.get_most_recent(symbol=self.symbol, interval=self.bar_length, days=historical_days)
-            self.get_kline_stream(self.symbol, self.bar_length)
@@ -0,0 +1,220 @@
+import asyncio
+import aiohttp
+import json
+import hmac
+import hashlib
+from urllib.parse import urlencode
+
+from time_operators.time_operator import TimeOperator
+from connectors.kline_decoder import decode_kline_pages, columns_to_frame
+from connectors.rate_limiter import RateLimiter
+from connectors.order_params import order_params
+
+
+class AsyncBinanceClient:
+    """ Asyncio version of the BinanceClient REST API, every request method is a coroutine """
+
+    def __init__(self, public_key, secret_key, testnet=True, pool_size=200, request_timeout=10, rate_limiter=None,
+                 base_url=None):
+        if testnet:
+            self.base_url = "https://testnet.binance.vision"
+        else:
+            self.base_url = "https://api.binance.com"
+        if base_url is not None:
+            self.base_url = base_url
+
+        self.public_key = public_key
+        self.secret_key = secret_key
+        self.headers = {'X-MBX-APIKEY': self.public_key}
+        self.pool_size = pool_size
+        self.request_timeout = request_timeout
+
+        self.available_intervals = ["1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d", "3d",
+                                    "1w", "1M"]
+        self.time = TimeOperator()
+        self.session = None
+        # Shared with the blocking clients of the same host
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter.shared(self.base_url)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns a keep-alive session, created lazily because it has to live inside the running event loop
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 headers=self.headers,
+                                                 timeout=aiohttp.ClientTimeout(total=self.request_timeout))
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    def generate_signature(self, data):
+        """
+        :param data: Header for request to API
+        :return: Encrypted string
+        """
+        return hmac.new(self.secret_key.encode(), urlencode(data).encode(), hashlib.sha256).hexdigest()
+
+    def sign(self, data: dict) -> dict:
+        data["timestamp"] = self.time.generate_current_timestamp()
+        data["signature"] = self.generate_signature(data)
+        return data
+
+    async def make_request(self, method, endpoint, data=None, raw=False, signed=False):
+        """
+        :param signed: sign the parameters once the rate limiter lets the request go, so a request that waited
+                       for the limiter doesn't reach the exchange with a stale timestamp (outside recvWindow)
+        """
+        if method not in ["GET", "POST", "DELETE"]:
+            raise ValueError()
+
+        wait = self.rate_limiter.reserve(method, endpoint, data)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if signed:
+            data = self.sign(dict(data or {}))
+
+        try:
+            async with self.get_session().request(method, self.base_url + endpoint, params=data) as response:
+                content = await response.read()
+                status_code = response.status
+                self.rate_limiter.update(response.headers)
+                if status_code in [418, 429]:
+                    self.rate_limiter.ban(response.headers.get("Retry-After"))
+        except Exception as e:
+            print(f"Error while making {method} request to: {endpoint}, with data: {data} of: {e}")
+            return None
+
+        if status_code == 200:
+            return content if raw else json.loads(content)
+        else:
+            print(f"Error while making {method} request to {endpoint} : {content} - status code: {status_code}")
+
+    # REST API ---------------------------------------------------------------------------------------------------------
+
+    async def get_historicals(self, symbol: str, period: str, start: int, end=None, dataframe=True, limit=1000,
+                              logs=False, workers=10, arrays=False):
+        """
+        Returns a DataFrame or a List of historical candlestick of a chosen asset, pages are fetched concurrently
+
+        :param workers: max number of pages in flight at the same time
+        :param arrays: return a dict of column arrays and skip building the DataFrame
+        """
+        if logs:
+            print(f"Fetching asset data of symbol: {symbol}, period: {period}, start: {start}, end: {end}")
+
+        if end is None:
+            end = self.time.generate_current_timestamp()
+
+        in_flight = asyncio.Semaphore(int(workers))
+
+        async def fetch_page(page_start, page_end):
+            params = {
+                "symbol": str(symbol),
+                "interval": str(period),
+                "startTime": int(page_start),
+                "endTime": int(page_end),
+                "limit": int(limit),
+            }
+            async with in_flight:
+                candle = await self.make_request("GET", "/api/v3/klines", params, raw=dataframe or arrays)
+            if candle is None:
+                raise ConnectionError(f"No klines returned for page {page_start} - {page_end}")
+            return candle
+
+        try:
+            pages = self.time.split_period(start, end, period, limit)
+            results = await asyncio.gather(*[fetch_page(page_start, page_end) for page_start, page_end in pages])
+        except Exception as e:
+            print(f"Could not fetch historic data of symbol: {symbol}, period: {period}, start: {start} of {e}")
+            return None
+
+        if not dataframe and not arrays:
+            candles = []
+            for page in results:
+                for candle in page:
+                    if candles and candle[0] <= candles[-1][0]:
+                        continue
+                    candles.append(candle)
+            return candles
+
+        columns = decode_kline_pages(results)
+        if arrays:
+            return columns
+
+        df = columns_to_frame(columns)
+        if logs:
+            print(df)
+
+        return df
+
+    async def get_current_price(self, tick):
+        """
+        Returns latest price (float) for a symbol
+        """
+        ticker = await self.make_request("GET", "/api/v3/ticker/price", {"symbol": str(tick)})
+        if ticker is not None:
+            return float(ticker['price'])
+
+    async def get_order_status(self, symbol, orderId):
+        """
+        Returns a status of an order, based on OrderId
+        """
+        data = {"symbol": str(symbol), "orderId": str(orderId)}
+
+        status = await self.make_request("GET", "/api/v3/order", data, signed=True)
+        if status is None:
+            print("Returned None order status.")
+        return status
+
+    async def cancel_order(self, symbol, orderId):
+        """
+        Cancels an order and returns canceled order status
+        """
+        data = {"symbol": str(symbol), "orderId": str(orderId)}
+
+        status = await self.make_request("DELETE", "/api/v3/order", data, signed=True)
+        if status is None:
+            print("Returned None order status.")
+        return status
+
+    async def cancel_all_orders(self, symbol):
+        data = {"symbol": str(symbol)}
+
+        status = await self.make_request("DELETE", "/api/v3/openOrders", data, signed=True)
+        if status is None:
+            print("Returned None order status.")
+        return status
+
+    async def buy_order(self, symbol, side="BUY", type="MARKET", timeInForce="GTC", price=0.0, amount=0.0,
+                        quantity_type="quantity"):
+        """
+        Make a BUY order
+        """
+        try:
+            data = order_params(symbol, side, type, timeInForce, price, amount, quantity_type)
+            return await self.make_request("POST", "/api/v3/order", data, signed=True)
+        except Exception as e:
+            print(f"Couldn't handle {side} request of type {type}, with symbol {symbol} and quantity_type "
+                  f"{quantity_type} with error {e}")
+
+    async def sell_order(self, symbol, side="SELL", type="MARKET", timeInForce="GTC", price=0.0, amount=0.0,
+                         quantity_type="quantity"):
+        """
+        Make a SELL order
+        """
+        try:
+            data = order_params(symbol, side, type, timeInForce, price, amount, quantity_type)
+            return await self.make_request("POST", "/api/v3/order", data, signed=True)
+        except Exception as e:
+            print(f"Couldn't handle {side} request of type {type}, with symbol {symbol} and quantity_type "
+                  f"{quantity_type} with error {e}")
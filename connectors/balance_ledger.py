@@ -0,0 +1,111 @@
+import time
+import threading
+
+
+class BalanceLedger:
+    """
+    In-memory free / locked balances of the account. Seeded from /api/v3/account, kept current by the
+    outboundAccountPosition (sent after every fill) and balanceUpdate events of the user data stream
+    and reconciled with the exchange periodically and after every reconnect of the stream. Without a stream every read
+    reconciles.
+    """
+
+    def __init__(self, client, user_stream=None, reconcile_interval=300):
+        """
+        :param user_stream: UserDataStream feeding the ledger, one can also be attached later
+        :param reconcile_interval: max age of the ledger in seconds before it's downloaded again
+        """
+        self.client = client
+        self.user_stream = None
+        self.reconcile_interval = reconcile_interval
+        self.lock = threading.Lock()
+        self.reconcile_lock = threading.Lock()
+        self.updated = None
+        self.stream_connections = 0
+
+        self.free = dict()
+        self.locked = dict()
+        # Last event time of every asset, a snapshot older than an event doesn't overwrite it
+        self.update_times = dict()
+
+        if user_stream is not None:
+            self.attach(user_stream)
+
+    def attach(self, user_stream):
+        """
+        Feed the ledger from a user data stream, it's reconciled once the stream is connected
+        """
+        user_stream.account_positions(self.on_account_position)
+        user_stream.subscribe("balanceUpdate", self.on_balance_update)
+        self.user_stream = user_stream
+
+    def is_stale(self) -> bool:
+        if self.updated is None or self.user_stream is None or not self.user_stream.connected:
+            return True
+        if self.user_stream.connections != self.stream_connections:
+            return True
+        return time.monotonic() - self.updated > self.reconcile_interval
+
+    def reconcile(self) -> bool:
+        """
+        Replace the ledger with the balances of the exchange
+        """
+        connections = self.user_stream.connections if self.user_stream is not None else 0
+        account = self.client.get_account_details()
+        if account is None:
+            print("Could not reconcile account balances.")
+            return False
+
+        account_time = int(account.get("updateTime", 0))
+        with self.lock:
+            for balance in account["balances"]:
+                asset = balance["asset"]
+                if self.update_times.get(asset, 0) > account_time:
+                    continue
+                self.free[asset] = float(balance["free"])
+                self.locked[asset] = float(balance["locked"])
+            self.updated = time.monotonic()
+            self.stream_connections = connections
+
+        return True
+
+    def ensure_fresh(self):
+        if self.is_stale():
+            with self.reconcile_lock:
+                if self.is_stale():
+                    self.reconcile()
+
+    # STREAM EVENTS ----------------------------------------------------------------------------------------------------
+
+    def on_account_position(self, event: dict):
+        with self.lock:
+            for balance in event["B"]:
+                self.free[balance["a"]] = float(balance["f"])
+                self.locked[balance["a"]] = float(balance["l"])
+                self.update_times[balance["a"]] = int(event["u"])
+
+    def on_balance_update(self, event: dict):
+        with self.lock:
+            self.free[event["a"]] = self.free.get(event["a"], 0.0) + float(event["d"])
+            self.update_times[event["a"]] = int(event["T"])
+
+    # QUERIES ----------------------------------------------------------------------------------------------------------
+
+    def balances(self) -> dict:
+        """
+        Returns free balances of all assets
+        """
+        self.ensure_fresh()
+        with self.lock:
+            return dict(self.free)
+
+    def free_balance(self, asset: str):
+        """
+        Returns the free balance of an asset or None if the account doesn't hold it
+        """
+        self.ensure_fresh()
+        return self.free.get(str(asset).upper())
+
+    def locked_balance(self, asset: str):
+        self.ensure_fresh()
+        return self.locked.get(str(asset).upper())
@@ -1,18 +1,37 @@
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
 from time_operators.time_operator import TimeOperator
+from storage.kline_store import KlineStore
+from storage.tick_store import TickStore, decode_agg_trades
+from connectors.kline_decoder import decode_kline_pages, columns_to_frame, select_rows, concat_columns
+from connectors.kline_integrity import check_klines, find_gaps, sort_unique
+from connectors.rate_limiter import RateLimiter
+from connectors.stream_manager import StreamManager
+from connectors.exchange_info import ExchangeInfo
+from connectors.order_book import OrderBookManager
+from connectors.user_data_stream import UserDataStream
+from connectors.balance_ledger import BalanceLedger
+from connectors.dispatcher import MessageDispatcher
+from connectors.stream_runner import StreamRunner
+from connectors.ticker_service import TickerService
+from connectors.order_params import order_params
 import hmac
 import hashlib
 from urllib.parse import urlencode
 
-import websocket
-import threading
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 
 class BinanceClient:
-    def __init__(self, public_key, secret_key, testnet=True):
+    def __init__(self, public_key, secret_key, testnet=True, pool_size=20, max_retries=3, backoff_factor=0.5,
+                 request_timeout=10, kline_cache_dir="./data/klines", rate_limiter=None, exchange_info_ttl=3600,
+                 use_user_data_stream=False, balance_reconcile_interval=300, base_url=None, wss_base_url=None,
+                 recorder=None, tick_store_dir="./data/ticks", ticker_ttl=500):
         if testnet:
             self.base_url = "https://testnet.binance.vision"
             self.wss_url = "wss://testnet.binance.vision/ws"
@@ -22,18 +41,47 @@ class BinanceClient:
             self.wss_url = "wss://stream.binance.com:9443/ws"
             self.wss_stream_url = "wss://stream.binance.com:9443/stream"
 
+        # Other hosts speaking the same API, e.g. the local simulator
+        if base_url is not None:
+            self.base_url = base_url
+        if wss_base_url is not None:
+            self.wss_url = wss_base_url + "/ws"
+            self.wss_stream_url = wss_base_url + "/stream"
+
         self.public_key = public_key
         self.secret_key = secret_key
         self.headers = {'X-MBX-APIKEY': self.public_key}
+        self.request_timeout = request_timeout
+        self.pool_size = pool_size
+        self.session = self.create_session(pool_size, max_retries, backoff_factor)
+        # Clients of the same host share one limiter unless a dedicated one is passed
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter.shared(self.base_url)
 
         self.available_intervals = ["1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d", "3d",
                                     "1w", "1M"]
         self.time = TimeOperator()
+        self.kline_store = KlineStore(kline_cache_dir) if kline_cache_dir is not None else None
+        self.tick_store = TickStore(tick_store_dir) if tick_store_dir is not None else None
+        self.exchange_info = ExchangeInfo(self, ttl=exchange_info_ttl)
 
         self.prices = dict()
         self.klines = dict()
         self.ws_id = 1
         self.ws = None
+        # Optional JournalWriter receiving every raw websocket frame
+        self.recorder = recorder
+        self.dispatcher = None
+        self.stream_manager = None
+        self.order_books = None
+        self.user_data_stream = None
+        # Balances are read from a local ledger, fed by the user data stream once one runs: use_user_data_stream
+        # starts it with the ledger, bots start it for their order updates. Otherwise every read is a REST request.
+        self.use_user_data_stream = use_user_data_stream
+        self.balance_reconcile_interval = balance_reconcile_interval
+        self.balance_ledger = None
+        # Milliseconds a REST ticker price is reused, the service is shared by the clients of a host
+        self.ticker_ttl = ticker_ttl
+        self.ticker_service = None
 
     def generate_signature(self, data):
         """
@@ -42,30 +90,71 @@ class BinanceClient:
         """
         return hmac.new(self.secret_key.encode(), urlencode(data).encode(), hashlib.sha256).hexdigest()
 
-    def make_request(self, method, endpoint, data=None):
-        if method == "GET":
-            try:
-                response = requests.get(self.base_url + endpoint, params=data, headers=self.headers)
-            except Exception as e:
-                print(f"Error while making {method} request to: {endpoint}, with data: {data} of: {e}")
-        elif method == "POST":
-            try:
-                response = requests.post(self.base_url + endpoint, params=data, headers=self.headers)
-            except Exception as e:
-                print(f"Error while making {method} request to: {endpoint}, with data: {data} of: {e}")
-        elif method == "DELETE":
-            try:
-                response = requests.delete(self.base_url + endpoint, params=data, headers=self.headers)
-            except Exception as e:
-                print(f"Error while making {method} request to: {endpoint}, with data: {data} of: {e}")
-        else:
+    def create_session(self, pool_size, max_retries, backoff_factor) -> requests.Session:
+        """
+        Returns a keep-alive HTTP session with a connection pool shared by all REST methods
+
+        :param pool_size: max number of pooled connections kept open to the API host
+        :param max_retries: number of transport-level retries (connection errors and 5xx responses)
+        :param backoff_factor: exponential backoff factor between retries, in seconds
+        """
+        # Only idempotent methods are retried after the request reached the server, orders (POST) are retried
+        # on connection errors only so they are never placed twice
+        retry = Retry(total=max_retries,
+                      connect=max_retries,
+                      read=max_retries,
+                      status=max_retries,
+                      backoff_factor=backoff_factor,
+                      status_forcelist=[500, 502, 503, 504],
+                      allowed_methods=["GET", "DELETE", "PUT"],
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+
+        return session
+
+    def make_request(self, method, endpoint, data=None, raw=False, signed=False):
+        """
+        :param signed: sign the parameters once the rate limiter lets the request go, so a request that waited
+                       for the limiter doesn't reach the exchange with a stale timestamp (outside recvWindow)
+        """
+        if method not in ["GET", "POST", "PUT", "DELETE"]:
             raise ValueError()
 
+        self.rate_limiter.acquire(method, endpoint, data)
+        if signed:
+            data = dict(data or {})
+            data["timestamp"] = self.time.generate_current_timestamp()
+            data["signature"] = self.generate_signature(data)
+
+        try:
+            response = self.session.request(method, self.base_url + endpoint, params=data,
+                                            timeout=self.request_timeout)
+        except Exception as e:
+            print(f"Error while making {method} request to: {endpoint}, with data: {data} of: {e}")
+            return None
+
+        self.rate_limiter.update(response.headers)
+        if response.status_code in [418, 429]:
+            self.rate_limiter.ban(response.headers.get("Retry-After"))
+
         if response.status_code == 200:
-            return response.json()
+            return response.content if raw else response.json()
         else:
-            print(f"Error while making {method} request to {endpoint} : {response.json()} - status code:"
+            # 5xx and ban responses may carry an HTML page or no body at all, so the body isn't parsed as JSON
+            print(f"Error while making {method} request to {endpoint} : {response.text} - status code:"
                   f" {response.status_code}")
+            return None
+
+    def close(self):
+        """
+        Closes all pooled connections of the client
+        """
+        self.session.close()
 
     # REST API ---------------------------------------------------------------------------------------------------------
 
@@ -73,119 +162,362 @@ class BinanceClient:
         """
         Returns a list of SPOT/MARGIN (not LEVERAGED) USDT symbols and related to them attributes from Binance API
         """
-        exchange_info = self.make_request("GET", "/api/v3/exchangeInfo")
-        contracts = list()
+        leveraged = set(self.exchange_info.symbols(permission="LEVERAGED"))
+        return [symbol for symbol in self.exchange_info.symbols(quote_asset="USDT") if symbol not in leveraged]
+
+    def get_symbol_filters(self, symbol: str):
+        """
+        Returns cached trading rules (tick size, step size, min notional) of a symbol or None
+        """
+        return self.exchange_info.get(symbol)
+
+    def round_price(self, symbol: str, price: float) -> float:
+        """
+        Round a price to the tick size of a symbol
+        """
+        filters = self.get_symbol_filters(symbol)
+        return filters.round_price(price) if filters is not None else float(price)
+
+    def round_quantity(self, symbol: str, quantity: float) -> float:
+        """
+        Round a quantity down to the lot step size of a symbol
+        """
+        filters = self.get_symbol_filters(symbol)
+        return filters.round_quantity(quantity) if filters is not None else float(quantity)
+
+    def plan_kline_pages(self, period: str, start: int, end: int, limit=1000) -> list:
+        """
+        Returns a list of (startTime, endTime) windows covering [start, end], each holding at most `limit` candles.
+        Windows don't overlap, so no candle is requested twice at page boundaries.
+        """
+        return self.time.split_period(start, end, period, limit)
+
+    def fetch_kline_pages(self, symbol: str, period: str, pages: list, limit=1000, workers=1, raw=False) -> list:
+        """
+        Fetches planned kline pages and returns the raw candles in time order with duplicates removed
 
-        if exchange_info is not None:
-            for contract_data in exchange_info['symbols']:
-                if "USDT" in str(contract_data['symbol']) and "LEVERAGED" not in str(contract_data['permissions']):
-                    contracts.append(contract_data['symbol'])
+        :param pages: list of (startTime, endTime) windows, see plan_kline_pages
+        :param workers: size of the worker pool, 1 fetches pages one after another. The rate limiter of the client
+                        keeps the pool under the request-weight budget.
+        :param raw: return the undecoded JSON body of every page instead, see kline_decoder.decode_kline_pages
+        """
+        def fetch_page(page_number):
+            page_start, page_end = pages[page_number]
+            params = {
+                "symbol": str(symbol),
+                "interval": str(period),
+                "startTime": int(page_start),
+                "endTime": int(page_end),
+                "limit": int(limit),
+            }
+            candle = self.make_request("GET", "/api/v3/klines", params, raw=raw)
+            if candle is None:
+                raise ConnectionError(f"No klines returned for page {page_start} - {page_end}")
+            return candle
+
+        if workers > 1 and len(pages) > 1:
+            with ThreadPoolExecutor(max_workers=min(int(workers), len(pages))) as executor:
+                results = list(executor.map(fetch_page, range(len(pages))))
+        else:
+            results = [fetch_page(page_number) for page_number in range(len(pages))]
+
+        if raw:
+            return results
+
+        candles = []
+        last_open_time = None
+        for page in results:
+            for candle in page:
+                # Pages are ordered and don't overlap, so a duplicate can only follow its twin
+                if last_open_time is not None and candle[0] <= last_open_time:
+                    continue
+                candles.append(candle)
+                last_open_time = candle[0]
 
-        return contracts
+        return candles
 
-    def get_historicals(self, symbol: str, period: str, start: int, end=None, dataframe=True, limit=1000, logs=False):
+    def fetch_kline_columns(self, symbol: str, period: str, start: int, end: int, limit=1000, workers=1) -> dict:
+        """
+        Fetches klines in [start, end] decoded straight into column arrays (int64 open_time, float64 OHLCV)
+        """
+        pages = self.plan_kline_pages(period, start, end, limit)
+        return decode_kline_pages(self.fetch_kline_pages(symbol, period, pages, limit, workers, raw=True))
+
+    def get_historicals(self, symbol: str, period: str, start: int, end=None, dataframe=True, limit=1000, logs=False,
+                        workers=1, arrays=False):
         """
         Returns a DataFrame or a List of historical candlestick of a chosen asset
+
+        :param workers: number of pages fetched in parallel, all the pages are planned up front
+        :param arrays: return a dict of column arrays (open_time, open, high, low, close, volume) and skip
+                       building the DataFrame
         """
         if logs:
             print(f"Fetching asset data of symbol: {symbol}, period: {period}, start: {start}, end: {end}")
 
-        candles = []
-        if dataframe:
+        if end is None:
+            end = self.time.generate_current_timestamp()
+
+        if not dataframe and not arrays:
             try:
-                current_start = start
-                current_end = self.time.period_to_timestamp(current_start, period, limit)
-                get_data = 0
-
-                while get_data < 2:
-                    params = {
-                        "symbol": str(symbol),
-                        "interval": str(period),
-                        "startTime": int(current_start),
-                        "endTime": int(current_end),
-                        "limit": int(limit),
-                    }
-
-                    if get_data == 1:
-                        candle = self.make_request("GET", "/api/v3/klines", params)
-                        candles.append(pd.DataFrame(candle))
-                        get_data += 1
-                        break
-                    elif get_data < 2:
-                        candle = self.make_request("GET", "/api/v3/klines", params)
-                        candles.append(pd.DataFrame(candle))
-
-                    current_start = current_end
-                    current_end = self.time.period_to_timestamp(current_start, period, limit)
-                    if current_end > end:
-                        current_end = end
-                        get_data += 1
-
-                columns = ["Open Time", "Open", "High", "Low", "Close", "Volume",
-                           "Clos Time", "Quote Asset Volume", "Number of Trades",
-                           "Taker Buy Base Asset Volume", "Taker Buy Quote Asset Volume", "Ignore"]
-
-                df = pd.DataFrame(columns=columns)
-
-                all_res = []
-                for s_candle in candles:
-                    all_res.append(s_candle)
-
-                df = pd.concat(all_res)
-                df["Date"] = pd.to_datetime(df.iloc[:, 0], unit="ms")
-                df.columns = ["Open Time", "Open", "High", "Low", "Close", "Volume",
-                              "Clos Time", "Quote Asset Volume", "Number of Trades",
-                              "Taker Buy Base Asset Volume", "Taker Buy Quote Asset Volume", "Ignore", "Date"]
-                df = df[["Date", "Open", "High", "Low", "Close", "Volume"]].copy()
-                df.set_index("Date", inplace=True)
-                for column in df.columns:
-                    df[column] = pd.to_numeric(df[column], errors="coerce")
-                df["Complete"] = [True for row in range(len(df) - 1)] + [False]
-                df.dropna(inplace=True)
+                pages = self.plan_kline_pages(period, start, end, limit)
+                candles = self.fetch_kline_pages(symbol, period, pages, limit, workers)
+            except Exception as e:
+                print(f"Could not fetch historic data of symbol: {symbol}, period: {period}, start: {start} of {e}")
+                return None
+
+            if logs:
+                print(candles)
+
+            return candles
+
+        try:
+            if self.kline_store is not None:
+                columns = self.get_cached_klines(symbol, period, start, end, limit, workers)
+            else:
+                columns = self.fetch_kline_columns(symbol, period, start, end, limit, workers)
+            columns = self.backfill_klines(symbol, period, columns, limit, workers, logs)
+
+            if arrays:
+                return columns
+
+            df = columns_to_frame(columns)
+            if logs:
+                print(df)
 
+            return df
+
+        except Exception as e:
+            print(f"Could not fetch historic DataFrame of symbol: {symbol}, period: {period}, start: {start} of {e}")
+
+    def get_cached_klines(self, symbol: str, period: str, start: int, end: int, limit=1000, workers=1) -> dict:
+        """
+        Returns a dict of kline column arrays in [start, end], reading the range covered by the local kline store
+        and requesting only the missing head or tail from the API
+        """
+        interval_ms = self.time.interval_to_milliseconds(period)
+        # Candles opened until then are closed, later ones are still changing and never get cached
+        complete_until = self.time.generate_current_timestamp() - interval_ms
+
+        coverage = self.kline_store.coverage(symbol, period)
+        missing = []
+        if coverage is None:
+            missing.append((start, end))
+        else:
+            if start < coverage[0]:
+                missing.append((start, coverage[0] - 1))
+            if end > coverage[1]:
+                missing.append((coverage[1] + 1, end))
+
+        fresh = []
+        for missing_start, missing_end in missing:
+            columns = self.fetch_kline_columns(symbol, period, missing_start, missing_end, limit, workers)
+            fresh.append(columns)
+
+            if missing_start <= complete_until:
+                self.kline_store.write(symbol, period, select_rows(columns, columns["open_time"] <= complete_until),
+                                       missing_start, min(missing_end, complete_until))
+
+        columns = self.kline_store.read(symbol, period, start, end)
+
+        # Append the candles which are not complete yet
+        coverage = self.kline_store.coverage(symbol, period)
+        covered_until = coverage[1] if coverage is not None else start - 1
+        for fresh_columns in fresh:
+            open_time = fresh_columns["open_time"]
+            pending = select_rows(fresh_columns, (open_time > covered_until) & (open_time <= end))
+            if len(pending["open_time"]):
+                columns = concat_columns(columns, pending)
+
+        return columns
+
+    def backfill_klines(self, symbol: str, period: str, columns: dict, limit=1000, workers=1, logs=False) -> dict:
+        """
+        Checks kline columns for duplicated, unordered and missing candles, requests only the missing ranges and
+        returns the repaired columns. Backfilled complete candles inside the range of the kline store are stored too,
+        ranges the exchange has no candles for are remembered by the store and not requested again.
+        """
+        # Calendar months have no fixed length
+        if period == "1M" or len(columns["open_time"]) < 2:
+            return columns
+
+        interval_ms = self.time.interval_to_milliseconds(period)
+        report = check_klines(columns["open_time"], interval_ms)
+        if not report["ordered"]:
+            if logs:
+                print(f"Klines of {symbol} {period}: {len(report['duplicates'])} duplicated open times, reordering.")
+            columns = sort_unique(columns)
+
+        known_empty = self.kline_store.empty_ranges(symbol, period) if self.kline_store is not None else []
+        gaps = [(gap_start, gap_end) for gap_start, gap_end in report["gaps"]
+                if not any(start <= gap_start and gap_end <= end for start, end in known_empty)]
+        if not gaps:
+            return columns
+
+        if logs:
+            missing = sum((gap_end - gap_start) // interval_ms + 1 for gap_start, gap_end in gaps)
+            print(f"Klines of {symbol} {period}: {missing} candles missing in {len(gaps)} gaps, backfilling.")
+
+        pages = [page for gap_start, gap_end in gaps
+                 for page in self.plan_kline_pages(period, gap_start, gap_end, limit)]
+        try:
+            fetched = decode_kline_pages(self.fetch_kline_pages(symbol, period, pages, limit, workers, raw=True))
+        except Exception as e:
+            print(f"Could not backfill klines of symbol: {symbol}, period: {period} of {e}")
+            return columns
+        if len(fetched["open_time"]):
+            columns = sort_unique(concat_columns(columns, fetched))
+
+        if self.kline_store is not None:
+            coverage = self.kline_store.coverage(symbol, period)
+            if coverage is not None:
+                in_store = (fetched["open_time"] >= coverage[0]) & (fetched["open_time"] <= coverage[1])
+                if in_store.any():
+                    stored = select_rows(fetched, in_store)
+                    self.kline_store.write(symbol, period, stored, int(stored["open_time"][0]),
+                                           int(stored["open_time"][-1]))
+
+            # Exchange downtime leaves gaps that can't be filled
+            unfilled = [(gap_start, gap_end) for gap_start, gap_end in find_gaps(columns["open_time"], interval_ms)
+                        if any(start <= gap_start and gap_end <= end for start, end in gaps)]
+            if unfilled:
                 if logs:
-                    print(df)
+                    print(f"Klines of {symbol} {period}: {len(unfilled)} gaps have no candles on the exchange.")
+                self.kline_store.mark_empty(symbol, period, unfilled)
+
+        return columns
+
+    def backfill_frame(self, symbol: str, period: str, df: pd.DataFrame, limit=1000, logs=False) -> pd.DataFrame:
+        """
+        Repairs a historicals DataFrame updated by a stream (e.g. after a reconnect): drops duplicated dates and
+        requests the missing candles and the older candles which never got complete
+        """
+        if period == "1M" or len(df) < 2:
+            return df
+
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+        interval_ms = self.time.interval_to_milliseconds(period)
+        open_time = df.index.values.astype("datetime64[ms]").astype(np.int64)
+
+        ranges = check_klines(open_time, interval_ms)["gaps"]
+        if "Complete" in df.columns:
+            ranges += [(int(t), int(t)) for t in open_time[:-1][~df["Complete"].values[:-1].astype(bool)]]
+        if not ranges:
+            return df
+
+        # Pages have to be in time order, see decode_kline_pages
+        pages = [page for range_start, range_end in sorted(ranges)
+                 for page in self.plan_kline_pages(period, range_start, range_end, limit)]
+        try:
+            fetched = decode_kline_pages(self.fetch_kline_pages(symbol, period, pages, limit, raw=True))
+        except Exception as e:
+            print(f"Could not backfill klines of symbol: {symbol}, period: {period} of {e}")
+            return df
+        if not len(fetched["open_time"]):
+            return df
 
-                return df
+        if logs:
+            print(f"Backfilled {len(fetched['open_time'])} candles of {symbol} {period}")
+        frame = columns_to_frame(fetched)
+        frame["Complete"] = True
+        frame = frame[df.columns.intersection(frame.columns)]
 
-            except:
-                print(f"Could not fetch historic DataFrame of symbol: {symbol}, period: {period}, start: {start}")
+        return pd.concat([df.drop(frame.index, errors="ignore"), frame]).sort_index()
 
+    def fetch_agg_trades(self, symbol: str, from_id=None, start=None, end=None, limit=1000) -> list:
+        """
+        Returns one page of raw aggregated trades, starting at an aggregate trade id or in a [start, end] window
+        of at most an hour
+        """
+        params = {"symbol": str(symbol), "limit": int(limit)}
+        if from_id is not None:
+            params["fromId"] = int(from_id)
         else:
-            try:
-                current_start = start
-                current_end = self.time.period_to_timestamp(current_start, period, limit)
-                get_data = 0
-
-                while get_data < 2:
-                    params = {
-                        "symbol": str(symbol),
-                        "interval": str(period),
-                        "startTime": int(current_start),
-                        "endTime": int(current_end),
-                        "limit": int(limit),
-                    }
-
-                    if get_data == 1:
-                        candle = self.make_request("GET", "/api/v3/klines", params)
-                        get_data += 1
-                        break
-                    elif get_data < 2:
-                        candle = self.make_request("GET", "/api/v3/klines", params)
-
-                    current_start = current_end
-                    current_end = self.time.period_to_timestamp(current_start, period, limit)
-                    if current_end > end:
-                        current_end = end
-                        get_data += 1
+            params["startTime"] = int(start)
+            params["endTime"] = int(end)
+
+        trades = self.make_request("GET", "/api/v3/aggTrades", params)
+        if trades is None:
+            raise ConnectionError(f"No aggTrades returned for {symbol}, fromId: {from_id}, window: {start} - {end}")
+        return trades
+
+    def fetch_agg_trade_window(self, symbol: str, start: int, end: int, limit=1000) -> list:
+        """
+        Returns all raw aggregated trades in a [start, end] window of at most an hour, a full page is continued by id
+        """
+        trades = self.fetch_agg_trades(symbol, start=start, end=end, limit=limit)
+        page = trades
+        while len(page) == limit:
+            page = self.fetch_agg_trades(symbol, from_id=trades[-1]["a"] + 1, limit=limit)
+            in_window = [trade for trade in page if trade["T"] <= end]
+            trades.extend(in_window)
+            if len(in_window) < len(page):
+                break
+
+        return trades
+
+    def fetch_agg_trade_columns(self, symbol: str, start: int, end: int, limit=1000, workers=1) -> dict:
+        """
+        Fetches aggregated trades in [start, end] into column arrays (agg_id, time, price, quantity, maker)
+
+        :param workers: number of one hour windows fetched in parallel, the rate limiter of the client keeps the pool
+                        under the request-weight budget
+        """
+        windows = self.time.split_period(start, end, "1h", 1)
+
+        def fetch_window(window):
+            return self.fetch_agg_trade_window(symbol, window[0], window[1], limit)
+
+        if workers > 1 and len(windows) > 1:
+            with ThreadPoolExecutor(max_workers=min(int(workers), len(windows))) as executor:
+                results = list(executor.map(fetch_window, windows))
+        else:
+            results = [fetch_window(window) for window in windows]
+
+        columns = decode_agg_trades([trade for trades in results for trade in trades])
+
+        # Windows don't overlap but trades can be listed twice when a window was continued by id
+        agg_id = columns["agg_id"]
+        if len(agg_id) > 1 and not (agg_id[1:] > agg_id[:-1]).all():
+            order = np.argsort(agg_id, kind="stable")
+            keep = np.ones(len(order), dtype=bool)
+            keep[1:] = agg_id[order][1:] != agg_id[order][:-1]
+            columns = {column: values[order[keep]] for column, values in columns.items()}
+
+        return columns
 
+    def get_agg_trades(self, symbol: str, start: int, end=None, limit=1000, workers=1, logs=False):
+        """
+        Returns a dict of aggregated trade column arrays (agg_id, time, price, quantity, maker) in [start, end].
+        With a tick store only trades newer than the stored ones are requested, appended to the store and the
+        result is memory-mapped from it.
+        """
+        if end is None:
+            end = self.time.generate_current_timestamp()
+
+        try:
+            if self.tick_store is None:
+                return self.fetch_agg_trade_columns(symbol, start, end, limit, workers)
+
+            meta = self.tick_store.meta(symbol)
+            if meta is not None and meta["rows"]:
+                if start < meta["start"]:
+                    print(f"Tick store of {symbol} starts at {meta['start']}, older trades are not stored.")
+                # The store is appended without id gaps, so the next request continues at the last stored trade
+                fetch_start = meta["end"]
+            else:
+                fetch_start = start
+
+            if end >= fetch_start:
+                columns = self.fetch_agg_trade_columns(symbol, fetch_start, end, limit, workers)
+                appended = self.tick_store.append(symbol, columns)
                 if logs:
-                    print(candles)
+                    print(f"Stored {appended} aggregated trades of {symbol}")
 
-                return candles
+            return self.tick_store.read(symbol, start, end)
 
-            except:
-                print(f"Could not fetch historic DataFrame of symbol: {symbol}, period: {period}, start: {start}")
+        except Exception as e:
+            print(f"Could not fetch aggregated trades of symbol: {symbol}, start: {start}, end: {end} of {e}")
 
     def get_account_details(self):
         """
@@ -200,21 +532,24 @@ class BinanceClient:
 
         return account
 
+    def get_balance_ledger(self) -> BalanceLedger:
+        """
+        Return the local balance ledger of the account (seeded on first use)
+        """
+        if self.balance_ledger is None:
+            user_stream = self.get_user_data_stream() if self.use_user_data_stream else self.user_data_stream
+            self.balance_ledger = BalanceLedger(self, user_stream, self.balance_reconcile_interval)
+        return self.balance_ledger
+
     def get_account_balance(self) -> dict:
         """
         Returns a dict balance of a account
         """
-
-        account = self.get_account_details()["balances"]
-        balances = dict()
-
         try:
-            for a in account:
-                balances[a["asset"]] = a["free"]
+            return self.get_balance_ledger().balances()
         except Exception as e:
             print(f"Problem with getting account balance. Accuring error: {e}")
-
-        return balances
+            return dict()
 
     def get_asset_balance(self, currency) -> float:
         """
@@ -222,30 +557,50 @@ class BinanceClient:
         """
         """
         :param currency: type str of a chosen asset
-        :return: type long of a asset balance or None
+        :return: type float of a asset balance or None
         """
-        account = self.get_account_details()["balances"]
         try:
-            for a in account:
-                if str(currency) == str(a["asset"]):
-                    return a["free"]
+            return self.get_balance_ledger().free_balance(currency)
         except Exception as e:
             print(f"Problem with getting asset: {currency} of {e}.")
 
+    def get_ticker_service(self) -> TickerService:
+        """
+        Return the batched, cached ticker prices of the client's host
+        """
+        if self.ticker_service is None:
+            self.ticker_service = TickerService.shared(self, self.ticker_ttl)
+        return self.ticker_service
+
     def get_current_price(self, tick):
         """
-        Returns latest price for a symbol or return all symbols tickers with None symbol param
+        Returns latest price (float) for a symbol, cached for ticker_ttl ms and requested together with the other
+        symbols in use
         """
-        symbol = {
-            "symbol": str(tick),
-        }
         try:
-            ticker = self.make_request("GET", "/api/v3/ticker/price", symbol)
-            if ticker is not None:
-                return ticker['price']
+            return self.get_ticker_service().price(tick)
         except Exception as e:
             print(f"Error while getting the current price of {tick} with {e}.")
 
+    def get_current_prices(self, ticks: list) -> dict:
+        """
+        Returns {symbol: latest price} of many symbols with at most one request
+        """
+        try:
+            return self.get_ticker_service().get_prices(ticks)
+        except Exception as e:
+            print(f"Error while getting the current prices of {ticks} with {e}.")
+
+    def get_order_book_snapshot(self, symbol, limit=1000):
+        """
+        Returns a depth snapshot (lastUpdateId, bids, asks) of a symbol
+        """
+        params = {"symbol": str(symbol).upper(), "limit": int(limit)}
+        try:
+            return self.make_request("GET", "/api/v3/depth", params)
+        except Exception as e:
+            print(f"Error while getting the order book of {symbol} with {e}.")
+
     def get_order_status(self, symbol, orderId):
         """
         Returns a status of an order, based on OrderId
@@ -456,17 +811,74 @@ class BinanceClient:
         else:
             print(f"Problem while chosing quantity type in {side} order of type {type}.")
 
+    def new_order(self, symbol, side, type="LIMIT", timeInForce="GTC", price=0.0, amount=0.0,
+                  quantity_type="quantity"):
+        """
+        Make a BUY or SELL order
+        """
+        try:
+            data = order_params(symbol, side, type, timeInForce, price, amount, quantity_type)
+            return self.make_request("POST", "/api/v3/order", data, signed=True)
+        except Exception as e:
+            print(f"Couldn't handle {side} request of type {type}, with symbol {symbol} and quantity_type "
+                  f"{quantity_type} with error {e}")
+
+    def cancel_replace_order(self, symbol, cancel_order_id, side, type="LIMIT", timeInForce="GTC", price=0.0,
+                             amount=0.0, quantity_type="quantity", mode="STOP_ON_FAILURE"):
+        """
+        Cancel an order and place a new one in a single request, returns the response with
+        cancelResult / newOrderResult and both order responses
+
+        :param mode: "STOP_ON_FAILURE" doesn't place the new order if the cancel fails, "ALLOW_FAILURE" always does
+        """
+        try:
+            data = order_params(symbol, side, type, timeInForce, price, amount, quantity_type)
+            data["cancelReplaceMode"] = str(mode)
+            data["cancelOrderId"] = int(cancel_order_id)
+            return self.make_request("POST", "/api/v3/order/cancelReplace", data, signed=True)
+        except Exception as e:
+            print(f"Couldn't cancel-replace order {cancel_order_id} of symbol {symbol} with error {e}")
+
+    def batch_orders(self, orders: list, workers=10) -> list:
+        """
+        Submit many orders concurrently, returns their responses in the same order (None for a failed order)
+
+        :param orders: list of dicts of new_order keywords (symbol, side, type, price, amount, quantity_type), an
+                       order with a "cancel_order_id" key is cancel-replaced through cancel_replace_order instead
+        :param workers: max number of orders in flight, every order still goes through the rate limiter
+        """
+        if not orders:
+            return []
+
+        def submit(order):
+            order = dict(order)
+            # Every order is signed by make_request after its rate limiter wait, not when the batch is queued
+            if "cancel_order_id" in order:
+                return self.cancel_replace_order(**order)
+            return self.new_order(**order)
+
+        with ThreadPoolExecutor(max_workers=min(int(workers), len(orders), self.pool_size)) as executor:
+            return list(executor.map(submit, orders))
+
     # WEBSOCKET API ----------------------------------------------------------------------------------------------------
 
-    def start_ws(self, open, close, error, message):
-        self.ws = websocket.WebSocketApp(self.wss_url, on_open=open, on_close=close, on_error=error,
-                                         on_message=message)
-        while True:
-            try:
-                self.ws.run_forever()
-            except Exception as e:
-                print(f"Binance resuming with info: {e}")
-            time.sleep(2)
+    def start_ws(self, open, close, error, message, reconnect=None) -> StreamRunner:
+        """
+        Open a raw stream connection in the background, returns its StreamRunner (stop / join)
+
+        :param reconnect: callback(runner) called after every reconnect, e.g. to backfill candles missed meanwhile
+        """
+        if self.recorder is not None:
+            on_message = message
+
+            def message(ws, msg):
+                self.recorder.record(msg)
+                on_message(ws, msg)
+
+        # The runner stands in for the WebSocketApp, self.ws.send() and self.ws.close() keep working
+        self.ws = StreamRunner(self.wss_url, message, on_open=open, on_close=close, on_error=error,
+                               on_reconnect=reconnect)
+        return self.ws.start()
 
     def on_open_kline(self, ws):
         print("Websocket connection established")
@@ -551,11 +963,38 @@ class BinanceClient:
 
     def get_symbol_kline_stream(self, symbol, interval):
         """
-        Return Kline/Candlestick stream dict object with chosen symbol and interval
+        Start a Kline/Candlestick stream of a symbol in the background (latest candle in self.klines),
+        returns its StreamRunner
         """
-
         self.subscribe_symbol = symbol
         self.subscribe_interval = interval
-        t = threading.Thread(
-            target=self.start_ws(self.on_open_kline, self.on_close, self.on_error, self.on_kline_message))
-        t.start()
+        self.dispatcher = MessageDispatcher(self.on_kline_message, policy=MessageDispatcher.CONFLATE).start()
+        return self.start_ws(self.on_open_kline, self.on_close, self.on_error, self.dispatcher.on_message)
+
+    def get_stream_manager(self) -> StreamManager:
+        """
+        Return the combined-stream connection of the client (started on first use), shared by all its subscriptions
+        """
+        if self.stream_manager is None:
+            self.stream_manager = StreamManager(self.wss_stream_url, recorder=self.recorder)
+            self.stream_manager.start()
+        return self.stream_manager
+
+    def get_order_book_manager(self) -> OrderBookManager:
+        """
+        Return the manager of local order books kept in sync from the depth diff stream
+        """
+        if self.order_books is None:
+            self.order_books = OrderBookManager(self)
+        return self.order_books
+
+    def get_user_data_stream(self) -> UserDataStream:
+        """
+        Return the account event stream of the client (started on first use)
+        """
+        if self.user_data_stream is None:
+            self.user_data_stream = UserDataStream(self)
+            self.user_data_stream.start()
+            if self.balance_ledger is not None:
+                self.balance_ledger.attach(self.user_data_stream)
+        return self.user_data_stream
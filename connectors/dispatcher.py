@@ -0,0 +1,161 @@
+import re
+import time
+import threading
+from collections import deque
+
+# Fields of the conflation key, sliced out of the raw frame instead of parsing it on the socket thread
+EVENT_FIELD = re.compile(r'"e":\s*"([^"]*)"')
+SYMBOL_FIELD = re.compile(r'"s":\s*"([^"]*)"')
+KLINE_OPEN_FIELD = re.compile(r'"k":\s*\{[^{}]*?"t":\s*(\d+)')
+LIST_PAYLOAD = re.compile(r'^\s*(\[|\{\s*"stream":\s*"[^"]*",\s*"data":\s*\[)')
+
+
+class MessageDispatcher:
+    """
+    Bounded queue between a websocket receive thread and the worker(s) processing its messages.
+    The socket thread only queues frames, so slow processing can't back up the connection. When the queue is full
+    the oldest frame is dropped; with the "conflate" policy a queued frame is also replaced by a newer one of the
+    same key (by default the same event, symbol and candle), so only the latest state of every key is processed.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    CONFLATE = "conflate"
+
+    def __init__(self, handler, maxsize=1000, policy=DROP_OLDEST, workers=1, key=None):
+        """
+        :param handler: callback(ws, msg) processing a frame, e.g. a former on_message callback of start_ws
+        :param maxsize: max number of queued frames
+        :param policy: "drop_oldest" or "conflate"
+        :param workers: number of processing threads, frames are processed in order only with a single worker
+        :param key: function returning the conflation key of a frame, defaults to conflation_key
+        """
+        if policy not in [self.DROP_OLDEST, self.CONFLATE]:
+            raise ValueError(f"Unknown overflow policy {policy}")
+
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.workers = workers
+        self.key = key if key is not None else self.conflation_key
+
+        self.keys = deque()
+        self.items = dict()
+        self.next_id = 0
+        self.condition = threading.Condition()
+        self.running = False
+        self.threads = []
+
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.max_depth = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    @staticmethod
+    def conflation_key(msg):
+        """
+        Event type, symbol and candle open time of a (raw or combined stream) frame. The fields are sliced out of
+        the text with regular expressions, the frame is parsed only once by the handler.
+        """
+        if isinstance(msg, bytes):
+            msg = msg.decode()
+        if LIST_PAYLOAD.match(msg):
+            return None
+        event, symbol, kline_open = EVENT_FIELD.search(msg), SYMBOL_FIELD.search(msg), KLINE_OPEN_FIELD.search(msg)
+        return (event.group(1) if event else None,
+                symbol.group(1) if symbol else None,
+                int(kline_open.group(1)) if kline_open else None)
+
+    def on_message(self, ws, msg):
+        """
+        Websocket on_message callback, queues the frame and returns immediately
+        """
+        received = time.monotonic()
+        with self.condition:
+            self.received += 1
+
+            key = None
+            if self.policy == self.CONFLATE:
+                try:
+                    key = self.key(msg)
+                except Exception:
+                    key = None
+
+            if key is not None and key in self.items:
+                # Replace the queued frame in place, it keeps its position (and age) in the queue
+                self.items[key] = (ws, msg, self.items[key][2])
+                self.conflated += 1
+                return
+
+            if len(self.keys) >= self.maxsize:
+                del self.items[self.keys.popleft()]
+                self.dropped += 1
+
+            if key is None:
+                key = ("_", self.next_id)
+                self.next_id += 1
+            self.keys.append(key)
+            self.items[key] = (ws, msg, received)
+            self.max_depth = max(self.max_depth, len(self.keys))
+            self.condition.notify()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while self.running and not self.keys:
+                    self.condition.wait()
+                if not self.running and not self.keys:
+                    return
+                ws, msg, received = self.items.pop(self.keys.popleft())
+                self.lag = time.monotonic() - received
+                self.max_lag = max(self.max_lag, self.lag)
+
+            try:
+                self.handler(ws, msg)
+            except Exception as e:
+                print(f"Processing of a websocket message failed with: {e}")
+
+            with self.condition:
+                self.processed += 1
+
+    def stats(self) -> dict:
+        """
+        Returns queue depth, counters and the queueing lag (in ms) of the last and the slowest frame
+        """
+        with self.condition:
+            return {"depth": len(self.keys),
+                    "max_depth": self.max_depth,
+                    "received": self.received,
+                    "processed": self.processed,
+                    "dropped": self.dropped,
+                    "conflated": self.conflated,
+                    "lag_ms": round(self.lag * 1000, 3),
+                    "max_lag_ms": round(self.max_lag * 1000, 3)}
+
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self.threads = [threading.Thread(target=self.work, daemon=True) for _ in range(int(self.workers))]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=5, drain=True):
+        """
+        Process the queued frames and stop the workers, also callable from the handler (e.g. a bot stopping itself)
+
+        :param drain: False drops the queued frames instead of processing them
+        """
+        with self.condition:
+            self.running = False
+            if not drain:
+                self.dropped += len(self.keys)
+                self.keys.clear()
+                self.items.clear()
+            self.condition.notify_all()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=timeout)
@@ -0,0 +1,153 @@
+import math
+import time
+import threading
+
+
+class SymbolFilters:
+    """ Trading rules of a single symbol, precomputed from its exchangeInfo filters """
+
+    def __init__(self, symbol_data: dict):
+        self.symbol = symbol_data["symbol"]
+        self.status = symbol_data.get("status")
+        self.base_asset = symbol_data.get("baseAsset")
+        self.quote_asset = symbol_data.get("quoteAsset")
+        self.permissions = self.read_permissions(symbol_data)
+
+        filters = {f["filterType"]: f for f in symbol_data.get("filters", [])}
+        price_filter = filters.get("PRICE_FILTER", {})
+        lot_size = filters.get("LOT_SIZE", {})
+        notional = filters.get("NOTIONAL", filters.get("MIN_NOTIONAL", {}))
+
+        self.tick_size = float(price_filter.get("tickSize", 0))
+        self.min_price = float(price_filter.get("minPrice", 0))
+        self.max_price = float(price_filter.get("maxPrice", 0))
+        self.step_size = float(lot_size.get("stepSize", 0))
+        self.min_qty = float(lot_size.get("minQty", 0))
+        self.max_qty = float(lot_size.get("maxQty", 0))
+        self.min_notional = float(notional.get("minNotional", 0))
+
+        self.price_precision = self.precision(price_filter.get("tickSize"), symbol_data.get("quotePrecision", 8))
+        self.quantity_precision = self.precision(lot_size.get("stepSize"), symbol_data.get("baseAssetPrecision", 8))
+
+    @staticmethod
+    def read_permissions(symbol_data: dict) -> set:
+        permissions = set(symbol_data.get("permissions", []))
+        for permission_set in symbol_data.get("permissionSets", []):
+            permissions.update(permission_set)
+        return permissions
+
+    @staticmethod
+    def precision(step, default) -> int:
+        """
+        Number of decimals of a step given as a string, e.g. "0.01000000" -> 2
+        """
+        if step is None or float(step) == 0:
+            return int(default)
+        decimals = str(step).rstrip("0")
+        return len(decimals.split(".")[1]) if "." in decimals else 0
+
+    def round_price(self, price: float) -> float:
+        """
+        Round a price to the nearest valid tick
+        """
+        if self.tick_size == 0:
+            return round(float(price), self.price_precision)
+        return round(round(float(price) / self.tick_size) * self.tick_size, self.price_precision)
+
+    def round_quantity(self, quantity: float) -> float:
+        """
+        Round a quantity down to the lot step, so an order never asks for more than intended
+        """
+        if self.step_size == 0:
+            return round(float(quantity), self.quantity_precision)
+        # The small epsilon keeps quantities which are already on a step from being floored one step down
+        return round(math.floor(float(quantity) / self.step_size + 1e-9) * self.step_size, self.quantity_precision)
+
+    def is_valid_order(self, price: float, quantity: float) -> bool:
+        """
+        Checks the lot size, price range and min notional filters before an order is sent
+        """
+        if quantity < self.min_qty or (self.max_qty and quantity > self.max_qty):
+            return False
+        if price < self.min_price or (self.max_price and price > self.max_price):
+            return False
+        return price * quantity >= self.min_notional
+
+
+class ExchangeInfo:
+    """ TTL cache of /api/v3/exchangeInfo indexed by symbol, quote asset and permission """
+
+    def __init__(self, client, ttl=3600, retry_backoff=60):
+        """
+        :param ttl: seconds the exchange info is used before it's downloaded again
+        :param retry_backoff: seconds to wait after a failed download before the next one, the previous filters are
+                              served meanwhile (the endpoint costs 20 weight, retrying every call would get banned)
+        """
+        self.client = client
+        self.ttl = ttl
+        self.retry_backoff = retry_backoff
+        self.lock = threading.Lock()
+        self.updated = None
+        self.failed = None
+
+        self.filters = dict()
+        self.by_quote_asset = dict()
+        self.by_permission = dict()
+
+    def is_expired(self) -> bool:
+        now = time.monotonic()
+        if self.failed is not None and now - self.failed < self.retry_backoff:
+            return False
+        return self.updated is None or now - self.updated > self.ttl
+
+    def refresh(self):
+        """
+        Download the exchange info and rebuild the indexes
+        """
+        exchange_info = self.client.make_request("GET", "/api/v3/exchangeInfo")
+        if exchange_info is None:
+            print(f"Could not refresh exchange info, retrying in {self.retry_backoff} s.")
+            self.failed = time.monotonic()
+            return
+
+        filters, by_quote_asset, by_permission = dict(), dict(), dict()
+        for symbol_data in exchange_info["symbols"]:
+            symbol_filters = SymbolFilters(symbol_data)
+            filters[symbol_filters.symbol] = symbol_filters
+            by_quote_asset.setdefault(symbol_filters.quote_asset, []).append(symbol_filters.symbol)
+            for permission in symbol_filters.permissions:
+                by_permission.setdefault(permission, set()).add(symbol_filters.symbol)
+
+        self.filters, self.by_quote_asset, self.by_permission = filters, by_quote_asset, by_permission
+        self.updated = time.monotonic()
+        self.failed = None
+
+    def ensure_fresh(self):
+        if self.is_expired():
+            with self.lock:
+                if self.is_expired():
+                    self.refresh()
+
+    def get(self, symbol: str):
+        """
+        Returns SymbolFilters of a symbol or None if it's not listed
+        """
+        self.ensure_fresh()
+        return self.filters.get(str(symbol).upper())
+
+    def symbols(self, quote_asset=None, permission=None) -> list:
+        """
+        Returns symbols, optionally only the ones quoted in an asset and / or having a permission
+        """
+        self.ensure_fresh()
+
+        if quote_asset is not None:
+            symbols = self.by_quote_asset.get(str(quote_asset).upper(), [])
+        else:
+            symbols = list(self.filters.keys())
+
+        if permission is not None:
+            allowed = self.by_permission.get(permission, set())
+            symbols = [symbol for symbol in symbols if symbol in allowed]
+
+        return list(symbols)
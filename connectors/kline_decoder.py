@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+
+# Position of the columns in a raw kline of the API
+KLINE_FIELDS = {
+    "open_time": 0,
+    "open": 1,
+    "high": 2,
+    "low": 3,
+    "close": 4,
+    "volume": 5,
+}
+KLINE_WIDTH = 12
+
+
+def empty_columns(rows=0) -> dict:
+    """
+    Returns preallocated kline column arrays (int64 open_time and float64 OHLCV)
+    """
+    return {column: np.empty(rows, dtype=np.int64 if column == "open_time" else np.float64)
+            for column in KLINE_FIELDS}
+
+
+def parse_kline_page(page: bytes) -> np.ndarray:
+    """
+    Parses a raw JSON body of /api/v3/klines into a (candles x 12) float64 array without building Python objects
+    """
+    # Every field of a kline is a number (prices are quoted), so the page is a flat list of numbers once brackets
+    # and quotes are gone. Millisecond timestamps are exact in float64.
+    values = np.fromstring(page.translate(None, b'[]"'), dtype=np.float64, sep=",")
+    return values.reshape(-1, KLINE_WIDTH)
+
+
+def decode_kline_pages(pages: list) -> dict:
+    """
+    Decodes raw JSON bodies of consecutive kline pages into one set of column arrays, duplicates removed
+    """
+    # Every candle opens a nested list, so the rows can be counted before anything is parsed
+    rows = sum(max(page.count(b"[") - 1, 0) for page in pages)
+    columns = empty_columns(rows)
+
+    offset = 0
+    for page in pages:
+        block = parse_kline_page(page)
+        for column, field in KLINE_FIELDS.items():
+            columns[column][offset:offset + len(block)] = block[:, field]
+        offset += len(block)
+
+    columns = {column: values[:offset] for column, values in columns.items()}
+
+    # Pages are ordered and don't overlap, so a duplicate can only follow its twin
+    open_time = columns["open_time"]
+    if len(open_time) > 1 and not (open_time[1:] > open_time[:-1]).all():
+        keep = np.ones(len(open_time), dtype=bool)
+        keep[1:] = open_time[1:] > np.maximum.accumulate(open_time)[:-1]
+        columns = {column: values[keep] for column, values in columns.items()}
+
+    return columns
+
+
+def candles_to_columns(candles: list) -> dict:
+    """
+    Converts raw klines of the API into a dict of column arrays (open_time, open, high, low, close, volume)
+    """
+    columns = empty_columns(len(candles))
+    for column, field in KLINE_FIELDS.items():
+        columns[column][:] = [candle[field] for candle in candles]
+    return columns
+
+
+def select_rows(columns: dict, mask) -> dict:
+    return {column: values[mask] for column, values in columns.items()}
+
+
+def concat_columns(*parts) -> dict:
+    return {column: np.concatenate([part[column] for part in parts]) for column in KLINE_FIELDS}
+
+
+def columns_to_frame(columns: dict) -> pd.DataFrame:
+    """
+    Builds the historicals DataFrame (Date index, OHLCV and Complete columns) from kline column arrays
+    """
+    complete = np.ones(len(columns["open_time"]), dtype=bool)
+    complete[-1:] = False
+
+    df = pd.DataFrame({"Open": columns["open"],
+                       "High": columns["high"],
+                       "Low": columns["low"],
+                       "Close": columns["close"],
+                       "Volume": columns["volume"],
+                       "Complete": complete},
+                      index=pd.DatetimeIndex(np.asarray(columns["open_time"]).astype("datetime64[ms]")))
+    df.index.name = "Date"
+    df.dropna(inplace=True)
+
+    return df
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def find_duplicates(open_time) -> np.ndarray:
+    """
+    Returns the open times listed more than once
+    """
+    open_time = np.sort(np.asarray(open_time, dtype=np.int64))
+    repeated = open_time[1:][open_time[1:] == open_time[:-1]]
+    return np.unique(repeated)
+
+
+def find_gaps(open_time, interval_ms: int) -> list:
+    """
+    Returns (first missing open time, last missing open time) ranges between the first and the last candle
+    """
+    open_time = np.unique(np.asarray(open_time, dtype=np.int64))
+    steps = np.diff(open_time)
+    missing = np.flatnonzero(steps > interval_ms)
+    return [(int(open_time[i] + interval_ms), int(open_time[i + 1] - interval_ms)) for i in missing]
+
+
+def check_klines(open_time, interval_ms: int) -> dict:
+    """
+    Integrity report of a candle time index: {"ordered", "duplicates", "gaps", "missing"}, missing is the number
+    of candles in the gaps
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    gaps = find_gaps(open_time, interval_ms)
+    return {
+        "ordered": bool((open_time[1:] > open_time[:-1]).all()),
+        "duplicates": find_duplicates(open_time),
+        "gaps": gaps,
+        "missing": sum((end - start) // interval_ms + 1 for start, end in gaps),
+    }
+
+
+def sort_unique(columns: dict) -> dict:
+    """
+    Sorts kline columns by open time, of duplicated candles the last one is kept
+    """
+    open_time = np.asarray(columns["open_time"], dtype=np.int64)
+    if (open_time[1:] > open_time[:-1]).all():
+        return columns
+
+    order = np.argsort(open_time, kind="stable")
+    keep = np.ones(len(order), dtype=bool)
+    keep[:-1] = open_time[order][1:] != open_time[order][:-1]
+    return {column: np.asarray(values)[order[keep]] for column, values in columns.items()}
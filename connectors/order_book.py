@@ -0,0 +1,250 @@
+import random
+import threading
+from bisect import bisect_left
+
+
+class OrderBook:
+    """
+    Local L2 order book of one symbol. Both sides are kept in sorted arrays with the best level at the end,
+    so the top of the book is read in O(1) and a level update is a binary search.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = str(symbol).upper()
+        # Bids are keyed by price and asks by negative price, both ascending
+        self.bid_keys, self.bid_qtys = [], []
+        self.ask_keys, self.ask_qtys = [], []
+        self.last_update_id = 0
+        self.synced = False
+        self.lock = threading.Lock()
+
+    def load_snapshot(self, snapshot: dict):
+        """
+        Replace the book with a /api/v3/depth snapshot
+        """
+        bids = sorted((float(price), float(qty)) for price, qty in snapshot["bids"] if float(qty) > 0)
+        asks = sorted((-float(price), float(qty)) for price, qty in snapshot["asks"] if float(qty) > 0)
+
+        with self.lock:
+            self.bid_keys, self.bid_qtys = [key for key, _ in bids], [qty for _, qty in bids]
+            self.ask_keys, self.ask_qtys = [key for key, _ in asks], [qty for _, qty in asks]
+            self.last_update_id = int(snapshot["lastUpdateId"])
+
+    def _update(self, keys: list, qtys: list, key: float, qty: float):
+        i = bisect_left(keys, key)
+        found = i < len(keys) and keys[i] == key
+
+        if qty == 0:
+            if found:
+                del keys[i]
+                del qtys[i]
+        elif found:
+            qtys[i] = qty
+        else:
+            keys.insert(i, key)
+            qtys.insert(i, qty)
+
+    def apply(self, event: dict):
+        """
+        Apply a depth diff event (bids "b" and asks "a", quantity 0 removes a level)
+        """
+        with self.lock:
+            for price, qty in event["b"]:
+                self._update(self.bid_keys, self.bid_qtys, float(price), float(qty))
+            for price, qty in event["a"]:
+                self._update(self.ask_keys, self.ask_qtys, -float(price), float(qty))
+            self.last_update_id = int(event["u"])
+
+    # QUERIES ----------------------------------------------------------------------------------------------------------
+    # Read under the lock, an update applied meanwhile would mix levels (or a price and quantity) of two states
+
+    def best_bid(self):
+        """
+        Returns (price, quantity) of the best bid or None
+        """
+        with self.lock:
+            return self._best_bid()
+
+    def best_ask(self):
+        """
+        Returns (price, quantity) of the best ask or None
+        """
+        with self.lock:
+            return self._best_ask()
+
+    def mid_price(self):
+        with self.lock:
+            bid, ask = self._best_bid(), self._best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def _best_bid(self):
+        if not self.bid_keys:
+            return None
+        return self.bid_keys[-1], self.bid_qtys[-1]
+
+    def _best_ask(self):
+        if not self.ask_keys:
+            return None
+        return -self.ask_keys[-1], self.ask_qtys[-1]
+
+    def depth_at(self, side: str, price: float) -> float:
+        """
+        Returns the quantity resting at a price level of a side ("BUY" = bids, "SELL" = asks)
+        """
+        key = float(price) if side == "BUY" else -float(price)
+
+        with self.lock:
+            keys, qtys = (self.bid_keys, self.bid_qtys) if side == "BUY" else (self.ask_keys, self.ask_qtys)
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return qtys[i]
+        return 0.0
+
+    def vwap(self, side: str, size: float):
+        """
+        Returns the average price of taking `size` from a side of the book ("BUY" walks the asks, "SELL" the bids)
+        or None if the book is not deep enough
+        """
+        sign = -1 if side == "BUY" else 1
+
+        remaining = float(size)
+        notional = 0.0
+        with self.lock:
+            keys, qtys = (self.ask_keys, self.ask_qtys) if side == "BUY" else (self.bid_keys, self.bid_qtys)
+            i = len(keys) - 1
+            while remaining > 0 and i >= 0:
+                taken = min(remaining, qtys[i])
+                notional += taken * keys[i] * sign
+                remaining -= taken
+                i -= 1
+
+        if remaining > 0:
+            return None
+        return notional / float(size)
+
+
+class OrderBookManager:
+    """
+    Keeps local order books in sync with the <symbol>@depth@100ms diff stream:
+    events are buffered until a REST snapshot arrives and every update is checked for sequence gaps.
+    """
+
+    def __init__(self, client, snapshot_limit=1000, backoff=1.0, max_backoff=30.0):
+        """
+        :param backoff: delay before the second snapshot download of a resync in seconds, doubled after every
+                        snapshot which failed or was older than the buffered events
+        :param max_backoff: max delay between snapshot downloads in seconds
+        """
+        self.client = client
+        self.snapshot_limit = snapshot_limit
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.books = dict()
+        self.buffers = dict()
+        # Failed snapshots of the running resync of every symbol
+        self.failures = dict()
+        self.lock = threading.Lock()
+
+    def track(self, symbol: str) -> OrderBook:
+        """
+        Start maintaining a local book of a symbol and return it (it's usable once book.synced is True)
+        """
+        symbol = str(symbol).upper()
+        if symbol in self.books:
+            return self.books[symbol]
+
+        book = OrderBook(symbol)
+        with self.lock:
+            self.books[symbol] = book
+            self.buffers[symbol] = []
+
+        self.client.get_stream_manager().depth(symbol, self.on_depth)
+        self.resync(symbol)
+
+        return book
+
+    def get(self, symbol: str):
+        book = self.books.get(str(symbol).upper())
+        if book is not None and book.synced:
+            return book
+
+    def resync(self, symbol: str):
+        """
+        Download a fresh snapshot in the background, diff events are buffered meanwhile
+        """
+        book = self.books[symbol]
+        book.synced = False
+        timer = threading.Timer(self.resync_delay(symbol), self.load_snapshot, args=(symbol,))
+        timer.daemon = True
+        timer.start()
+
+    def resync_delay(self, symbol: str) -> float:
+        """
+        The first snapshot of a resync is downloaded right away, later ones after an exponential delay half of which
+        is random, so a snapshot served stale (e.g. from a lagging cache) isn't requested again in a tight loop
+        """
+        failures = self.failures.get(symbol, 0)
+        if not failures:
+            return 0.0
+        delay = min(self.max_backoff, self.backoff * 2 ** (failures - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def load_snapshot(self, symbol: str):
+        snapshot = self.client.get_order_book_snapshot(symbol, self.snapshot_limit)
+        if snapshot is None:
+            print(f"Could not load order book snapshot of {symbol}, retrying...")
+            self.failures[symbol] = self.failures.get(symbol, 0) + 1
+            self.resync(symbol)
+            return
+
+        book = self.books[symbol]
+        with self.lock:
+            book.load_snapshot(snapshot)
+            buffered, self.buffers[symbol] = self.buffers[symbol], []
+
+            for event in buffered:
+                if not self.process(book, event):
+                    break
+            else:
+                book.synced = True
+                self.failures[symbol] = 0
+                return
+
+            self.failures[symbol] = self.failures.get(symbol, 0) + 1
+
+        self.resync(symbol)
+
+    def process(self, book: OrderBook, event: dict) -> bool:
+        """
+        Apply an event if it continues the sequence of the book, returns False on a gap
+        """
+        first_id, last_id = int(event["U"]), int(event["u"])
+
+        # Already contained in the snapshot
+        if last_id <= book.last_update_id:
+            return True
+
+        if first_id > book.last_update_id + 1:
+            print(f"Order book of {book.symbol} lost updates {book.last_update_id + 1} - {first_id - 1}, resyncing.")
+            return False
+
+        book.apply(event)
+        return True
+
+    def on_depth(self, data: dict):
+        symbol = data["s"]
+        book = self.books.get(symbol)
+        if book is None:
+            return
+
+        with self.lock:
+            if not book.synced:
+                self.buffers[symbol].append(data)
+                return
+
+            in_sequence = self.process(book, data)
+
+        if not in_sequence:
+            self.resync(symbol)
@@ -0,0 +1,25 @@
+def order_params(symbol, side, type="LIMIT", timeInForce="GTC", price=0.0, amount=0.0,
+                 quantity_type="quantity") -> dict:
+    """
+    Returns unsigned request parameters of a new order, the same ones BinanceClient.buy_order / sell_order send.
+    Shared by the blocking and the asyncio client, which sign them right before a request is sent.
+
+    :param quantity_type: "quantity" of the base asset or "quoteOrderQty" of the quote asset
+    """
+    data = dict()
+    data["symbol"] = str(symbol)
+    data["side"] = str(side)
+    data["type"] = str(type)
+
+    if quantity_type == "quantity":
+        if type == "LIMIT":
+            data["timeInForce"] = str(timeInForce)
+        data["quantity"] = float(amount)
+        if type == "LIMIT":
+            data["price"] = float(price)
+    elif quantity_type == "quoteOrderQty":
+        data["quoteOrderQty"] = float(amount)
+    else:
+        raise ValueError(f"Problem while chosing quantity type in {side} order of type {type}.")
+
+    return data
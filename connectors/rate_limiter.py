@@ -0,0 +1,160 @@
+import time
+import json
+import threading
+
+
+class RateLimiter:
+    """
+    Client-side token bucket of the Binance request weight and order count limits.
+    One instance can be shared by any number of clients (and threads) talking to the same host.
+    """
+
+    # Request weight of the endpoints used by the clients, (method, endpoint) -> weight
+    ENDPOINT_WEIGHTS = {
+        ("GET", "/api/v3/klines"): 2,
+        ("GET", "/api/v3/ticker/price"): 2,
+        ("GET", "/api/v3/ticker/bookTicker"): 2,
+        ("GET", "/api/v3/order"): 4,
+        ("POST", "/api/v3/order"): 1,
+        ("DELETE", "/api/v3/order"): 1,
+        ("POST", "/api/v3/order/cancelReplace"): 1,
+        ("GET", "/api/v3/openOrders"): 6,
+        ("DELETE", "/api/v3/openOrders"): 1,
+        ("GET", "/api/v3/account"): 20,
+        ("GET", "/api/v3/exchangeInfo"): 20,
+        ("GET", "/api/v3/depth"): 5,
+        ("GET", "/api/v3/aggTrades"): 4,
+        ("POST", "/api/v3/userDataStream"): 2,
+        ("PUT", "/api/v3/userDataStream"): 2,
+        ("DELETE", "/api/v3/userDataStream"): 2,
+    }
+    ORDER_ENDPOINTS = [("POST", "/api/v3/order"), ("POST", "/api/v3/order/cancelReplace")]
+
+    shared_limiters = dict()
+    shared_lock = threading.Lock()
+
+    def __init__(self, weight_per_minute=6000, orders_per_10s=50, safety_margin=0.9):
+        """
+        :param weight_per_minute: REQUEST_WEIGHT limit of the exchange
+        :param orders_per_10s: ORDERS limit of the exchange
+        :param safety_margin: fraction of the limits the limiter schedules up to
+        """
+        self.weight_capacity = weight_per_minute * safety_margin
+        self.weight_rate = self.weight_capacity / 60
+        self.order_capacity = orders_per_10s * safety_margin
+        self.order_rate = self.order_capacity / 10
+
+        self.weight_tokens = self.weight_capacity
+        self.order_tokens = self.order_capacity
+        self.updated = time.monotonic()
+        self.banned_until = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, host: str):
+        """
+        Returns the process-wide limiter of a host, so every client of the same API shares one budget
+        """
+        with cls.shared_lock:
+            if host not in cls.shared_limiters:
+                cls.shared_limiters[host] = cls()
+            return cls.shared_limiters[host]
+
+    def weight(self, method: str, endpoint: str, data=None) -> int:
+        """
+        Returns a request weight of an endpoint called with given parameters
+        """
+        data = data or {}
+
+        if endpoint == "/api/v3/depth":
+            limit = int(data.get("limit", 100))
+            if limit <= 100:
+                return 5
+            elif limit <= 500:
+                return 25
+            elif limit <= 1000:
+                return 50
+            return 250
+        if endpoint in ["/api/v3/ticker/price", "/api/v3/ticker/bookTicker"] and "symbol" not in data:
+            return self.ticker_weight(data.get("symbols"))
+        if method == "GET" and endpoint == "/api/v3/openOrders" and "symbol" not in data:
+            return 80
+
+        return self.ENDPOINT_WEIGHTS.get((method, endpoint), 1)
+
+    @staticmethod
+    def ticker_weight(symbols) -> int:
+        """
+        Weight of a ticker request for many symbols, charged by their count: 4 up to 20 symbols, 40 up to 100 and
+        80 above or without a symbols list (all the symbols of the exchange)
+        """
+        if symbols is None:
+            return 80
+        count = len(json.loads(symbols)) if isinstance(symbols, str) else len(symbols)
+        if count <= 20:
+            return 4
+        elif count <= 100:
+            return 40
+        return 80
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.weight_tokens = min(self.weight_capacity, self.weight_tokens + elapsed * self.weight_rate)
+        self.order_tokens = min(self.order_capacity, self.order_tokens + elapsed * self.order_rate)
+        self.updated = now
+
+    def reserve(self, method: str, endpoint: str, data=None) -> float:
+        """
+        Takes the tokens of a request and returns how many seconds the caller has to wait before sending it.
+        Tokens may go negative, later callers then queue up behind the earlier reservations.
+        """
+        weight = self.weight(method, endpoint, data)
+        is_order = (method, endpoint) in self.ORDER_ENDPOINTS
+
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            self.weight_tokens -= weight
+            wait = max(0.0, -self.weight_tokens / self.weight_rate)
+
+            if is_order:
+                self.order_tokens -= 1
+                wait = max(wait, -self.order_tokens / self.order_rate)
+
+            return max(wait, self.banned_until - now)
+
+    def acquire(self, method: str, endpoint: str, data=None):
+        """
+        Blocks until a request can be sent without exceeding the limits
+        """
+        wait = self.reserve(method, endpoint, data)
+        if wait > 0:
+            time.sleep(wait)
+
+    def update(self, headers):
+        """
+        Syncs the buckets with the usage reported by the exchange (X-MBX-USED-WEIGHT-1M, X-MBX-ORDER-COUNT-10S),
+        which also counts requests of other processes using the same IP or account
+        """
+        used_weight = headers.get("X-MBX-USED-WEIGHT-1M")
+        order_count = headers.get("X-MBX-ORDER-COUNT-10S")
+
+        with self.lock:
+            self._refill(time.monotonic())
+
+            if used_weight is not None:
+                self.weight_tokens = min(self.weight_tokens, self.weight_capacity - float(used_weight))
+            if order_count is not None:
+                self.order_tokens = min(self.order_tokens, self.order_capacity - float(order_count))
+
+    def ban(self, retry_after=None):
+        """
+        Stops scheduling requests after a 429/418 response for Retry-After seconds
+        """
+        seconds = float(retry_after) if retry_after is not None else 60.0
+
+        with self.lock:
+            self.banned_until = max(self.banned_until, time.monotonic() + seconds)
+
+        print(f"Request limit hit, pausing requests for {seconds} seconds.")
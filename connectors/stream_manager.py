@@ -0,0 +1,177 @@
+import re
+import time
+import json
+import threading
+
+from connectors.dispatcher import MessageDispatcher, KLINE_OPEN_FIELD
+from connectors.stream_runner import StreamRunner
+
+STREAM_FIELD = re.compile(r'"stream":\s*"([^"]*)"')
+
+
+class StreamManager:
+    """
+    Holds one combined-stream websocket connection for many subscriptions (klines, book tickers, ...)
+    and routes every decoded message to the callbacks registered for its stream. Frames are queued on a
+    MessageDispatcher, the callbacks run on its worker and never hold up the socket thread.
+    """
+
+    # Binance accepts at most 5 messages per second from a client connection
+    SEND_INTERVAL = 0.25
+
+    def __init__(self, stream_url: str, recorder=None, maxsize=10000):
+        """
+        :param recorder: optional JournalWriter, every raw frame is recorded before it's decoded
+        :param maxsize: max number of frames waiting for the callbacks, the oldest one is dropped beyond it
+        """
+        self.stream_url = stream_url
+        self.recorder = recorder
+        self.callbacks = dict()
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.ws_id = 1
+        self.connected = False
+        self.last_send = 0.0
+        self.dispatcher = MessageDispatcher(self.handle_message, maxsize=maxsize, policy=MessageDispatcher.CONFLATE,
+                                            key=self.conflation_key)
+        self.runner = StreamRunner(self.stream_url, self.on_message, on_open=self.on_open, on_close=self.on_close,
+                                   on_error=self.on_error, name="Combined stream")
+
+    @staticmethod
+    def conflation_key(msg):
+        """
+        Stream name (and candle open time) of kline and book ticker frames, only their latest state waits in the
+        queue. Other streams, e.g. depth diffs which have to be applied in sequence, are never conflated.
+        """
+        if isinstance(msg, bytes):
+            msg = msg.decode()
+        stream = STREAM_FIELD.search(msg)
+        if stream is None:
+            return None
+
+        stream = stream.group(1)
+        if stream.endswith("@bookTicker"):
+            return stream, None
+        if "@kline_" in stream:
+            kline_open = KLINE_OPEN_FIELD.search(msg)
+            return (stream, int(kline_open.group(1))) if kline_open else None
+        return None
+
+    # SUBSCRIPTIONS ----------------------------------------------------------------------------------------------------
+
+    def subscribe(self, stream: str, callback):
+        """
+        Register a callback (called with the decoded payload) of a raw stream name, e.g. "btcusdt@kline_1m"
+        """
+        with self.lock:
+            new_stream = stream not in self.callbacks
+            self.callbacks.setdefault(stream, []).append(callback)
+
+        if new_stream and self.connected:
+            self.send("SUBSCRIBE", [stream])
+
+        return stream
+
+    def unsubscribe(self, stream: str, callback=None):
+        """
+        Remove one callback of a stream or all of them, the stream is unsubscribed when no callback is left
+        """
+        with self.lock:
+            if stream not in self.callbacks:
+                return
+            if callback is not None and callback in self.callbacks[stream]:
+                self.callbacks[stream].remove(callback)
+            if callback is None or not self.callbacks[stream]:
+                del self.callbacks[stream]
+                removed = True
+            else:
+                removed = False
+
+        if removed and self.connected:
+            self.send("UNSUBSCRIBE", [stream])
+
+    def kline(self, symbol: str, interval: str, callback):
+        return self.subscribe(symbol.lower() + "@kline_" + interval, callback)
+
+    def book_ticker(self, symbol: str, callback):
+        return self.subscribe(symbol.lower() + "@bookTicker", callback)
+
+    def depth(self, symbol: str, callback, speed="100ms"):
+        return self.subscribe(symbol.lower() + "@depth@" + speed, callback)
+
+    def streams(self) -> list:
+        with self.lock:
+            return list(self.callbacks.keys())
+
+    def send(self, method: str, params: list):
+        """
+        Send a SUBSCRIBE / UNSUBSCRIBE request, throttled to the exchange limit of incoming messages
+        """
+        with self.send_lock:
+            wait = self.last_send + self.SEND_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            data = dict()
+            data["method"] = method
+            data["params"] = params
+            data["id"] = self.ws_id
+
+            try:
+                self.runner.send(json.dumps(data))
+            except Exception as e:
+                print(f"Websocket error while sending {method} of {params}: {e}")
+
+            self.ws_id += 1
+            self.last_send = time.monotonic()
+
+    # CONNECTION -------------------------------------------------------------------------------------------------------
+
+    def on_open(self, ws):
+        print("Combined stream connection established")
+        self.connected = True
+
+        # Resubscribe everything, also after a reconnect
+        streams = self.streams()
+        for i in range(0, len(streams), 200):
+            self.send("SUBSCRIBE", streams[i:i + 200])
+
+    def on_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+        print(f"Combined stream connection closed with code: {close_status_code} and msg: {close_msg}")
+
+    def on_error(self, ws, msg):
+        print(f"Combined stream error: {msg}")
+
+    def on_message(self, ws, msg):
+        # Recorded on the socket thread, the journal keeps every frame in the order it arrived
+        if self.recorder is not None:
+            self.recorder.record(msg)
+        self.dispatcher.on_message(ws, msg)
+
+    def handle_message(self, ws, msg):
+        data = json.loads(msg)
+
+        # Subscription responses have no "stream" key
+        if "stream" not in data:
+            return
+
+        with self.lock:
+            callbacks = list(self.callbacks.get(data["stream"], []))
+
+        for callback in callbacks:
+            try:
+                callback(data["data"])
+            except Exception as e:
+                print(f"Callback of stream {data['stream']} failed with: {e}")
+
+    def start(self):
+        """
+        Open the connection and start the callback worker in background threads
+        """
+        self.dispatcher.start()
+        self.runner.start()
+
+    def stop(self):
+        self.runner.stop()
+        self.dispatcher.stop()
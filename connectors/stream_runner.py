@@ -0,0 +1,148 @@
+import random
+import socket
+import threading
+import websocket
+
+
+class StreamRunner:
+    """
+    Keeps one websocket connection open in a background thread and reconnects it with jittered exponential
+    backoff. Any number of runners can live in one process, the thread starting them stays free.
+    """
+
+    def __init__(self, url, on_message, on_open=None, on_close=None, on_error=None, on_reconnect=None,
+                 backoff=1.0, max_backoff=60.0, ping_interval=20, ping_timeout=10, name="Websocket"):
+        """
+        :param url: websocket url or a function returning it before every connection (None retries later)
+        :param on_message: callback(ws, msg) of every frame, the other callbacks follow websocket.WebSocketApp
+        :param on_reconnect: callback(runner) called after every connection but the first one
+        :param backoff: base delay between reconnects in seconds, doubled after every failed attempt
+        :param max_backoff: max delay between reconnects in seconds
+        :param ping_interval: seconds between client pings, a connection without pong after ping_timeout is dropped
+        """
+        self.url = url
+        self.on_message = on_message
+        self.on_open = on_open
+        self.on_close = on_close
+        self.on_error = on_error
+        self.on_reconnect = on_reconnect
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.name = name
+
+        self.ws = None
+        self.thread = None
+        self.running = False
+        self.stopped = threading.Event()
+        self.connected = False
+        self.connections = 0
+        self.failures = 0
+
+    # CALLBACKS --------------------------------------------------------------------------------------------------------
+
+    def handle_open(self, ws):
+        self.connected = True
+        self.failures = 0
+        self.connections += 1
+
+        if self.on_open is not None:
+            self.on_open(ws)
+        if self.connections > 1 and self.on_reconnect is not None:
+            self.on_reconnect(self)
+
+    def handle_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+        if self.on_close is not None:
+            self.on_close(ws, close_status_code, close_msg)
+
+    def handle_error(self, ws, error):
+        if self.on_error is not None:
+            self.on_error(ws, error)
+
+    # CONNECTION -------------------------------------------------------------------------------------------------------
+
+    def reconnect_delay(self) -> float:
+        """
+        Half of the exponential delay is fixed and half random, so many clients don't reconnect in lockstep
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** self.failures)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def run(self):
+        while self.running:
+            url = self.url() if callable(self.url) else self.url
+
+            if url is not None:
+                self.ws = websocket.WebSocketApp(url, on_open=self.handle_open, on_close=self.handle_close,
+                                                 on_error=self.handle_error, on_message=self.on_message)
+                try:
+                    self.ws.run_forever(ping_interval=self.ping_interval, ping_timeout=self.ping_timeout)
+                except Exception as e:
+                    print(f"{self.name} resuming with info: {e}")
+                self.connected = False
+
+            if not self.running:
+                break
+
+            delay = self.reconnect_delay()
+            self.failures += 1
+            print(f"{self.name} reconnecting in {delay:.1f} s...")
+            self.stopped.wait(delay)
+
+    def send(self, text: str):
+        if self.ws is None:
+            raise ConnectionError(f"{self.name} is not connected")
+        self.ws.send(text)
+
+    def close_socket(self):
+        ws = self.ws
+        if ws is None:
+            return
+        ws.keep_running = False
+        try:
+            # Only shut the socket down, the receiving thread wakes up and closes it. WebSocketApp.close() from
+            # another thread closes the descriptor under the receiving thread, which then waits until a timeout.
+            ws.sock.sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+
+    def reconnect(self):
+        """
+        Drop the current connection, the runner connects again
+        """
+        self.close_socket()
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return self
+
+        self.running = True
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """
+        Close the connection without reconnecting, can be called from the callbacks too
+        """
+        self.running = False
+        self.stopped.set()
+        self.close_socket()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+
+    # Callbacks written for a WebSocketApp stop the stream with ws.close()
+    close = stop
+
+    def join(self, timeout=None):
+        """
+        Block until the runner is stopped
+        """
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
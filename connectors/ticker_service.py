@@ -0,0 +1,154 @@
+import time
+import json
+import threading
+
+
+class TickerService:
+    """
+    Latest prices of many symbols behind one cache. Stale symbols are refreshed together with one
+    /api/v3/ticker/price request and prices of symbols on the bookTicker stream are served from it while it's
+    connected and updating. Symbols nobody reads anymore leave the refreshes. Clients of the same host share one
+    service, so several bots in a process don't repeat a request.
+    """
+
+    shared_services = dict()
+    shared_lock = threading.Lock()
+
+    def __init__(self, client, ttl_ms=500, stream_ttl_ms=5000, expire_ms=60000):
+        """
+        :param ttl_ms: milliseconds a REST price is served from the cache before it's requested again
+        :param stream_ttl_ms: milliseconds a streamed price is served without a newer bookTicker message, then the
+                              symbol falls back to REST until the stream updates it again
+        :param expire_ms: milliseconds after its last read a symbol is no longer refreshed with the others
+        """
+        self.client = client
+        self.ttl_ms = ttl_ms
+        self.stream_ttl_ms = stream_ttl_ms
+        self.expire_ms = expire_ms
+        self.prices = dict()
+        self.updated = dict()
+        self.streamed = dict()
+        self.streamed_at = dict()
+        self.read = dict()
+        self.stream_symbols = set()
+        self.tracked = set()
+        self.lock = threading.Lock()
+        # Only one refresh is in flight, threads asking meanwhile get its result
+        self.refresh_lock = threading.Lock()
+        self.stream_manager = None
+        self.requests = 0
+
+    @classmethod
+    def shared(cls, client, ttl_ms=500):
+        """
+        Returns the process-wide service of the client's host and cache TTL
+        """
+        key = (client.base_url, ttl_ms)
+        with cls.shared_lock:
+            if key not in cls.shared_services:
+                cls.shared_services[key] = cls(client, ttl_ms)
+            return cls.shared_services[key]
+
+    def now(self) -> float:
+        return time.monotonic() * 1000
+
+    def cached(self, symbol: str):
+        """
+        Returns a fresh price from the stream or from the REST cache, otherwise None
+        """
+        with self.lock:
+            now = self.now()
+            self.read[symbol] = now
+            if symbol in self.streamed and self.stream_manager is not None and self.stream_manager.connected \
+                    and now - self.streamed_at[symbol] < self.stream_ttl_ms:
+                return self.streamed[symbol]
+            if symbol in self.prices and now - self.updated[symbol] < self.ttl_ms:
+                return self.prices[symbol]
+
+    def refresh(self, symbols: list):
+        """
+        Requests the prices of the given and all the other tracked stale symbols in one call, symbols not read for
+        expire_ms are no longer tracked
+        """
+        with self.lock:
+            self.tracked.update(symbols)
+            now = self.now()
+            for symbol in [symbol for symbol in self.tracked if now - self.read.get(symbol, now) >= self.expire_ms]:
+                self.tracked.discard(symbol)
+                self.prices.pop(symbol, None)
+                self.updated.pop(symbol, None)
+            stale = sorted(symbol for symbol in self.tracked
+                           if symbol not in self.updated or now - self.updated[symbol] >= self.ttl_ms)
+        if not stale:
+            return
+
+        if len(stale) == 1:
+            params = {"symbol": stale[0]}
+        else:
+            params = {"symbols": json.dumps(stale, separators=(",", ":"))}
+
+        tickers = self.client.make_request("GET", "/api/v3/ticker/price", params)
+        with self.lock:
+            self.requests += 1
+        if tickers is None:
+            # Symbols stay tracked and are retried with the next call. An unknown symbol fails the whole batch, so the
+            # ones asked for now without any price yet stop being tracked: the next refreshes of the other symbols
+            # succeed and only calls asking for them again batch them again.
+            with self.lock:
+                self.tracked.difference_update(symbol for symbol in symbols if symbol not in self.prices)
+            return
+        if isinstance(tickers, dict):
+            tickers = [tickers]
+
+        updated = self.now()
+        with self.lock:
+            for ticker in tickers:
+                self.prices[ticker["symbol"]] = float(ticker["price"])
+                self.updated[ticker["symbol"]] = updated
+
+    def price(self, symbol: str):
+        """
+        Returns the latest price of a symbol (float), the last known one when a refresh fails or None
+        """
+        return self.get_prices([symbol]).get(str(symbol).upper())
+
+    def get_prices(self, symbols: list) -> dict:
+        """
+        Returns {symbol: price} of the symbols, all the stale ones requested in a single call
+        """
+        symbols = [str(symbol).upper() for symbol in symbols]
+        prices = {symbol: self.cached(symbol) for symbol in symbols}
+
+        missing = [symbol for symbol, price in prices.items() if price is None]
+        if missing:
+            with self.refresh_lock:
+                # Another thread may have refreshed them while this one waited
+                missing = [symbol for symbol in missing if self.cached(symbol) is None]
+                if missing:
+                    self.refresh(missing)
+            for symbol in symbols:
+                if prices[symbol] is None:
+                    prices[symbol] = self.cached(symbol)
+                    if prices[symbol] is None:
+                        prices[symbol] = self.prices.get(symbol)
+
+        return prices
+
+    # STREAM -----------------------------------------------------------------------------------------------------------
+
+    def stream(self, symbols: list):
+        """
+        Serve the prices of the symbols (mid of the best bid and ask) from the bookTicker stream of the client
+        """
+        if self.stream_manager is None:
+            self.stream_manager = self.client.get_stream_manager()
+        for symbol in symbols:
+            symbol = str(symbol).upper()
+            if symbol not in self.stream_symbols:
+                self.stream_symbols.add(symbol)
+                self.stream_manager.book_ticker(symbol, self.on_book_ticker)
+
+    def on_book_ticker(self, data: dict):
+        with self.lock:
+            self.streamed[data["s"]] = (float(data["b"]) + float(data["a"])) / 2
+            self.streamed_at[data["s"]] = self.now()
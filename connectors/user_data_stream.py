@@ -0,0 +1,151 @@
+import time
+import json
+import threading
+
+from connectors.stream_runner import StreamRunner
+
+
+class UserDataStream:
+    """
+    Account websocket of a listenKey: keeps the key alive, reconnects with a new key when the connection
+    or the key is lost and publishes executionReport / outboundAccountPosition / ... events to subscribers.
+    """
+
+    # A listenKey expires 60 minutes after its last keepalive
+    KEEPALIVE_INTERVAL = 30 * 60
+
+    def __init__(self, client, keepalive_interval=KEEPALIVE_INTERVAL):
+        self.client = client
+        self.keepalive_interval = keepalive_interval
+        self.callbacks = dict()
+        self.lock = threading.Lock()
+        self.listen_key = None
+        self.connected = False
+        # Incremented on every (re)connect, events sent while disconnected are lost so subscribers can resync
+        self.connections = 0
+        self.running = False
+        self.keepalive_thread = None
+        self.runner = StreamRunner(self.connect_url, self.on_message, on_open=self.on_open, on_close=self.on_close,
+                                   on_error=self.on_error, name="User data stream")
+
+    # SUBSCRIPTIONS ----------------------------------------------------------------------------------------------------
+
+    def subscribe(self, event_type: str, callback):
+        """
+        Register a callback (called with the decoded event) of an event type, e.g. "executionReport"
+        """
+        with self.lock:
+            self.callbacks.setdefault(event_type, []).append(callback)
+
+    def unsubscribe(self, event_type: str, callback=None):
+        with self.lock:
+            if event_type not in self.callbacks:
+                return
+            if callback is not None and callback in self.callbacks[event_type]:
+                self.callbacks[event_type].remove(callback)
+            if callback is None or not self.callbacks[event_type]:
+                del self.callbacks[event_type]
+
+    def execution_reports(self, callback):
+        return self.subscribe("executionReport", callback)
+
+    def account_positions(self, callback):
+        return self.subscribe("outboundAccountPosition", callback)
+
+    # LISTEN KEY -------------------------------------------------------------------------------------------------------
+
+    def create_listen_key(self):
+        response = self.client.make_request("POST", "/api/v3/userDataStream")
+        if response is not None:
+            return response["listenKey"]
+
+    def keepalive_listen_key(self) -> bool:
+        if self.listen_key is None:
+            return False
+        return self.client.make_request("PUT", "/api/v3/userDataStream", {"listenKey": self.listen_key}) is not None
+
+    def close_listen_key(self):
+        if self.listen_key is not None:
+            self.client.make_request("DELETE", "/api/v3/userDataStream", {"listenKey": self.listen_key})
+            self.listen_key = None
+
+    def keepalive(self):
+        last_keepalive = time.monotonic()
+        while self.running:
+            time.sleep(1)
+            # Stopped while sleeping, the key is closed already
+            if not self.running or time.monotonic() - last_keepalive < self.keepalive_interval:
+                continue
+
+            last_keepalive = time.monotonic()
+            if not self.keepalive_listen_key():
+                # The key is gone, reconnecting creates a new one
+                print("User data stream keepalive failed, reconnecting.")
+                self.reconnect()
+
+    # CONNECTION -------------------------------------------------------------------------------------------------------
+
+    def connect_url(self):
+        """
+        Url of the next connection, a new listen key is created when the previous one was dropped
+        """
+        if self.listen_key is None:
+            self.listen_key = self.create_listen_key()
+        if self.listen_key is None:
+            print("Could not create a listen key, retrying...")
+            return None
+        return self.client.wss_url + "/" + self.listen_key
+
+    def reconnect(self):
+        self.listen_key = None
+        self.runner.reconnect()
+
+    def on_open(self, ws):
+        print("User data stream connection established")
+        self.connected = True
+        self.connections += 1
+
+    def on_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+        print(f"User data stream connection closed with code: {close_status_code} and msg: {close_msg}")
+
+    def on_error(self, ws, msg):
+        print(f"User data stream error: {msg}")
+
+    def on_message(self, ws, msg):
+        if self.client.recorder is not None:
+            self.client.recorder.record(msg)
+
+        data = json.loads(msg)
+        event_type = data.get("e")
+
+        if event_type == "listenKeyExpired":
+            print("User data stream listen key expired, reconnecting.")
+            self.reconnect()
+            return
+
+        with self.lock:
+            callbacks = list(self.callbacks.get(event_type, []))
+
+        for callback in callbacks:
+            try:
+                callback(data)
+            except Exception as e:
+                print(f"Callback of user data event {event_type} failed with: {e}")
+
+    def start(self):
+        """
+        Open the connection and the keepalive loop in background threads
+        """
+        if self.running:
+            return
+
+        self.running = True
+        self.runner.start()
+        self.keepalive_thread = threading.Thread(target=self.keepalive, daemon=True)
+        self.keepalive_thread.start()
+
+    def stop(self):
+        self.running = False
+        self.runner.stop()
+        self.close_listen_key()
@@ -9,7 +9,7 @@ class ExitRules:
     def entry_long(self):
         """Add to data last entry trade price"""
         entry_buy_cond = (self.data.position == 1) & (
-                (self.data.shift(1).position == 0) | (self.data.shift(1).position == -1))
+                (self.data.position.shift(1) == 0) | (self.data.position.shift(1) == -1))
         self.data["entry_long"] = np.nan
         self.data.loc[entry_buy_cond, "entry_long"] = self.data.Close
         self.data["entry_long"].fillna(method='ffill', inplace=True)
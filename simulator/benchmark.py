@@ -0,0 +1,124 @@
+import time
+import tempfile
+import argparse
+import threading
+import numpy as np
+
+from storage.kline_store import KlineStore
+from time_operators.time_operator import TimeOperator
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from simulator.exchange import SimulatedExchange
+from simulator.server import SimulatorServer
+
+
+def random_walk_columns(start: int, interval_ms: int, candles: int, price=30000.0, seed=0) -> dict:
+    """
+    Synthetic candles of a geometric random walk in the KlineStore column layout
+    """
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.001, candles)))
+    open_ = np.concatenate([[price], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.0005, candles)) * close
+
+    return {
+        "open_time": start + np.arange(candles, dtype=np.int64) * interval_ms,
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.uniform(1, 100, candles),
+    }
+
+
+def percentiles(samples: list) -> str:
+    samples = np.array(samples) * 1000
+    return f"p50 {np.percentile(samples, 50):.2f} ms, p99 {np.percentile(samples, 99):.2f} ms"
+
+
+def benchmark(candles=100000, requests=500, orders=50, stream_seconds=5.0, workers=8):
+    time_operator = TimeOperator()
+    interval_ms = time_operator.interval_to_milliseconds("1m")
+    start = time_operator.generate_current_timestamp() - candles * interval_ms
+    start -= start % interval_ms
+
+    store = KlineStore(tempfile.mkdtemp(prefix="simulator-"))
+    columns = random_walk_columns(start, interval_ms, candles)
+    store.write("BTCUSDT", "1m", columns, start, int(columns["open_time"][-1]))
+
+    exchange = SimulatedExchange(store, ["BTCUSDT"], "1m", balances={"USDT": 1e9, "BTC": 1e4})
+    server = SimulatorServer(exchange, port=0, step_interval=0.01)
+    server.start(replay=False)
+
+    # Dedicated limiter, the exchange weight limits don't apply to the simulator. Without a ticker TTL every
+    # price is a round trip.
+    client = BinanceClient("key", "secret", base_url=server.base_url, wss_base_url=server.wss_base_url,
+                           kline_cache_dir=None, ticker_ttl=0, rate_limiter=RateLimiter(weight_per_minute=10 ** 9,
+                                                                          orders_per_10s=10 ** 9))
+
+    latencies = []
+    for _ in range(requests):
+        t = time.perf_counter()
+        client.get_current_price("BTCUSDT")
+        latencies.append(time.perf_counter() - t)
+    print(f"ticker/price x {requests}: {percentiles(latencies)}")
+
+    for page_workers in [1, workers]:
+        t = time.perf_counter()
+        data = client.get_historicals("BTCUSDT", "1m", start, workers=page_workers)
+        elapsed = time.perf_counter() - t
+        print(f"get_historicals {len(data)} candles, {page_workers} workers: {elapsed:.2f} s "
+              f"({len(data) / elapsed:.0f} candles/s)")
+
+    price = client.get_current_price("BTCUSDT")
+    grid = [dict(symbol="BTCUSDT", side="BUY", price=round(price * (1 - 0.001 * (i + 1)), 2), amount=0.01)
+            for i in range(orders)]
+    t = time.perf_counter()
+    placed = client.batch_orders(grid, workers=workers)
+    print(f"batch_orders x {orders}: {(time.perf_counter() - t) * 1000:.1f} ms, "
+          f"{sum(order is not None for order in placed)} accepted")
+
+    t = time.perf_counter()
+    for order in grid:
+        client.new_order(**order)
+    print(f"sequential orders x {orders}: {(time.perf_counter() - t) * 1000:.1f} ms")
+    client.cancel_all_orders("BTCUSDT")
+
+    # Stream latency: event time of the server to the callback of the client
+    stream_latencies = []
+    received = threading.Event()
+
+    def on_kline(data):
+        stream_latencies.append(time_operator.generate_current_timestamp() - data["E"])
+        received.set()
+
+    client.get_stream_manager().kline("BTCUSDT", "1m", on_kline)
+    # Rewind the replay so there are candles left to stream
+    exchange.clock = start
+    threading.Thread(target=server.replay, daemon=True).start()
+    received.wait(timeout=10)
+    time.sleep(stream_seconds)
+    server.running = False
+
+    if stream_latencies:
+        print(f"kline stream: {len(stream_latencies)} events in {stream_seconds:.0f} s, "
+              f"latency p50 {np.percentile(stream_latencies, 50):.1f} ms, "
+              f"p99 {np.percentile(stream_latencies, 99):.1f} ms")
+    else:
+        print("kline stream: no events received")
+
+    client.get_stream_manager().stop()
+    client.close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the connector against the local simulator")
+    parser.add_argument("--candles", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--stream-seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    benchmark(args.candles, args.requests, args.orders, args.stream_seconds, args.workers)
@@ -0,0 +1,468 @@
+import threading
+import numpy as np
+
+from time_operators.time_operator import TimeOperator
+
+
+class SimulatedExchange:
+    """
+    Matching engine of the simulator: replays candles of a KlineStore one step at a time, fills the resting
+    limit orders a candle trades through and keeps the balances of a single account.
+    Events (klines, book tickers, depth diffs, order and account updates) are handed to the listeners as
+    (stream, payload), account events use the stream name "user".
+    """
+
+    TICK_SIZE = 0.01
+    STEP_SIZE = 0.00001
+    MIN_NOTIONAL = 5.0
+    # Levels of every side of the synthetic order book
+    DEPTH_LEVELS = 20
+
+    def __init__(self, store, symbols: list, interval="1m", start=None, end=None, balances=None, fee=0.001,
+                 quote_asset="USDT"):
+        """
+        :param store: KlineStore holding the candles to replay
+        :param balances: starting free balances of the account, e.g. {"USDT": 10000.0}
+        :param fee: trading fee as a fraction of the traded amount
+        """
+        self.time = TimeOperator()
+        self.store = store
+        self.interval = interval
+        self.interval_ms = self.time.interval_to_milliseconds(interval)
+        self.fee = fee
+        self.quote_asset = str(quote_asset).upper()
+
+        self.candles = dict()
+        self.base_assets = dict()
+        for symbol in symbols:
+            symbol = str(symbol).upper()
+            if not symbol.endswith(self.quote_asset):
+                raise ValueError(f"Symbol {symbol} is not quoted in {self.quote_asset}")
+            columns = {column: np.array(values) for column, values in store.read(symbol, interval, start, end).items()}
+            if len(columns["open_time"]) == 0:
+                raise ValueError(f"No stored {interval} candles of {symbol}")
+            self.candles[symbol] = columns
+            self.base_assets[symbol] = symbol[:-len(self.quote_asset)]
+
+        # Replay clock, open time of the last candle traded
+        self.clock = min(int(columns["open_time"][0]) for columns in self.candles.values())
+        self.end_time = max(int(columns["open_time"][-1]) for columns in self.candles.values())
+
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.pending = []
+        self.orders = dict()
+        self.open_orders = {symbol: dict() for symbol in self.candles}
+        self.next_order_id = 1
+        # Update id of the last depth event of every symbol
+        self.depth_ids = {symbol: 1 for symbol in self.candles}
+
+        if balances is None:
+            balances = {self.quote_asset: 10000.0}
+        assets = [self.quote_asset] + list(self.base_assets.values())
+        self.balances = {asset: {"free": 0.0, "locked": 0.0} for asset in assets}
+        for asset, amount in balances.items():
+            self.balances[str(asset).upper()] = {"free": float(amount), "locked": 0.0}
+
+    # EVENTS -----------------------------------------------------------------------------------------------------------
+
+    def emit(self, stream: str, payload: dict):
+        self.pending.append((stream, payload))
+
+    def flush(self):
+        """
+        Hand the queued events to the listeners, outside of the engine lock so a slow socket can't stall matching
+        """
+        with self.lock:
+            events, self.pending = self.pending, []
+        for stream, payload in events:
+            for listener in self.listeners:
+                listener(stream, payload)
+
+    def emit_account(self, assets: list):
+        payload = dict()
+        payload["e"] = "outboundAccountPosition"
+        payload["E"] = self.time.generate_current_timestamp()
+        payload["u"] = payload["E"]
+        payload["B"] = [{"a": asset, "f": f"{self.balances[asset]['free']:.8f}",
+                         "l": f"{self.balances[asset]['locked']:.8f}"} for asset in assets]
+        self.emit("user", payload)
+
+    def emit_order(self, order: dict, execution_type: str, last_qty=0.0, last_price=0.0):
+        payload = dict()
+        payload["e"] = "executionReport"
+        payload["E"] = self.time.generate_current_timestamp()
+        payload["s"] = order["symbol"]
+        payload["S"] = order["side"]
+        payload["o"] = order["type"]
+        payload["f"] = order["timeInForce"]
+        payload["q"] = order["origQty"]
+        payload["p"] = order["price"]
+        payload["x"] = execution_type
+        payload["X"] = order["status"]
+        payload["i"] = order["orderId"]
+        payload["l"] = f"{last_qty:.8f}"
+        payload["z"] = order["executedQty"]
+        payload["L"] = f"{last_price:.8f}"
+        payload["T"] = payload["E"]
+        self.emit("user", payload)
+
+    # MARKET DATA ------------------------------------------------------------------------------------------------------
+
+    def symbol(self, symbol) -> str:
+        symbol = str(symbol).upper()
+        if symbol not in self.candles:
+            raise ValueError("Invalid symbol.")
+        return symbol
+
+    def index(self, symbol: str) -> int:
+        """
+        Position of the last replayed candle of a symbol (-1 before its first candle)
+        """
+        return int(np.searchsorted(self.candles[symbol]["open_time"], self.clock, side="right")) - 1
+
+    def price(self, symbol: str) -> float:
+        columns = self.candles[symbol]
+        i = self.index(symbol)
+        return float(columns["close"][i]) if i >= 0 else float(columns["open"][0])
+
+    def ticker_price(self, symbol=None, symbols=None):
+        with self.lock:
+            if symbol is not None:
+                symbol = self.symbol(symbol)
+                return {"symbol": symbol, "price": f"{self.price(symbol):.8f}"}
+            symbols = [self.symbol(s) for s in symbols] if symbols is not None else list(self.candles)
+            return [{"symbol": s, "price": f"{self.price(s):.8f}"} for s in symbols]
+
+    def book_ticker(self, symbol) -> dict:
+        with self.lock:
+            symbol = self.symbol(symbol)
+            price = self.price(symbol)
+        return {"symbol": symbol,
+                "bidPrice": f"{price - self.TICK_SIZE / 2:.8f}", "bidQty": "1.00000000",
+                "askPrice": f"{price + self.TICK_SIZE / 2:.8f}", "askQty": "1.00000000"}
+
+    def depth_levels(self, symbol: str) -> tuple:
+        """
+        Bid and ask prices of the synthetic book around the current price, one tick apart with the book ticker's
+        prices on top. Every level holds 1 unit.
+        """
+        price = self.price(symbol)
+        bids = [f"{price - self.TICK_SIZE * (i + 0.5):.8f}" for i in range(self.DEPTH_LEVELS)]
+        asks = [f"{price + self.TICK_SIZE * (i + 0.5):.8f}" for i in range(self.DEPTH_LEVELS)]
+        return bids, asks
+
+    def depth(self, symbol, limit=100) -> dict:
+        """
+        Order book snapshot in the /api/v3/depth format, the depth events continue from its lastUpdateId
+        """
+        with self.lock:
+            symbol = self.symbol(symbol)
+            bids, asks = self.depth_levels(symbol)
+            last_update_id = self.depth_ids[symbol]
+        limit = int(limit)
+        return {"lastUpdateId": last_update_id,
+                "bids": [[price, "1.00000000"] for price in bids[:limit]],
+                "asks": [[price, "1.00000000"] for price in asks[:limit]]}
+
+    def klines(self, symbol, interval, start=None, end=None, limit=500) -> list:
+        """
+        Stored candles in the /api/v3/klines format, the whole store is served (not only the replayed part)
+        """
+        symbol = str(symbol).upper()
+        columns = self.store.read(symbol, interval, start, end)
+        interval_ms = self.time.interval_to_milliseconds(interval)
+
+        rows = min(len(columns["open_time"]), int(limit))
+        return [[int(columns["open_time"][i]),
+                 f"{columns['open'][i]:.8f}",
+                 f"{columns['high'][i]:.8f}",
+                 f"{columns['low'][i]:.8f}",
+                 f"{columns['close'][i]:.8f}",
+                 f"{columns['volume'][i]:.8f}",
+                 int(columns["open_time"][i]) + interval_ms - 1,
+                 f"{columns['volume'][i] * columns['close'][i]:.8f}",
+                 0, "0", "0", "0"] for i in range(rows)]
+
+    def exchange_info(self) -> dict:
+        symbols = []
+        for symbol, base_asset in self.base_assets.items():
+            symbol_data = dict()
+            symbol_data["symbol"] = symbol
+            symbol_data["status"] = "TRADING"
+            symbol_data["baseAsset"] = base_asset
+            symbol_data["baseAssetPrecision"] = 8
+            symbol_data["quoteAsset"] = self.quote_asset
+            symbol_data["quotePrecision"] = 8
+            symbol_data["orderTypes"] = ["LIMIT", "MARKET"]
+            symbol_data["permissions"] = ["SPOT"]
+            symbol_data["filters"] = [
+                {"filterType": "PRICE_FILTER", "minPrice": f"{self.TICK_SIZE:.8f}", "maxPrice": "1000000.00000000",
+                 "tickSize": f"{self.TICK_SIZE:.8f}"},
+                {"filterType": "LOT_SIZE", "minQty": f"{self.STEP_SIZE:.8f}", "maxQty": "9000.00000000",
+                 "stepSize": f"{self.STEP_SIZE:.8f}"},
+                {"filterType": "NOTIONAL", "minNotional": f"{self.MIN_NOTIONAL:.8f}"},
+            ]
+            symbols.append(symbol_data)
+
+        return {"timezone": "UTC", "serverTime": self.time.generate_current_timestamp(), "rateLimits": [],
+                "symbols": symbols}
+
+    # ACCOUNT ----------------------------------------------------------------------------------------------------------
+
+    def account(self) -> dict:
+        with self.lock:
+            balances = [{"asset": asset, "free": f"{balance['free']:.8f}", "locked": f"{balance['locked']:.8f}"}
+                        for asset, balance in self.balances.items()]
+        return {"canTrade": True, "accountType": "SPOT", "updateTime": self.time.generate_current_timestamp(),
+                "balances": balances, "permissions": ["SPOT"]}
+
+    def move(self, asset: str, free=0.0, locked=0.0):
+        balance = self.balances.setdefault(asset, {"free": 0.0, "locked": 0.0})
+        balance["free"] += free
+        balance["locked"] += locked
+
+    # ORDERS -----------------------------------------------------------------------------------------------------------
+
+    def new_order(self, params: dict) -> dict:
+        with self.lock:
+            order = self._new_order(params)
+        self.flush()
+        return order
+
+    def _new_order(self, params: dict) -> dict:
+        symbol = self.symbol(params.get("symbol"))
+        side = str(params.get("side", "")).upper()
+        order_type = str(params.get("type", "")).upper()
+        if side not in ["BUY", "SELL"]:
+            raise ValueError(f"Invalid side {side}.")
+        if order_type not in ["LIMIT", "MARKET"]:
+            raise ValueError(f"Unsupported order type {order_type}.")
+
+        base_asset = self.base_assets[symbol]
+        market_price = self.price(symbol)
+
+        if order_type == "LIMIT":
+            if "price" not in params or "quantity" not in params:
+                raise ValueError("LIMIT orders need a price and a quantity.")
+            price = float(params["price"])
+        else:
+            price = market_price
+
+        if "quantity" in params:
+            quantity = float(params["quantity"])
+        elif "quoteOrderQty" in params:
+            quantity = float(params["quoteOrderQty"]) / price
+        else:
+            raise ValueError("Order needs a quantity or a quoteOrderQty.")
+
+        if quantity <= 0 or price * quantity < self.MIN_NOTIONAL:
+            raise ValueError("Filter failure: NOTIONAL")
+
+        # Funds are locked until the order is filled or canceled
+        if side == "BUY":
+            asset, amount = self.quote_asset, price * quantity
+        else:
+            asset, amount = base_asset, quantity
+        if self.balances.get(asset, {"free": 0.0})["free"] < amount - 1e-12:
+            raise ValueError("Account has insufficient balance for requested action.")
+        self.move(asset, free=-amount, locked=amount)
+
+        now = self.time.generate_current_timestamp()
+        order = dict()
+        order["symbol"] = symbol
+        order["orderId"] = self.next_order_id
+        order["clientOrderId"] = str(params.get("newClientOrderId", f"sim{self.next_order_id}"))
+        order["transactTime"] = now
+        order["price"] = f"{price:.8f}"
+        order["origQty"] = f"{quantity:.8f}"
+        order["executedQty"] = "0.00000000"
+        order["cummulativeQuoteQty"] = "0.00000000"
+        order["status"] = "NEW"
+        order["timeInForce"] = str(params.get("timeInForce", "GTC"))
+        order["type"] = order_type
+        order["side"] = side
+        order["time"] = now
+        order["updateTime"] = now
+        self.next_order_id += 1
+
+        self.orders[order["orderId"]] = order
+        self.emit_order(order, "NEW")
+
+        # Marketable orders take the current price, the rest waits in the book
+        if order_type == "MARKET" or (side == "BUY" and price >= market_price) or \
+                (side == "SELL" and price <= market_price):
+            self.fill(order, market_price)
+        else:
+            self.open_orders[symbol][order["orderId"]] = order
+            self.emit_account([asset])
+
+        return dict(order)
+
+    def fill(self, order: dict, fill_price: float):
+        symbol = order["symbol"]
+        base_asset = self.base_assets[symbol]
+        price, quantity = float(order["price"]), float(order["origQty"])
+
+        if order["side"] == "BUY":
+            # Locked at the limit price, the difference to the fill price is released
+            self.move(self.quote_asset, free=quantity * (price - fill_price), locked=-quantity * price)
+            self.move(base_asset, free=quantity * (1 - self.fee))
+        else:
+            self.move(base_asset, locked=-quantity)
+            self.move(self.quote_asset, free=quantity * fill_price * (1 - self.fee))
+
+        order["status"] = "FILLED"
+        order["executedQty"] = order["origQty"]
+        order["cummulativeQuoteQty"] = f"{quantity * fill_price:.8f}"
+        order["updateTime"] = self.time.generate_current_timestamp()
+        self.open_orders[symbol].pop(order["orderId"], None)
+
+        self.emit_order(order, "TRADE", quantity, fill_price)
+        self.emit_account([base_asset, self.quote_asset])
+
+    def find_order(self, symbol: str, order_id) -> dict:
+        order = self.orders.get(int(order_id))
+        if order is None or order["symbol"] != symbol:
+            raise ValueError("Order does not exist.")
+        return order
+
+    def order_status(self, symbol, order_id) -> dict:
+        with self.lock:
+            return dict(self.find_order(self.symbol(symbol), order_id))
+
+    def get_open_orders(self, symbol=None) -> list:
+        with self.lock:
+            symbols = [self.symbol(symbol)] if symbol is not None else list(self.open_orders)
+            return [dict(order) for s in symbols for order in self.open_orders[s].values()]
+
+    def cancel_order(self, symbol, order_id) -> dict:
+        with self.lock:
+            order = self._cancel_order(self.symbol(symbol), order_id)
+        self.flush()
+        return order
+
+    def _cancel_order(self, symbol: str, order_id) -> dict:
+        order = self.find_order(symbol, order_id)
+        if order["orderId"] not in self.open_orders[symbol]:
+            raise ValueError("Unknown order sent.")
+
+        price, quantity = float(order["price"]), float(order["origQty"])
+        if order["side"] == "BUY":
+            asset, amount = self.quote_asset, price * quantity
+        else:
+            asset, amount = self.base_assets[symbol], quantity
+        self.move(asset, free=amount, locked=-amount)
+
+        order["status"] = "CANCELED"
+        order["updateTime"] = self.time.generate_current_timestamp()
+        del self.open_orders[symbol][order["orderId"]]
+
+        self.emit_order(order, "CANCELED")
+        self.emit_account([asset])
+        return dict(order)
+
+    def cancel_all_orders(self, symbol) -> list:
+        with self.lock:
+            symbol = self.symbol(symbol)
+            canceled = [self._cancel_order(symbol, order_id) for order_id in list(self.open_orders[symbol])]
+        self.flush()
+        return canceled
+
+    def cancel_replace(self, params: dict) -> dict:
+        """
+        Cancel an order and place a new one atomically (cancelReplaceMode STOP_ON_FAILURE or ALLOW_FAILURE)
+        """
+        with self.lock:
+            symbol = self.symbol(params.get("symbol"))
+            response = {"cancelResult": "SUCCESS", "newOrderResult": "NOT_ATTEMPTED"}
+            try:
+                response["cancelResponse"] = self._cancel_order(symbol, params.get("cancelOrderId"))
+            except ValueError as e:
+                response["cancelResult"] = "FAILURE"
+                response["cancelResponse"] = {"code": -2011, "msg": str(e)}
+                if params.get("cancelReplaceMode", "STOP_ON_FAILURE") == "STOP_ON_FAILURE":
+                    raise ValueError("Order cancel-replace failed.")
+
+            try:
+                response["newOrderResponse"] = self._new_order(params)
+                response["newOrderResult"] = "SUCCESS"
+            except ValueError as e:
+                response["newOrderResult"] = "FAILURE"
+                response["newOrderResponse"] = {"code": -2010, "msg": str(e)}
+
+        self.flush()
+        return response
+
+    # REPLAY -----------------------------------------------------------------------------------------------------------
+
+    def step(self) -> bool:
+        """
+        Replay the next candle of every symbol, returns False once the stored data is exhausted
+        """
+        with self.lock:
+            if self.clock >= self.end_time:
+                return False
+            books = {symbol: self.depth_levels(symbol) for symbol in self.candles}
+            self.clock += self.interval_ms
+
+            for symbol, columns in self.candles.items():
+                i = self.index(symbol)
+                if i < 0 or int(columns["open_time"][i]) != self.clock:
+                    continue
+                low, high = float(columns["low"][i]), float(columns["high"][i])
+
+                for order in list(self.open_orders[symbol].values()):
+                    price = float(order["price"])
+                    if (order["side"] == "BUY" and low <= price) or (order["side"] == "SELL" and high >= price):
+                        self.fill(order, price)
+
+                self.emit_kline(symbol, columns, i)
+                self.emit(symbol.lower() + "@bookTicker", self.book_ticker_event(symbol))
+                self.emit_depth(symbol, books[symbol])
+
+        self.flush()
+        return True
+
+    def emit_kline(self, symbol: str, columns: dict, i: int):
+        kline = dict()
+        kline["t"] = int(columns["open_time"][i])
+        kline["T"] = kline["t"] + self.interval_ms - 1
+        kline["s"] = symbol
+        kline["i"] = self.interval
+        kline["o"] = f"{columns['open'][i]:.8f}"
+        kline["c"] = f"{columns['close'][i]:.8f}"
+        kline["h"] = f"{columns['high'][i]:.8f}"
+        kline["l"] = f"{columns['low'][i]:.8f}"
+        kline["v"] = f"{columns['volume'][i]:.8f}"
+        kline["x"] = True
+
+        payload = {"e": "kline", "E": self.time.generate_current_timestamp(), "s": symbol, "k": kline}
+        self.emit(symbol.lower() + "@kline_" + self.interval, payload)
+
+    def book_ticker_event(self, symbol: str) -> dict:
+        ticker = self.book_ticker(symbol)
+        return {"u": self.clock, "s": symbol, "b": ticker["bidPrice"], "B": ticker["bidQty"],
+                "a": ticker["askPrice"], "A": ticker["askQty"]}
+
+    def emit_depth(self, symbol: str, previous: tuple):
+        """
+        Depth diff of the book moving from the previous levels to the current price, levels left get quantity 0.
+        Sent on the 1000ms and the 100ms depth stream.
+        """
+        self.depth_ids[symbol] += 1
+        bids, asks = self.depth_levels(symbol)
+
+        payload = dict()
+        payload["e"] = "depthUpdate"
+        payload["E"] = self.time.generate_current_timestamp()
+        payload["s"] = symbol
+        payload["U"] = self.depth_ids[symbol]
+        payload["u"] = self.depth_ids[symbol]
+        payload["b"] = [[price, "0.00000000"] for price in previous[0] if price not in bids] + \
+                       [[price, "1.00000000"] for price in bids]
+        payload["a"] = [[price, "0.00000000"] for price in previous[1] if price not in asks] + \
+                       [[price, "1.00000000"] for price in asks]
+
+        self.emit(symbol.lower() + "@depth", payload)
+        self.emit(symbol.lower() + "@depth@100ms", payload)
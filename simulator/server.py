@@ -0,0 +1,358 @@
+import time
+import json
+import base64
+import hashlib
+import secrets
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+
+# Magic value of the websocket handshake (RFC 6455)
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class WebSocketConnection:
+    """ Server side of a websocket connection, only what the Binance streams need (text, ping and close frames) """
+
+    def __init__(self, rfile, wfile, combined=False, listen_key=None):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.combined = combined
+        self.listen_key = listen_key
+        self.streams = set()
+        self.send_lock = threading.Lock()
+        self.closed = False
+
+    def send_frame(self, opcode: int, payload: bytes):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+
+        with self.send_lock:
+            if self.closed:
+                return
+            try:
+                self.wfile.write(header + payload)
+                self.wfile.flush()
+            except (OSError, ValueError):
+                self.closed = True
+
+    def send_text(self, text: str):
+        self.send_frame(0x1, text.encode())
+
+    def send_stream(self, stream: str, payload: dict):
+        self.send_text(json.dumps({"stream": stream, "data": payload} if self.combined else payload))
+
+    def receive(self):
+        """
+        Returns the (opcode, payload) of the next frame or None once the connection is gone
+        """
+        try:
+            header = self.rfile.read(2)
+            if len(header) < 2:
+                return None
+            opcode, length = header[0] & 0x0F, header[1] & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self.rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self.rfile.read(8))[0]
+
+            # Client frames are always masked
+            mask = self.rfile.read(4) if header[1] & 0x80 else b"\x00\x00\x00\x00"
+            payload = bytearray(self.rfile.read(length))
+            for i in range(len(payload)):
+                payload[i] ^= mask[i % 4]
+            return opcode, bytes(payload)
+        except (OSError, struct.error):
+            return None
+
+
+class SimulatorRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, the clients reuse pooled connections
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, Nagle + delayed ACK would add ~40 ms to every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_method("GET")
+
+    def do_POST(self):
+        self.handle_method("POST")
+
+    def do_PUT(self):
+        self.handle_method("PUT")
+
+    def do_DELETE(self):
+        self.handle_method("DELETE")
+
+    def handle_method(self, method: str):
+        url = urlparse(self.path)
+        params = dict(parse_qsl(url.query))
+
+        length = int(self.headers.get("Content-Length", 0))
+        if length > 0:
+            params.update(parse_qsl(self.rfile.read(length).decode()))
+
+        if method == "GET" and self.headers.get("Upgrade", "").lower() == "websocket":
+            self.handle_websocket(url.path, params)
+            return
+
+        status, body = self.server.simulator.route(method, url.path, params)
+        content = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def handle_websocket(self, path: str, params: dict):
+        simulator = self.server.simulator
+        accept = base64.b64encode(hashlib.sha1((self.headers["Sec-WebSocket-Key"] + WS_GUID).encode()).digest())
+
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept.decode())
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        # /ws, /ws/<stream>/<stream>, /ws/<listenKey> and /stream?streams=<stream>/<stream>
+        parts = [part for part in path.split("/") if part]
+        connection = WebSocketConnection(self.rfile, self.wfile, combined=parts[:1] == ["stream"])
+        if parts[:1] == ["ws"] and len(parts) == 2 and parts[1] in simulator.listen_keys:
+            connection.listen_key = parts[1]
+        elif parts[:1] == ["ws"]:
+            connection.streams.update(parts[1:])
+        elif "streams" in params:
+            connection.streams.update(stream for stream in params["streams"].split("/") if stream)
+
+        simulator.add_connection(connection)
+        try:
+            while not connection.closed:
+                frame = connection.receive()
+                if frame is None:
+                    break
+                opcode, payload = frame
+                if opcode == 0x1:
+                    simulator.on_ws_request(connection, payload)
+                elif opcode == 0x9:
+                    connection.send_frame(0xA, payload)
+                elif opcode == 0x8:
+                    connection.send_frame(0x8, payload[:2])
+                    break
+        finally:
+            connection.closed = True
+            simulator.remove_connection(connection)
+
+
+class SimulatorServer:
+    """
+    Local stand-in of the Binance REST API and websocket streams backed by a SimulatedExchange.
+    Signatures and API keys are not checked. Point a client to it with
+    BinanceClient(key, secret, base_url=server.base_url, wss_base_url=server.wss_base_url).
+    """
+
+    def __init__(self, exchange, host="127.0.0.1", port=8765, step_interval=1.0):
+        """
+        :param exchange: SimulatedExchange serving the requests
+        :param port: port of the server, 0 picks a free one
+        :param step_interval: seconds between two replayed candles
+        """
+        self.exchange = exchange
+        self.step_interval = step_interval
+        self.httpd = ThreadingHTTPServer((host, port), SimulatorRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.simulator = self
+        self.host, self.port = self.httpd.server_address[:2]
+
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.listen_keys = set()
+        self.running = False
+        self.threads = []
+
+        self.routes = {
+            ("GET", "/api/v3/ping"): lambda params: {},
+            ("GET", "/api/v3/time"): lambda params: {"serverTime": self.exchange.time.generate_current_timestamp()},
+            ("GET", "/api/v3/exchangeInfo"): lambda params: self.exchange.exchange_info(),
+            ("GET", "/api/v3/klines"): self.klines,
+            ("GET", "/api/v3/ticker/price"): self.ticker_price,
+            ("GET", "/api/v3/ticker/bookTicker"): lambda params: self.exchange.book_ticker(params.get("symbol")),
+            ("GET", "/api/v3/depth"): lambda params: self.exchange.depth(params.get("symbol"),
+                                                                         params.get("limit", 100)),
+            ("GET", "/api/v3/account"): lambda params: self.exchange.account(),
+            ("GET", "/api/v3/order"): lambda params: self.exchange.order_status(params.get("symbol"),
+                                                                               params.get("orderId")),
+            ("POST", "/api/v3/order"): self.exchange.new_order,
+            ("DELETE", "/api/v3/order"): lambda params: self.exchange.cancel_order(params.get("symbol"),
+                                                                                  params.get("orderId")),
+            ("POST", "/api/v3/order/cancelReplace"): self.exchange.cancel_replace,
+            ("GET", "/api/v3/openOrders"): lambda params: self.exchange.get_open_orders(params.get("symbol")),
+            ("DELETE", "/api/v3/openOrders"): lambda params: self.exchange.cancel_all_orders(params.get("symbol")),
+            ("POST", "/api/v3/userDataStream"): self.create_listen_key,
+            ("PUT", "/api/v3/userDataStream"): self.keepalive_listen_key,
+            ("DELETE", "/api/v3/userDataStream"): self.close_listen_key,
+        }
+
+        self.exchange.listeners.append(self.publish)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def wss_base_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    # REST API ---------------------------------------------------------------------------------------------------------
+
+    def route(self, method: str, path: str, params: dict):
+        """
+        Returns (status code, body) of a REST request
+        """
+        handler = self.routes.get((method, path))
+        if handler is None:
+            return 404, {"code": -1100, "msg": f"Unknown endpoint {method} {path}"}
+
+        try:
+            return 200, handler(params)
+        except ValueError as e:
+            return 400, {"code": -2010, "msg": str(e)}
+        except Exception as e:
+            return 500, {"code": -1000, "msg": f"Simulator error: {e}"}
+
+    def klines(self, params: dict) -> list:
+        start = int(params["startTime"]) if "startTime" in params else None
+        end = int(params["endTime"]) if "endTime" in params else None
+        return self.exchange.klines(params.get("symbol"), params.get("interval"), start, end,
+                                    int(params.get("limit", 500)))
+
+    def ticker_price(self, params: dict):
+        if "symbols" in params:
+            return self.exchange.ticker_price(symbols=json.loads(params["symbols"]))
+        return self.exchange.ticker_price(symbol=params.get("symbol"))
+
+    def create_listen_key(self, params: dict) -> dict:
+        listen_key = secrets.token_hex(32)
+        self.listen_keys.add(listen_key)
+        return {"listenKey": listen_key}
+
+    def keepalive_listen_key(self, params: dict) -> dict:
+        if params.get("listenKey") not in self.listen_keys:
+            raise ValueError("This listenKey does not exist.")
+        return {}
+
+    def close_listen_key(self, params: dict) -> dict:
+        self.listen_keys.discard(params.get("listenKey"))
+        return {}
+
+    # WEBSOCKET API ----------------------------------------------------------------------------------------------------
+
+    def add_connection(self, connection: WebSocketConnection):
+        with self.lock:
+            self.connections.add(connection)
+
+    def remove_connection(self, connection: WebSocketConnection):
+        with self.lock:
+            self.connections.discard(connection)
+
+    def on_ws_request(self, connection: WebSocketConnection, payload: bytes):
+        try:
+            request = json.loads(payload)
+            method, params = request.get("method"), request.get("params", [])
+        except Exception:
+            connection.send_text(json.dumps({"error": {"code": 3, "msg": "Invalid JSON"}}))
+            return
+
+        result = None
+        if method == "SUBSCRIBE":
+            connection.streams.update(params)
+        elif method == "UNSUBSCRIBE":
+            connection.streams.difference_update(params)
+        elif method == "LIST_SUBSCRIPTIONS":
+            result = sorted(connection.streams)
+        connection.send_text(json.dumps({"result": result, "id": request.get("id")}))
+
+    def publish(self, stream: str, payload: dict):
+        """
+        Exchange listener, sends an event to every connection subscribed to its stream
+        """
+        with self.lock:
+            if stream == "user":
+                receivers = [c for c in self.connections if c.listen_key is not None]
+            else:
+                receivers = [c for c in self.connections if stream in c.streams]
+
+        for connection in receivers:
+            connection.send_stream(stream, payload)
+
+    # LIFECYCLE --------------------------------------------------------------------------------------------------------
+
+    def replay(self):
+        while self.running:
+            if not self.exchange.step():
+                print("Simulator replayed all stored candles.")
+                break
+            time.sleep(self.step_interval)
+
+    def start(self, replay=True):
+        """
+        Serve requests (and replay candles) in background threads
+        """
+        self.running = True
+        self.threads = [threading.Thread(target=self.httpd.serve_forever, daemon=True)]
+        if replay:
+            self.threads.append(threading.Thread(target=self.replay, daemon=True))
+        for thread in self.threads:
+            thread.start()
+        print(f"Simulator listening on {self.base_url}")
+
+    def stop(self):
+        self.running = False
+        self.httpd.shutdown()
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.send_frame(0x8, struct.pack("!H", 1000))
+            connection.closed = True
+        self.httpd.server_close()
+
+
+def main():
+    import argparse
+    from storage.kline_store import KlineStore
+    from simulator.exchange import SimulatedExchange
+
+    parser = argparse.ArgumentParser(description="Local Binance stand-in replaying stored candles")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT"])
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--store", default="./data/klines", help="KlineStore directory to replay")
+    parser.add_argument("--start", type=int, default=None, help="first replayed open time in ms")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--step-interval", type=float, default=1.0, help="seconds between replayed candles")
+    args = parser.parse_args()
+
+    exchange = SimulatedExchange(KlineStore(args.store), args.symbols, args.interval, start=args.start)
+    server = SimulatorServer(exchange, args.host, args.port, args.step_interval)
+    server.start()
+    try:
+        while server.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import os
+import re
+import zipfile
+import calendar
+import itertools
+import numpy as np
+
+from storage.kline_store import KlineStore
+from connectors.kline_decoder import KLINE_FIELDS, KLINE_WIDTH, empty_columns, concat_columns
+
+
+# SYMBOL-INTERVAL-YYYY-MM(.zip|.csv) of monthly and SYMBOL-INTERVAL-YYYY-MM-DD(.zip|.csv) of daily archives
+ARCHIVE_NAME = re.compile(r"^(?P<symbol>[A-Z0-9]+)-(?P<interval>\d+[smhdwM])-(?P<year>\d{4})-(?P<month>\d{2})"
+                          r"(?:-(?P<day>\d{2}))?\.(?:zip|csv)$")
+
+# Open times above this are in microseconds (used by the archives since 2025), milliseconds stay below it
+MICROSECONDS_THRESHOLD = 10 ** 14
+
+
+class KlineArchiveImporter:
+    """
+    Imports the kline archive files of data.binance.vision (monthly or daily, zipped or extracted CSV)
+    into a KlineStore, the same cache get_historicals and the Backtester read from.
+    """
+
+    def __init__(self, store=None, chunk_lines=100000):
+        """
+        :param chunk_lines: CSV lines parsed at once while an archive is streamed
+        """
+        self.store = store if store is not None else KlineStore()
+        self.chunk_lines = chunk_lines
+
+    def find_archives(self, directory: str, symbol=None, interval=None) -> dict:
+        """
+        Returns {(symbol, interval): [(period start, period end, path), ...]} of the archives in a directory tree,
+        periods sorted and a CSV skipped when its zip is there as well
+        """
+        archives = dict()
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                match = ARCHIVE_NAME.match(name)
+                if match is None:
+                    continue
+                if name.endswith(".csv") and name[:-4] + ".zip" in files:
+                    continue
+                if symbol is not None and match["symbol"] != str(symbol).upper():
+                    continue
+                if interval is not None and match["interval"] != interval:
+                    continue
+
+                year, month = int(match["year"]), int(match["month"])
+                if match["day"] is None:
+                    first_day, days = 1, calendar.monthrange(year, month)[1]
+                else:
+                    first_day, days = int(match["day"]), 1
+                start = calendar.timegm((year, month, first_day, 0, 0, 0)) * 1000
+                end = start + days * 86400 * 1000 - 1
+
+                key = (match["symbol"], match["interval"])
+                archives.setdefault(key, []).append((start, end, os.path.join(root, name)))
+
+        return {key: sorted(periods) for key, periods in archives.items()}
+
+    @staticmethod
+    def parse_csv(content: bytes) -> dict:
+        """
+        Parses the CSV content of an archive into kline column arrays
+        """
+        # Newer archives have a header line, every other field is a plain number
+        if content and not content[:1].isdigit():
+            content = content.split(b"\n", 1)[1] if b"\n" in content else b""
+
+        values = np.fromstring(content.replace(b"\r", b"").replace(b"\n", b","), dtype=np.float64, sep=",")
+        block = values.reshape(-1, KLINE_WIDTH)
+
+        columns = empty_columns(len(block))
+        for column, field in KLINE_FIELDS.items():
+            columns[column][:] = block[:, field]
+
+        if len(columns["open_time"]) and columns["open_time"][0] > MICROSECONDS_THRESHOLD:
+            columns["open_time"] //= 1000
+
+        return columns
+
+    def parse_lines(self, f):
+        """
+        Yields kline columns of chunk_lines lines of an open CSV file at a time
+        """
+        while True:
+            lines = list(itertools.islice(f, self.chunk_lines))
+            if not lines:
+                return
+            yield self.parse_csv(b"".join(lines))
+
+    def iter_archive(self, path: str):
+        """
+        Yields kline columns of one archive in chunks, zip members are decompressed while they are read
+        """
+        if path.endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.namelist():
+                    if member.endswith(".csv"):
+                        with archive.open(member) as f:
+                            yield from self.parse_lines(f)
+            return
+
+        with open(path, "rb") as f:
+            yield from self.parse_lines(f)
+
+    def read_archive(self, path: str) -> dict:
+        """
+        Returns kline columns of one archive
+        """
+        parts = list(self.iter_archive(path))
+        return concat_columns(*parts) if parts else empty_columns()
+
+    def contiguous_runs(self, periods: list) -> list:
+        """
+        Merges consecutive archive periods into [start, end, [(period start, period end, path), ...]] runs without
+        missing days
+        """
+        runs = []
+        for start, end, path in periods:
+            if runs and start <= runs[-1][1] + 1:
+                runs[-1][1] = max(runs[-1][1], end)
+                runs[-1][2].append((start, end, path))
+            else:
+                runs.append([start, end, [(start, end, path)]])
+        return runs
+
+    def import_run(self, symbol: str, interval: str, start: int, end: int, periods: list) -> int:
+        """
+        Writes one run of archives into the store an archive at a time, returns the number of candles read
+        """
+        # Every archive has to touch the stored range: the ones overlapping it first, then the older ones backwards
+        # and the newer ones forwards
+        coverage = self.store.coverage(symbol, interval)
+        if coverage is not None:
+            periods = sorted(periods, key=lambda period: (1, -period[0]) if period[1] < coverage[0] else
+                             (2, period[0]) if period[0] > coverage[1] else (0, period[0]))
+
+        rows = 0
+        for period_start, period_end, path in periods:
+            parts = list(self.iter_archive(path))
+            columns = concat_columns(*parts) if parts else empty_columns()
+            # The store sorts and drops duplicates while merging
+            self.store.write(symbol, interval, columns, period_start, period_end)
+            rows += len(columns["open_time"])
+        return rows
+
+    def import_directory(self, directory: str, symbol=None, interval=None, start=None, end=None, logs=True) -> dict:
+        """
+        Imports every archive of a directory tree, returns {(symbol, interval): number of imported candles}.
+        The store covers one continuous range per symbol and interval, so runs of archives which neither touch the
+        stored range nor each other are skipped (fetch the gap with get_historicals and import again). An empty store
+        starts from the most recent run, pass start / end to import an older one.
+
+        :param start: import only archives of periods ending at or after this timestamp (ms)
+        :param end: import only archives of periods starting at or before this timestamp (ms)
+        """
+        imported = dict()
+        for (archive_symbol, archive_interval), periods in self.find_archives(directory, symbol, interval).items():
+            periods = [(period_start, period_end, path) for period_start, period_end, path in periods
+                       if (start is None or period_end >= start) and (end is None or period_start <= end)]
+            pending = self.contiguous_runs(periods)
+            rows = 0
+
+            # Without stored data start from the most recent run, the one get_historicals extends up to now
+            if pending and self.store.coverage(archive_symbol, archive_interval) is None:
+                if len(pending) > 1:
+                    print(f"Archives of {archive_symbol} {archive_interval} form {len(pending)} runs with missing "
+                          f"days and the store is empty, importing only the latest run from {pending[-1][0]} to "
+                          f"{pending[-1][1]}. Pass start / end to import another one.")
+                rows += self.import_run(archive_symbol, archive_interval, *pending.pop())
+
+            progress = True
+            while progress and pending:
+                progress = False
+                coverage = self.store.coverage(archive_symbol, archive_interval)
+                for run in list(pending):
+                    if run[0] <= coverage[1] + 1 and run[1] >= coverage[0] - 1:
+                        rows += self.import_run(archive_symbol, archive_interval, *run)
+                        pending.remove(run)
+                        progress = True
+                        break
+
+            for run_start, run_end, run_periods in pending:
+                print(f"Skipped {len(run_periods)} archives of {archive_symbol} {archive_interval} from {run_start} to "
+                      f"{run_end}, they don't connect to the stored range.")
+
+            imported[(archive_symbol, archive_interval)] = rows
+            if logs:
+                print(f"Imported {rows} candles of {archive_symbol} {archive_interval}, "
+                      f"stored range: {self.store.coverage(archive_symbol, archive_interval)}")
+
+        return imported
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import Binance kline archives into the local kline store")
+    parser.add_argument("directory", help="directory with the downloaded .zip / .csv archives")
+    parser.add_argument("--store", default="./data/klines")
+    parser.add_argument("--symbol", default=None)
+    parser.add_argument("--interval", default=None)
+    parser.add_argument("--start", type=int, default=None, help="first timestamp (ms) to import")
+    parser.add_argument("--end", type=int, default=None, help="last timestamp (ms) to import")
+    args = parser.parse_args()
+
+    KlineArchiveImporter(KlineStore(args.store)).import_directory(args.directory, args.symbol, args.interval,
+                                                                  args.start, args.end)
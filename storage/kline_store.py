@@ -0,0 +1,264 @@
+import io
+import os
+import json
+import uuid
+import threading
+import numpy as np
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """ Exclusive lock of a file shared between processes, held while used as a context manager """
+
+    def __init__(self, file: str):
+        self.file = file
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.file, "a+b")
+        if os.name == "nt":
+            self.handle.seek(0)
+            # Retries for 10 seconds before raising, called again until the other process is done
+            while True:
+                try:
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        try:
+            if os.name == "nt":
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.handle.close()
+            self.handle = None
+
+
+class KlineStore:
+    """
+    Local on-disk cache of candlesticks, one directory per symbol and interval and one .npy file per column.
+    Candles following the stored ones are appended to the files in place, other writes rewrite them. Writers of
+    several processes sharing a directory take turns on a lock file, meta.json commits a write.
+    """
+
+    COLUMNS = {
+        "open_time": np.int64,
+        "open": np.float64,
+        "high": np.float64,
+        "low": np.float64,
+        "close": np.float64,
+        "volume": np.float64,
+    }
+
+    def __init__(self, root="./data/klines"):
+        self.root = root
+        self.lock = threading.Lock()
+
+    def path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, str(symbol).upper(), str(interval))
+
+    def meta(self, symbol: str, interval: str):
+        """
+        Returns the meta dict of a symbol and interval or None
+        """
+        meta_file = os.path.join(self.path(symbol, interval), "meta.json")
+        if not os.path.exists(meta_file):
+            return None
+
+        try:
+            with open(meta_file) as f:
+                meta = json.load(f)
+            int(meta["start"]), int(meta["end"])
+            return meta
+        except Exception as e:
+            print(f"Corrupted kline cache of {symbol} {interval}, ignoring it: {e}")
+            return None
+
+    def coverage(self, symbol: str, interval: str):
+        """
+        Returns a (start, end) range of timestamps already stored for a symbol and interval or None
+        """
+        meta = self.meta(symbol, interval)
+        if meta is None:
+            return None
+        return int(meta["start"]), int(meta["end"])
+
+    def empty_ranges(self, symbol: str, interval: str) -> list:
+        """
+        Returns the (start, end) ranges of the covered range the exchange has no candles for (e.g. downtime)
+        """
+        meta = self.meta(symbol, interval)
+        if meta is None:
+            return []
+        return [(int(start), int(end)) for start, end in meta.get("empty", [])]
+
+    def mark_empty(self, symbol: str, interval: str, ranges: list):
+        """
+        Remembers ranges without candles so that they aren't requested again. Only ranges inside the covered range
+        are kept.
+        """
+        if not os.path.isdir(self.path(symbol, interval)):
+            return
+
+        with self.lock, FileLock(self._lock_file(symbol, interval)):
+            meta = self.meta(symbol, interval)
+            if meta is None:
+                return
+            ranges = [(int(start), int(end)) for start, end in ranges
+                      if int(meta["start"]) <= start and end <= int(meta["end"])]
+            if not ranges:
+                return
+            meta["empty"] = sorted(set(self.empty_ranges(symbol, interval)) | set(ranges))
+            self._replace(os.path.join(self.path(symbol, interval), "meta.json"),
+                          lambda f: f.write(json.dumps(meta).encode()))
+
+    def read(self, symbol: str, interval: str, start=None, end=None) -> dict:
+        """
+        Returns a dict of column arrays with candles opened in [start, end] (memory-mapped, read-only)
+        """
+        path = self.path(symbol, interval)
+        # Metadata first, column files read after it are at least as long as it says
+        meta = self.meta(symbol, interval)
+        columns = {}
+
+        try:
+            for column in self.COLUMNS:
+                columns[column] = np.load(os.path.join(path, column + ".npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return self.empty()
+
+        # Files may be longer than the metadata after an interrupted append, only committed rows are read
+        rows = int(meta["rows"]) if meta is not None and "rows" in meta else len(columns["open_time"])
+        if any(len(values) < rows for values in columns.values()):
+            print(f"Kline cache of {symbol} {interval} has columns shorter than its metadata, ignoring it.")
+            return self.empty()
+        columns = {column: values[:rows] for column, values in columns.items()}
+
+        open_time = columns["open_time"]
+        first = 0 if start is None else int(np.searchsorted(open_time, start, side="left"))
+        last = len(open_time) if end is None else int(np.searchsorted(open_time, end, side="right"))
+
+        return {column: values[first:last] for column, values in columns.items()}
+
+    def write(self, symbol: str, interval: str, columns: dict, start: int, end: int):
+        """
+        Merges candles into the store and extends the covered range with [start, end].
+        The new range has to touch or overlap the range already stored.
+        """
+        path = self.path(symbol, interval)
+        new_time = np.asarray(columns["open_time"], dtype=np.int64)
+        # Stable sort keeps the last of candles with the same open time
+        order = np.argsort(new_time, kind="stable")
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = new_time[order][1:] != new_time[order][:-1]
+        order = order[keep]
+
+        os.makedirs(path, exist_ok=True)
+        with self.lock, FileLock(self._lock_file(symbol, interval)):
+            meta = self.meta(symbol, interval)
+            stored_time = self.read(symbol, interval)["open_time"]
+            rows = len(stored_time)
+            # Not kept memory-mapped while the files are written
+            last_time = int(stored_time[-1]) if rows else None
+            del stored_time
+            if meta is not None:
+                start = min(start, int(meta["start"]))
+                end = max(end, int(meta["end"]))
+
+            # New candles from the last stored one on (e.g. the still open candle updated) are appended in place
+            if rows and len(order) and new_time[order[0]] >= last_time:
+                kept = rows - int(new_time[order[0]] == last_time)
+                rows = kept + len(order) if self._append(path, columns, order, kept) else \
+                    self._rewrite(symbol, interval, columns, order)
+            elif len(order) or not rows:
+                rows = self._rewrite(symbol, interval, columns, order)
+
+            new_meta = {"start": int(start), "end": int(end), "rows": int(rows)}
+            if meta is not None and meta.get("empty"):
+                new_meta["empty"] = meta["empty"]
+            self._replace(os.path.join(path, "meta.json"), lambda f: f.write(json.dumps(new_meta).encode()))
+
+    def _append(self, path: str, columns: dict, order, rows: int) -> bool:
+        """
+        Writes candles after the first `rows` stored ones of every column file and updates the .npy headers.
+        Returns False without touching the files if a header can't grow in place.
+        """
+        headers = dict()
+        for column, dtype in self.COLUMNS.items():
+            with open(os.path.join(path, column + ".npy"), "rb") as f:
+                version = np.lib.format.read_magic(f)
+                if version != (1, 0):
+                    return False
+                np.lib.format.read_array_header_1_0(f)
+                offset = f.tell()
+
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                                                          "fortran_order": False, "shape": (rows + len(order),)})
+            if len(header.getvalue()) != offset:
+                return False
+            headers[column] = header.getvalue()
+
+        for column, dtype in self.COLUMNS.items():
+            with open(os.path.join(path, column + ".npy"), "r+b") as f:
+                # Written over the replaced last row and rows of an interrupted append instead of truncating first,
+                # so the committed rows memory-mapped by readers stay in the file
+                f.seek(len(headers[column]) + rows * np.dtype(dtype).itemsize)
+                f.write(np.asarray(columns[column], dtype=dtype)[order].tobytes())
+                f.truncate()
+                f.seek(0)
+                f.write(headers[column])
+
+        return True
+
+    def _rewrite(self, symbol: str, interval: str, columns: dict, order) -> int:
+        """
+        Merges candles with the stored ones into new column files, returns the number of rows
+        """
+        path = self.path(symbol, interval)
+        # Load into memory, stored files are replaced below and must not stay memory-mapped
+        stored = {column: np.array(values) for column, values in self.read(symbol, interval).items()}
+
+        open_time = np.concatenate([stored["open_time"], np.asarray(columns["open_time"], dtype=np.int64)[order]])
+        # Stable sort keeps stored candles first, new candles replace them on the same open time
+        merged = np.argsort(open_time, kind="stable")
+        keep = np.ones(len(merged), dtype=bool)
+        keep[:-1] = open_time[merged][1:] != open_time[merged][:-1]
+        merged = merged[keep]
+
+        for column, dtype in self.COLUMNS.items():
+            values = np.concatenate([stored[column], np.asarray(columns[column], dtype=dtype)[order]])[merged]
+            self._replace(os.path.join(path, column + ".npy"), lambda f: np.save(f, values))
+
+        return len(merged)
+
+    def empty(self) -> dict:
+        return {column: np.empty(0, dtype=dtype) for column, dtype in self.COLUMNS.items()}
+
+    def _replace(self, file, write):
+        """
+        Writes a file next to its destination and swaps it in atomically
+        """
+        # Unique name, a crashed writer's leftover never gets swapped in by another writer
+        tmp_file = f"{file}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                write(f)
+            os.replace(tmp_file, file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def _lock_file(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.path(symbol, interval), ".lock")
@@ -0,0 +1,140 @@
+import os
+import json
+import threading
+import numpy as np
+
+
+def decode_agg_trades(trades: list) -> dict:
+    """
+    Converts raw trades of /api/v3/aggTrades into a dict of column arrays (agg_id, time, price, quantity, maker)
+    """
+    return {
+        "agg_id": np.fromiter((trade["a"] for trade in trades), dtype=np.int64, count=len(trades)),
+        "time": np.fromiter((trade["T"] for trade in trades), dtype=np.int64, count=len(trades)),
+        "price": np.fromiter((trade["p"] for trade in trades), dtype=np.float64, count=len(trades)),
+        "quantity": np.fromiter((trade["q"] for trade in trades), dtype=np.float64, count=len(trades)),
+        "maker": np.fromiter((trade["m"] for trade in trades), dtype=bool, count=len(trades)),
+    }
+
+
+class TickStore:
+    """
+    Local on-disk store of aggregated trades, one directory per symbol and one raw binary file per column.
+    Trades are kept in aggregate trade id order without holes, so new trades are appended to the end of the files
+    and the columns can be memory-mapped however large they grow.
+    """
+
+    COLUMNS = {
+        "agg_id": np.int64,
+        "time": np.int64,
+        "price": np.float64,
+        "quantity": np.float64,
+        "maker": np.bool_,
+    }
+
+    def __init__(self, root="./data/ticks"):
+        self.root = root
+        self.lock = threading.Lock()
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.root, str(symbol).upper())
+
+    def meta(self, symbol: str):
+        """
+        Returns {"rows", "first_id", "last_id", "start", "end"} of the stored trades of a symbol or None
+        """
+        meta_file = os.path.join(self.path(symbol), "meta.json")
+        if not os.path.exists(meta_file):
+            return None
+
+        try:
+            with open(meta_file) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Corrupted tick store of {symbol}, ignoring it: {e}")
+            return None
+
+    def read(self, symbol: str, start=None, end=None) -> dict:
+        """
+        Returns a dict of column arrays with trades executed in [start, end] (memory-mapped, read-only)
+        """
+        meta = self.meta(symbol)
+        if meta is None or meta["rows"] == 0:
+            return self.empty()
+
+        path = self.path(symbol)
+        rows = int(meta["rows"])
+        # Files may be longer than the metadata after an interrupted append, only committed rows are read
+        columns = {column: np.memmap(os.path.join(path, column + ".bin"), dtype=dtype, mode="r", shape=(rows,))
+                   for column, dtype in self.COLUMNS.items()}
+
+        time = columns["time"]
+        first = 0 if start is None else int(np.searchsorted(time, start, side="left"))
+        last = rows if end is None else int(np.searchsorted(time, end, side="right"))
+
+        return {column: values[first:last] for column, values in columns.items()}
+
+    def chunks(self, symbol: str, rows=1_000_000, start=None, end=None):
+        """
+        Yields the stored trades in [start, end] as dicts of column arrays of at most `rows` trades
+        """
+        columns = self.read(symbol, start, end)
+        for offset in range(0, len(columns["agg_id"]), int(rows)):
+            yield {column: values[offset:offset + int(rows)] for column, values in columns.items()}
+
+    def append(self, symbol: str, columns: dict) -> int:
+        """
+        Appends trades after the stored ones, trades already stored are skipped. The first new trade has to follow
+        the last stored one without a gap of aggregate trade ids. Returns the number of appended trades.
+        """
+        agg_id = np.asarray(columns["agg_id"], dtype=np.int64)
+        order = np.argsort(agg_id, kind="stable")
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = agg_id[order][1:] != agg_id[order][:-1]
+        order = order[keep]
+        path = self.path(symbol)
+
+        with self.lock:
+            meta = self.meta(symbol)
+            rows = int(meta["rows"]) if meta is not None else 0
+
+            if meta is not None and rows:
+                order = order[agg_id[order] > meta["last_id"]]
+            if not len(order):
+                return 0
+
+            new_ids = agg_id[order]
+            if meta is not None and rows and new_ids[0] != meta["last_id"] + 1:
+                raise ValueError(f"Trades of {symbol} start at id {new_ids[0]}, the store ends at {meta['last_id']}")
+            if len(new_ids) != new_ids[-1] - new_ids[0] + 1:
+                raise ValueError(f"Trades of {symbol} have gaps of aggregate trade ids")
+
+            os.makedirs(path, exist_ok=True)
+            for column, dtype in self.COLUMNS.items():
+                values = np.asarray(columns[column], dtype=dtype)[order]
+                with open(os.path.join(path, column + ".bin"), "ab") as f:
+                    # Drop rows of an interrupted append before writing after them
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+                    f.write(values.tobytes())
+
+            time = np.asarray(columns["time"], dtype=np.int64)[order]
+            meta = {"rows": rows + len(order),
+                    "first_id": int(meta["first_id"]) if meta is not None and rows else int(new_ids[0]),
+                    "last_id": int(new_ids[-1]),
+                    "start": int(meta["start"]) if meta is not None and rows else int(time[0]),
+                    "end": int(time[-1])}
+            self._replace(os.path.join(path, "meta.json"), lambda f: f.write(json.dumps(meta).encode()))
+
+        return len(order)
+
+    def empty(self) -> dict:
+        return {column: np.empty(0, dtype=dtype) for column, dtype in self.COLUMNS.items()}
+
+    def _replace(self, file, write):
+        """
+        Writes a file next to its destination and swaps it in atomically
+        """
+        tmp_file = file + ".tmp"
+        with open(tmp_file, "wb") as f:
+            write(f)
+        os.replace(tmp_file, file)
@@ -0,0 +1,168 @@
+import os
+import glob
+import gzip
+import time
+import queue
+import threading
+
+
+class JournalWriter:
+    """
+    Append-only journal of raw websocket frames. Every frame is stored with its receive time as a
+    "<receive time ns>\\t<frame>" line in gzip files rotated by size and age. Frames are written by a background
+    thread, recording only puts the frame into a queue so the receiving thread never waits for the disk.
+    """
+
+    def __init__(self, directory="./data/journal", prefix="ws", max_bytes=64 * 1024 * 1024, max_seconds=3600,
+                 flush_interval=1.0, queue_size=100000):
+        """
+        :param max_bytes: uncompressed size after which a new file is started
+        :param max_seconds: age after which a new file is started
+        :param flush_interval: max seconds a frame stays in memory before it's flushed to the file
+        :param queue_size: max number of frames waiting for the writer, newer frames are dropped when it's full
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.flush_interval = flush_interval
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.written = 0
+        # Frames lost to write errors and the time of the last reported error
+        self.failed = 0
+        self.last_error = None
+        self.stopped = threading.Event()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.file = None
+        self.file_bytes = 0
+        self.file_opened = 0.0
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def record(self, frame):
+        """
+        Queue a raw frame (str or bytes), never blocks
+        """
+        try:
+            self.frames.put_nowait((time.time_ns(), frame))
+        except queue.Full:
+            self.dropped += 1
+
+    def rotate(self):
+        if self.file is not None:
+            self.file.close()
+
+        name = f"{self.prefix}-{time.time_ns()}.jsonl.gz"
+        self.file = gzip.open(os.path.join(self.directory, name), "ab")
+        self.file_bytes = 0
+        self.file_opened = time.monotonic()
+
+    def write(self, received: int, frame):
+        if isinstance(frame, bytes):
+            frame = frame.decode()
+        line = f"{received}\t{frame.replace(chr(10), ' ')}\n".encode()
+
+        if self.file is None or self.file_bytes >= self.max_bytes or \
+                time.monotonic() - self.file_opened >= self.max_seconds:
+            self.rotate()
+
+        self.file.write(line)
+        self.file_bytes += len(line)
+        self.written += 1
+
+    def error(self, e):
+        """
+        Reports a write error at most once per flush interval and drops the file, the next frame starts a new one
+        """
+        self.failed += 1
+        if self.last_error is None or time.monotonic() - self.last_error >= self.flush_interval:
+            print(f"Error while writing the journal, {self.failed} frames lost so far: {e}")
+            self.last_error = time.monotonic()
+
+        try:
+            if self.file is not None:
+                self.file.close()
+        except Exception:
+            pass
+        self.file = None
+
+    def run(self):
+        last_flush = time.monotonic()
+        while not self.stopped.is_set():
+            try:
+                item = self.frames.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                break
+            try:
+                if item:
+                    self.write(*item)
+
+                # A sync flush keeps everything written so far readable even if the process dies
+                if self.file is not None and time.monotonic() - last_flush >= self.flush_interval:
+                    self.file.flush()
+                    last_flush = time.monotonic()
+            except Exception as e:
+                self.error(e)
+
+        try:
+            if self.file is not None:
+                self.file.close()
+        except Exception as e:
+            print(f"Error while closing the journal: {e}")
+
+    def close(self, timeout=10.0):
+        """
+        Write the queued frames and close the journal
+
+        :param timeout: max seconds to wait for the writer, queued frames are dropped once it's over
+        """
+        try:
+            self.frames.put(None, timeout=timeout)
+        except queue.Full:
+            print(f"Journal writer didn't catch up in {timeout} s, dropping {self.frames.qsize()} queued frames.")
+            self.stopped.set()
+        self.thread.join(timeout)
+
+
+class JournalReader:
+    """ Reads journals of a JournalWriter back, optionally with the original timing """
+
+    def __init__(self, directory="./data/journal", prefix="ws"):
+        self.files = sorted(glob.glob(os.path.join(directory, f"{prefix}-*.jsonl.gz")),
+                            key=lambda path: int(os.path.basename(path)[len(prefix) + 1:].split(".")[0]))
+
+    def frames(self):
+        """
+        Yields (receive time ns, frame) of all journal files in order
+        """
+        for path in self.files:
+            try:
+                with gzip.open(path, "rt") as file:
+                    for line in file:
+                        received, frame = line.rstrip("\n").split("\t", 1)
+                        yield int(received), frame
+            except (EOFError, gzip.BadGzipFile) as e:
+                # The tail of a journal of a killed process, everything up to the last flush is still read
+                print(f"Journal {path} is truncated: {e}")
+
+    def replay(self, callback, speed=1.0):
+        """
+        Call callback(frame) for every frame, spaced like they were received
+
+        :param speed: time acceleration, 2.0 replays twice as fast, None replays as fast as possible
+        """
+        first_received, started = None, time.monotonic()
+        for received, frame in self.frames():
+            if speed:
+                if first_received is None:
+                    first_received = received
+                wait = (received - first_received) / 1e9 / speed - (time.monotonic() - started)
+                if wait > 0:
+                    time.sleep(wait)
+            callback(frame)
@@ -1,4 +1,5 @@
 import pandas as pd
+from strategies.ta_indicators.frame_utils import drop_incomplete_rows
 
 
 class EMAStrategy:
@@ -13,15 +14,15 @@ class EMAStrategy:
         self.data["EMA_S"] = self.data.Close.ewm(span=ema_s, adjust=False).mean()
         self.data["EMA_L"] = self.data.Close.ewm(span=ema_l, adjust=False).mean()
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         if shifting:
             if technical:
-                cond1 = (self.data.EMA_S > self.data.EMA_L) & (self.data.shift(1).EMA_S < self.data.shift(1).EMA_L)
-                cond2 = (self.data.EMA_S < self.data.EMA_L) & (self.data.shift(1).EMA_S > self.data.shift(1).EMA_L)
+                cond1 = (self.data.EMA_S > self.data.EMA_L) & (self.data.EMA_S.shift(1) < self.data.EMA_L.shift(1))
+                cond2 = (self.data.EMA_S < self.data.EMA_L) & (self.data.EMA_S.shift(1) > self.data.EMA_L.shift(1))
             else:
-                cond1 = (self.data.EMA_S < self.data.EMA_L) & (self.data.shift(1).EMA_S > self.data.shift(1).EMA_L)
-                cond2 = (self.data.EMA_S > self.data.EMA_L) & (self.data.shift(1).EMA_S < self.data.shift(1).EMA_L)
+                cond1 = (self.data.EMA_S < self.data.EMA_L) & (self.data.EMA_S.shift(1) > self.data.EMA_L.shift(1))
+                cond2 = (self.data.EMA_S > self.data.EMA_L) & (self.data.EMA_S.shift(1) < self.data.EMA_L.shift(1))
         else:
             if technical:
                 cond1 = (self.data.EMA_S > self.data.EMA_L)
@@ -45,21 +46,21 @@ class EMAStrategy:
         self.data["EMA_M"] = self.data.Close.ewm(span=ema_m, adjust=False).mean()
         self.data["EMA_L"] = self.data.Close.ewm(span=ema_l, adjust=False).mean()
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         if shifting:
             if technical:
                 cond1 = (self.data.EMA_S > self.data.EMA_M) & (self.data.EMA_M > self.data.EMA_L) & \
-                        (self.data.shift(1).EMA_S < self.data.EMA_M) & (self.data.shift(1).EMA_M < self.data.shift(1).EMA_L)
+                        (self.data.EMA_S.shift(1) < self.data.EMA_M) & (self.data.EMA_M.shift(1) < self.data.EMA_L.shift(1))
                 cond2 = (self.data.EMA_S < self.data.EMA_M) & (self.data.EMA_M < self.data.EMA_L) & \
-                        (self.data.shift(1).EMA_S > self.data.EMA_M) & (self.data.shift(1).EMA_M > self.data.shift(1).EMA_L)
+                        (self.data.EMA_S.shift(1) > self.data.EMA_M) & (self.data.EMA_M.shift(1) > self.data.EMA_L.shift(1))
             else:
                 cond1 = (self.data.EMA_S < self.data.EMA_M) & (self.data.EMA_M < self.data.EMA_L) & \
-                        (self.data.shift(1).EMA_S > self.data.EMA_M) & (
-                                    self.data.shift(1).EMA_M > self.data.shift(1).EMA_L)
+                        (self.data.EMA_S.shift(1) > self.data.EMA_M) & (
+                                    self.data.EMA_M.shift(1) > self.data.EMA_L.shift(1))
                 cond2 = (self.data.EMA_S > self.data.EMA_M) & (self.data.EMA_M > self.data.EMA_L) & \
-                        (self.data.shift(1).EMA_S < self.data.EMA_M) & (
-                                    self.data.shift(1).EMA_M < self.data.shift(1).EMA_L)
+                        (self.data.EMA_S.shift(1) < self.data.EMA_M) & (
+                                    self.data.EMA_M.shift(1) < self.data.EMA_L.shift(1))
 
         else:
             if technical:
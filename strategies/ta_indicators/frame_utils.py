@@ -0,0 +1,11 @@
+import pandas as pd
+
+
+def drop_incomplete_rows(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    DataFrame.dropna(inplace=True) that leaves the DataFrame as it is when no row has a missing value: dropna copies
+    all the columns even then, including the prepared data a backtest reads in place
+    """
+    if data.isna().any().any():
+        data.dropna(inplace=True)
+    return data
@@ -1,4 +1,5 @@
 import pandas as pd
+from strategies.ta_indicators.frame_utils import drop_incomplete_rows
 
 
 class IchimokuCloudStrategy:
@@ -35,7 +36,7 @@ class IchimokuCloudStrategy:
 
         self.decide()
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         return self.data
 
@@ -1,4 +1,5 @@
 import pandas as pd
+from strategies.ta_indicators.frame_utils import drop_incomplete_rows
 
 class IchimokuCloudRSIStrategy:
     def __init__(self, data: pd.DataFrame):
@@ -52,7 +53,7 @@ class IchimokuCloudRSIStrategy:
 
         self.decide()
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         return self.data
 
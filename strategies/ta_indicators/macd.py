@@ -1,4 +1,5 @@
 import pandas as pd
+from strategies.ta_indicators.frame_utils import drop_incomplete_rows
 
 
 class MACDStrategy:
@@ -11,15 +12,15 @@ class MACDStrategy:
         self.data["MACD"] = self.data.EMA_S - self.data.EMA_M
         self.data["SIGNAL"] = self.data.MACD.ewm(span=ema_signal, adjust=False).mean()
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         if shifting:
             if technical:
-                cond1 = (self.data.shift(1).MACD < self.data.shift(1).SIGNAL) & (self.data.MACD > self.data.SIGNAL)
-                cond2 = (self.data.shift(1).MACD > self.data.shift(1).SIGNAL) & (self.data.MACD < self.data.SIGNAL)
+                cond1 = (self.data.MACD.shift(1) < self.data.SIGNAL.shift(1)) & (self.data.MACD > self.data.SIGNAL)
+                cond2 = (self.data.MACD.shift(1) > self.data.SIGNAL.shift(1)) & (self.data.MACD < self.data.SIGNAL)
             else:
-                cond1 = (self.data.shift(1).MACD > self.data.shift(1).SIGNAL) & (self.data.MACD < self.data.SIGNAL)
-                cond2 = (self.data.shift(1).MACD < self.data.shift(1).SIGNAL) & (self.data.MACD > self.data.SIGNAL)
+                cond1 = (self.data.MACD.shift(1) > self.data.SIGNAL.shift(1)) & (self.data.MACD < self.data.SIGNAL)
+                cond2 = (self.data.MACD.shift(1) < self.data.SIGNAL.shift(1)) & (self.data.MACD > self.data.SIGNAL)
         else:
             if technical:
                 cond1 = (self.data.MACD > self.data.SIGNAL)
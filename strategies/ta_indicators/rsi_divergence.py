@@ -3,6 +3,7 @@ import pandas as pd
 from scipy.signal import argrelextrema
 from collections import deque
 from copy import deepcopy
+from strategies.ta_indicators.frame_utils import drop_incomplete_rows
 
 pd.options.mode.chained_assignment = None
 
@@ -29,12 +30,12 @@ class RSIDivergenceStrategy:
         self.data["avg_Up"] = self.data.upMove.ewm(span=window, adjust=False).mean()
         self.data["avg_Down"] = self.data.downMove.ewm(span=window, adjust=False).mean()
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         self.data["RS"] = self.data.avg_Up / self.data.avg_Down
         self.data["RSI"] = self.data.RS.apply(lambda x: 100 - (100 / (x + 1)))
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         self.divergence_strategy(frame=frame,
                                  K=K,
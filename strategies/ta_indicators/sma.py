@@ -1,4 +1,5 @@
 import pandas as pd
+from strategies.ta_indicators.frame_utils import drop_incomplete_rows
 
 
 class SMAStrategy:
@@ -14,15 +15,15 @@ class SMAStrategy:
         self.data["SMA_S"] = self.data.Close.rolling(window=int(sma_s)).mean()
         self.data["SMA_L"] = self.data.Close.rolling(window=int(sma_l)).mean()
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         if shifting:
             if technical:
-                cond1 = (self.data.SMA_S > self.data.SMA_L) & (self.data.shift(1).SMA_S < self.data.shift(1).SMA_L)
-                cond2 = (self.data.SMA_S < self.data.SMA_L) & (self.data.shift(1).SMA_S > self.data.shift(1).SMA_L)
+                cond1 = (self.data.SMA_S > self.data.SMA_L) & (self.data.SMA_S.shift(1) < self.data.SMA_L.shift(1))
+                cond2 = (self.data.SMA_S < self.data.SMA_L) & (self.data.SMA_S.shift(1) > self.data.SMA_L.shift(1))
             else:
-                cond1 = (self.data.SMA_S < self.data.SMA_L) & (self.data.shift(1).SMA_S > self.data.shift(1).SMA_L)
-                cond2 = (self.data.SMA_S > self.data.SMA_L) & (self.data.shift(1).SMA_S < self.data.shift(1).SMA_L)
+                cond1 = (self.data.SMA_S < self.data.SMA_L) & (self.data.SMA_S.shift(1) > self.data.SMA_L.shift(1))
+                cond2 = (self.data.SMA_S > self.data.SMA_L) & (self.data.SMA_S.shift(1) < self.data.SMA_L.shift(1))
         else:
             if technical:
                 cond1 = (self.data.SMA_S > self.data.SMA_L)
@@ -47,19 +48,19 @@ class SMAStrategy:
         self.data["SMA_M"] = self.data.Close.rolling(window=sma_m).mean()
         self.data["SMA_L"] = self.data.Close.rolling(window=sma_l).mean()
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         if shifting:
             if technical:
                 cond1 = (self.data.SMA_S > self.data.SMA_M) & (self.data.SMA_M > self.data.SMA_L) & \
-                        (self.data.shift(1).SMA_S < self.data.SMA_M) & (self.data.shift(1).SMA_M < self.data.SMA_L)
+                        (self.data.SMA_S.shift(1) < self.data.SMA_M) & (self.data.SMA_M.shift(1) < self.data.SMA_L)
                 cond2 = (self.data.SMA_S < self.data.SMA_M) & (self.data.SMA_M < self.data.SMA_L) & \
-                        (self.data.shift(1).SMA_S > self.data.SMA_M) & (self.data.shift(1).SMA_M > self.data.SMA_L)
+                        (self.data.SMA_S.shift(1) > self.data.SMA_M) & (self.data.SMA_M.shift(1) > self.data.SMA_L)
             else:
                 cond1 = (self.data.SMA_S < self.data.SMA_M) & (self.data.SMA_M < self.data.SMA_L) & \
-                        (self.data.shift(1).SMA_S > self.data.SMA_M) & (self.data.shift(1).SMA_M > self.data.SMA_L)
+                        (self.data.SMA_S.shift(1) > self.data.SMA_M) & (self.data.SMA_M.shift(1) > self.data.SMA_L)
                 cond2 = (self.data.SMA_S > self.data.SMA_M) & (self.data.SMA_M > self.data.SMA_L) & \
-                        (self.data.shift(1).SMA_S < self.data.SMA_M) & (self.data.shift(1).SMA_M < self.data.SMA_L)
+                        (self.data.SMA_S.shift(1) < self.data.SMA_M) & (self.data.SMA_M.shift(1) < self.data.SMA_L)
         else:
             if technical:
                 cond1 = (self.data.SMA_S > self.data.SMA_M) & (self.data.SMA_M > self.data.SMA_L)
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from strategies.ta_indicators.frame_utils import drop_incomplete_rows
 
 
 class STORSIMACDStrategy:
@@ -41,11 +42,11 @@ class STORSIMACDStrategy:
         self.data["RS"] = self.data.avg_Up / self.data.avg_Down
         self.data["RSI"] = self.data.RS.apply(lambda x: 100 - (100 / (x + 1)))
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         self.decide(lags=lags, shift_position=shift_position)
 
-        self.data.dropna(inplace=True)
+        drop_incomplete_rows(self.data)
 
         return self.data
 
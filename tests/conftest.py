@@ -0,0 +1,88 @@
+import time
+
+import numpy as np
+import pytest
+
+MINUTE = 60000
+# Open time of the first candle the simulator serves
+SIMULATOR_START = 1700000000000 // MINUTE * MINUTE
+HOUR = 60 * MINUTE
+# Symbols of the backtesting fixtures, quoted in the simulator's USDT
+BACKTEST_SYMBOLS = ["AAAUSDT", "BBBUSDT"]
+
+
+@pytest.fixture(scope="module")
+def market_simulator(tmp_path_factory):
+    """
+    Running simulator server serving 1500 hourly random walk candles of the backtest symbols up to the current hour,
+    from the working directory of a temporary folder (the clients cache klines in ./data/klines)
+    """
+    from storage.kline_store import KlineStore
+    from simulator.exchange import SimulatedExchange
+    from simulator.server import SimulatorServer
+
+    directory = tmp_path_factory.mktemp("backtester")
+    store = KlineStore(str(directory / "simulated"))
+    rng = np.random.default_rng(3)
+    start = int(time.time() * 1000) // HOUR * HOUR - 1499 * HOUR
+    for symbol in BACKTEST_SYMBOLS:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1500)))
+        columns = {"open_time": start + HOUR * np.arange(1500, dtype=np.int64), "open": close,
+                   "high": close * 1.001, "low": close * 0.999, "close": close, "volume": np.ones(1500)}
+        store.write(symbol, "1h", columns, start, int(columns["open_time"][-1]))
+
+    server = SimulatorServer(SimulatedExchange(store, BACKTEST_SYMBOLS, "1h"), port=0)
+    server.start(replay=False)
+    server.backtest_start = start
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(directory)
+        yield server
+    server.stop()
+
+
+@pytest.fixture(scope="module")
+def backtester(market_simulator):
+    """
+    Backtester of the two symbols of the market simulator
+    """
+    pytest.importorskip("matplotlib")
+    from backtester.model.backtester import Backtester
+
+    return Backtester("key", "secret", True, "1h", market_simulator.backtest_start, BACKTEST_SYMBOLS, -0.00085,
+                      base_url=market_simulator.base_url, wss_base_url=market_simulator.wss_base_url)
+
+
+@pytest.fixture
+def indicator(market_simulator):
+    """
+    Returns a factory of the backtesting indicators of a strategy on the symbols of the market simulator
+    """
+    pytest.importorskip("matplotlib")
+
+    def make(cls, strategy):
+        return cls("key", "secret", True, "1h", market_simulator.backtest_start, BACKTEST_SYMBOLS, strategy,
+                   -0.00085, base_url=market_simulator.base_url, wss_base_url=market_simulator.wss_base_url)
+
+    return make
+
+
+@pytest.fixture
+def simulator(tmp_path):
+    """
+    Running simulator server serving 120 one-minute BTCUSDT candles of a temporary KlineStore, without replaying
+    them: its price is the open of the first candle until a test steps the exchange
+    """
+    from storage.kline_store import KlineStore
+    from simulator.exchange import SimulatedExchange
+    from simulator.server import SimulatorServer
+
+    store = KlineStore(str(tmp_path / "klines"))
+    close = 100 + np.cumsum(np.random.default_rng(5).normal(0, 0.2, 120))
+    columns = {"open_time": SIMULATOR_START + MINUTE * np.arange(120, dtype=np.int64), "open": close,
+               "high": close + 0.5, "low": close - 0.5, "close": close, "volume": np.ones(120)}
+    store.write("BTCUSDT", "1m", columns, int(columns["open_time"][0]), int(columns["open_time"][-1]))
+
+    server = SimulatorServer(SimulatedExchange(store, ["BTCUSDT"], "1m"), port=0)
+    server.start(replay=False)
+    yield server
+    server.stop()
@@ -0,0 +1,131 @@
+import time
+import zipfile
+
+import numpy as np
+import pytest
+
+from conftest import MINUTE, SIMULATOR_START
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from storage.archive_importer import KlineArchiveImporter
+from storage.kline_store import KlineStore
+from test_async_client import record_requests
+
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+# 2022-01-08
+FIRST_DAY = 19000 * DAY
+HEADER = b"open_time,open,high,low,close,volume,close_time,quote_volume,count,taker_buy_volume," \
+         b"taker_buy_quote_volume,ignore\n"
+
+
+def csv_lines(open_times, close=None, interval=HOUR, microseconds=False) -> bytes:
+    lines = []
+    for open_time in open_times:
+        price = close(open_time) if close is not None else 100 + (open_time - FIRST_DAY) / interval
+        unit = 1000 if microseconds else 1
+        lines.append(f"{open_time * unit},{price},{price + 1},{price - 1},{price},1.5,"
+                     f"{(open_time + interval - 1) * unit},150.0,10,0.5,50.0,0\n".encode())
+    return b"".join(lines)
+
+
+def day_name(day: int, symbol="BTCUSDT", interval="1h") -> str:
+    return time.strftime(f"{symbol}-{interval}-%Y-%m-%d", time.gmtime(day * DAY / 1000))
+
+
+def write_zip(path, content: bytes):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(path.name[:-4] + ".csv", content)
+
+
+def hours_of(day: int) -> list:
+    return [FIRST_DAY + day * DAY + hour * HOUR for hour in range(24)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KlineStore(str(tmp_path / "klines"))
+
+
+def test_zipped_and_csv_archives_of_every_format_are_imported_in_order(tmp_path, store):
+    archives = tmp_path / "archives"
+    (archives / "daily").mkdir(parents=True)
+    # Old format, with a header and with microsecond open times
+    write_zip(archives / "daily" / (day_name(19001) + ".zip"), csv_lines(hours_of(1)))
+    write_zip(archives / "daily" / (day_name(19000) + ".zip"), HEADER + csv_lines(hours_of(0)))
+    (archives / (day_name(19002) + ".csv")).write_bytes(csv_lines(hours_of(2), microseconds=True).replace(b"\n",
+                                                                                                        b"\r\n"))
+    # Extracted next to its zip, read once
+    (archives / "daily" / (day_name(19001) + ".csv")).write_bytes(csv_lines(hours_of(1)))
+    (archives / "README.txt").write_text("not an archive")
+
+    importer = KlineArchiveImporter(store, chunk_lines=7)
+    assert importer.import_directory(str(archives), logs=False) == {("BTCUSDT", "1h"): 72}
+
+    columns = store.read("BTCUSDT", "1h")
+    assert store.coverage("BTCUSDT", "1h") == (FIRST_DAY, FIRST_DAY + 3 * DAY - 1)
+    np.testing.assert_array_equal(columns["open_time"], hours_of(0) + hours_of(1) + hours_of(2))
+    np.testing.assert_array_equal(columns["close"], 100 + np.arange(72))
+    np.testing.assert_array_equal(columns["high"] - columns["low"], np.full(72, 2.0))
+
+
+def test_chunked_parsing_equals_parsing_at_once(tmp_path, store):
+    path = tmp_path / (day_name(19000) + ".zip")
+    write_zip(path, HEADER + csv_lines(hours_of(0)))
+
+    at_once = KlineArchiveImporter(store).read_archive(str(path))
+    for chunk_lines in [1, 5, 24]:
+        chunked = KlineArchiveImporter(store, chunk_lines=chunk_lines).read_archive(str(path))
+        for column, values in at_once.items():
+            np.testing.assert_array_equal(chunked[column], values)
+
+
+def test_archives_not_touching_the_stored_range_are_skipped(tmp_path, store, capsys):
+    for day in [0, 1, 5]:
+        write_zip(tmp_path / (day_name(19000 + day) + ".zip"), csv_lines(hours_of(day)))
+    importer = KlineArchiveImporter(store)
+
+    # An empty store starts from the latest run
+    assert importer.import_directory(str(tmp_path), logs=False) == {("BTCUSDT", "1h"): 24}
+    assert "importing only the latest run" in capsys.readouterr().out
+    assert store.coverage("BTCUSDT", "1h") == (FIRST_DAY + 5 * DAY, FIRST_DAY + 6 * DAY - 1)
+
+    # Once the gap is stored the older run connects
+    gap = [FIRST_DAY + 2 * DAY + hour * HOUR for hour in range(72)]
+    store.write("BTCUSDT", "1h", importer.parse_csv(csv_lines(gap)), gap[0], FIRST_DAY + 5 * DAY - 1)
+    assert importer.import_directory(str(tmp_path), end=FIRST_DAY + 2 * DAY - 1, logs=False) == \
+        {("BTCUSDT", "1h"): 48}
+    assert store.coverage("BTCUSDT", "1h") == (FIRST_DAY, FIRST_DAY + 6 * DAY - 1)
+    assert len(store.read("BTCUSDT", "1h")["open_time"]) == 6 * 24
+
+
+def test_get_historicals_reads_imported_archives_without_requests(simulator, tmp_path):
+    columns = simulator.exchange.candles["BTCUSDT"]
+    days = columns["open_time"] // DAY
+    for day in np.unique(days):
+        rows = days == day
+        closes = dict(zip(columns["open_time"][rows].tolist(), columns["close"][rows].tolist()))
+        write_zip(tmp_path / (day_name(int(day), interval="1m") + ".zip"),
+                  csv_lines(list(closes), close=closes.get, interval=MINUTE))
+    KlineArchiveImporter(KlineStore(str(tmp_path / "klines"))).import_directory(str(tmp_path), logs=False)
+
+    requests = record_requests(simulator, "GET", "/api/v3/klines")
+    client = BinanceClient("key", "secret", base_url=simulator.base_url, kline_cache_dir=str(tmp_path / "klines"),
+                           tick_store_dir=None, rate_limiter=RateLimiter())
+    data = client.get_historicals("BTCUSDT", "1m", SIMULATOR_START, SIMULATOR_START + 119 * MINUTE)
+
+    assert requests == []
+    np.testing.assert_allclose(data["Close"].to_numpy(), columns["close"])
+
+
+def test_archive_names_select_symbols_and_intervals(tmp_path, store):
+    for name in [day_name(19000), day_name(19000, symbol="ETHUSDT"), day_name(19000, interval="1m"),
+                 "BTCUSDT-1h-2022-01.zip", "BTCUSDT-1h-2022-01-08.zip.CHECKSUM"]:
+        (tmp_path / (name if "." in name else name + ".zip")).write_bytes(b"")
+
+    importer = KlineArchiveImporter(store)
+    assert set(importer.find_archives(str(tmp_path))) == {("BTCUSDT", "1h"), ("ETHUSDT", "1h"), ("BTCUSDT", "1m")}
+    periods = importer.find_archives(str(tmp_path), symbol="btcusdt", interval="1h")[("BTCUSDT", "1h")]
+    # The monthly archive covers all of January
+    assert [(start, end) for start, end, _ in periods] == [(FIRST_DAY - 7 * DAY, FIRST_DAY + 24 * DAY - 1),
+                                                         (FIRST_DAY, FIRST_DAY + DAY - 1)]
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from urllib.parse import urlencode
+
+from conftest import MINUTE, SIMULATOR_START
+from connectors.asyncBinanceConnect import AsyncBinanceClient
+from connectors.rate_limiter import RateLimiter
+
+
+class DelayingLimiter(RateLimiter):
+    """ Rate limiter making every order wait before it's sent """
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def reserve(self, method, endpoint, data=None):
+        wait = super().reserve(method, endpoint, data)
+        return max(wait, self.delay) if (method, endpoint) in self.ORDER_ENDPOINTS else wait
+
+
+def record_requests(simulator, method, endpoint) -> list:
+    """
+    Returns a list the parameters of every request of an endpoint are appended to
+    """
+    requests, handler = [], simulator.routes[(method, endpoint)]
+
+    def record(params):
+        requests.append(dict(params))
+        return handler(params)
+
+    simulator.routes[(method, endpoint)] = record
+    return requests
+
+
+def run(simulator, coroutine, rate_limiter=None):
+    async def main():
+        async with AsyncBinanceClient("key", "secret", base_url=simulator.base_url,
+                                      rate_limiter=rate_limiter or RateLimiter()) as client:
+            return await coroutine(client)
+
+    return asyncio.run(main())
+
+
+def test_historicals_are_fetched_in_concurrent_pages(simulator):
+    end = SIMULATOR_START + 99 * MINUTE
+    df = run(simulator, lambda client: client.get_historicals("BTCUSDT", "1m", SIMULATOR_START, end, limit=30))
+
+    assert len(df) == 100
+    assert df.index.is_monotonic_increasing and df.index.is_unique
+    assert df.Close.iloc[0] == round(float(simulator.exchange.candles["BTCUSDT"]["close"][0]), 8)
+
+
+def test_limit_order_lifecycle(simulator):
+    async def lifecycle(client):
+        price = await client.get_current_price("BTCUSDT")
+        order = await client.buy_order("BTCUSDT", type="LIMIT", price=round(price - 10, 2), amount=0.1)
+        status = await client.get_order_status("BTCUSDT", order["orderId"])
+        canceled = await client.cancel_order("BTCUSDT", order["orderId"])
+        return order, status, canceled
+
+    order, status, canceled = run(simulator, lifecycle)
+    assert order["status"] == "NEW" and order["side"] == "BUY"
+    assert status["orderId"] == order["orderId"] and status["status"] == "NEW"
+    assert canceled["status"] == "CANCELED"
+    assert simulator.exchange.balances["USDT"]["locked"] == 0.0
+
+
+def test_orders_are_signed_after_the_rate_limiter_wait(simulator):
+    orders = record_requests(simulator, "POST", "/api/v3/order")
+    sent = int(time.time() * 1000)
+    order = run(simulator, lambda client: client.buy_order("BTCUSDT", type="MARKET", amount=100.0,
+                                                            quantity_type="quoteOrderQty"),
+                rate_limiter=DelayingLimiter(0.3))
+
+    assert order is not None
+    params = orders[0]
+    assert int(params["timestamp"]) >= sent + 300
+    signature = params.pop("signature")
+    assert signature == hmac.new(b"secret", urlencode(params).encode(), hashlib.sha256).hexdigest()
+
+
+def test_failed_requests_return_none(simulator, capsys):
+    order = run(simulator, lambda client: client.buy_order("BTCUSDT", type="MARKET", amount=1000.0))
+
+    assert order is None
+    assert "insufficient balance" in capsys.readouterr().out
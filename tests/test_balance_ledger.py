@@ -0,0 +1,114 @@
+from connectors.balance_ledger import BalanceLedger
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from test_async_client import record_requests
+from test_kline_stream_bot import wait_for
+
+
+class StubUserStream:
+    def __init__(self):
+        self.connected = True
+        self.connections = 1
+        self.callbacks = dict()
+
+    def subscribe(self, event_type, callback):
+        self.callbacks[event_type] = callback
+
+    def account_positions(self, callback):
+        self.subscribe("outboundAccountPosition", callback)
+
+
+class StubClient:
+    """ get_account_details answered with the snapshot the test sets """
+
+    def __init__(self):
+        self.account = None
+        self.requests = 0
+
+    def get_account_details(self):
+        self.requests += 1
+        return self.account
+
+
+def snapshot(update_time, **free):
+    return {"updateTime": update_time,
+            "balances": [{"asset": asset, "free": str(amount), "locked": "0"} for asset, amount in free.items()]}
+
+
+def position(event_time, **free):
+    return {"e": "outboundAccountPosition", "u": event_time,
+            "B": [{"a": asset, "f": str(amount), "l": "0"} for asset, amount in free.items()]}
+
+
+def test_a_snapshot_never_overwrites_a_newer_event():
+    client, stream = StubClient(), StubUserStream()
+    ledger = BalanceLedger(client, stream)
+    stream.callbacks["outboundAccountPosition"](position(2000, BTC=1.5))
+    stream.callbacks["outboundAccountPosition"](position(500, USDT=80))
+
+    # Taken before the BTC event and after the USDT one
+    client.account = snapshot(1000, BTC=1.0, USDT=90)
+    assert ledger.reconcile()
+    assert ledger.free_balance("btc") == 1.5
+    assert ledger.free_balance("USDT") == 90.0
+
+
+def test_balance_updates_add_to_the_free_balance():
+    client, stream = StubClient(), StubUserStream()
+    client.account = snapshot(1000, USDT=100)
+    ledger = BalanceLedger(client, stream)
+    assert ledger.balances() == {"USDT": 100.0}
+
+    stream.callbacks["balanceUpdate"]({"e": "balanceUpdate", "a": "USDT", "d": "-25.5", "T": 2000})
+    assert ledger.free_balance("USDT") == 74.5
+    assert client.requests == 1
+
+
+def test_a_reconnect_or_no_stream_reconciles_the_next_read():
+    client, stream = StubClient(), StubUserStream()
+    client.account = snapshot(1000, USDT=100)
+    ledger = BalanceLedger(client, stream)
+    ledger.balances()
+    ledger.balances()
+    assert client.requests == 1
+
+    stream.connections += 1
+    ledger.balances()
+    assert client.requests == 2
+
+    without_stream = BalanceLedger(client)
+    without_stream.balances()
+    without_stream.balances()
+    assert client.requests == 4
+
+
+def client_of(simulator, **options) -> BinanceClient:
+    return BinanceClient("key", "secret", base_url=simulator.base_url, wss_base_url=simulator.wss_base_url,
+                         kline_cache_dir=None, tick_store_dir=None, rate_limiter=RateLimiter(), **options)
+
+
+def test_a_balance_read_does_not_open_the_user_data_stream(simulator):
+    listen_keys = record_requests(simulator, "POST", "/api/v3/userDataStream")
+    client = client_of(simulator)
+
+    assert client.get_asset_balance("USDT") == 10000.0
+    assert client.user_data_stream is None and listen_keys == []
+
+
+def test_the_ledger_follows_a_user_data_stream_started_later(simulator):
+    accounts = record_requests(simulator, "GET", "/api/v3/account")
+    client = client_of(simulator)
+    assert client.get_asset_balance("USDT") == 10000.0
+
+    stream = client.get_user_data_stream()
+    try:
+        assert wait_for(lambda: stream.connected)
+        # Reconciled once the stream is connected, then fed by it
+        assert client.get_asset_balance("USDT") == 10000.0
+        requested = len(accounts)
+        assert client.buy_order("BTCUSDT", amount=0.5) is not None
+        assert wait_for(lambda: client.balance_ledger.free.get("BTC", 0.0) > 0)
+        assert client.get_asset_balance("USDT") < 10000.0
+        assert len(accounts) == requested
+    finally:
+        stream.stop()
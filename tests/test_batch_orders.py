@@ -0,0 +1,94 @@
+import hashlib
+import hmac
+import time
+from urllib.parse import urlencode
+
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from bots.grid.spot_grid import StaticGridBot
+from test_async_client import DelayingLimiter, record_requests
+
+
+def client_of(simulator, rate_limiter=None) -> BinanceClient:
+    return BinanceClient("key", "secret", base_url=simulator.base_url, kline_cache_dir=None, tick_store_dir=None,
+                         use_user_data_stream=False, rate_limiter=rate_limiter or RateLimiter())
+
+
+def limit_order(side, price, amount=0.1):
+    return dict(symbol="BTCUSDT", side=side, type="LIMIT", price=price, amount=amount)
+
+
+def test_batch_orders_keep_the_order_of_the_requests(simulator):
+    client = client_of(simulator)
+    prices = [95.0, 96.0, 97.0, 98.0]
+    orders = [limit_order("BUY", price) for price in prices]
+    # Needs more USDT than the simulated account holds, so it's rejected
+    orders.insert(2, limit_order("BUY", 90.0, amount=1000.0))
+
+    responses = client.batch_orders(orders, workers=4)
+
+    assert responses[2] is None
+    placed = responses[:2] + responses[3:]
+    assert [float(order["price"]) for order in placed] == prices
+    assert len(simulator.exchange.open_orders["BTCUSDT"]) == 4
+
+
+def test_cancel_replace_moves_an_order(simulator):
+    client = client_of(simulator)
+    order = client.new_order(**limit_order("BUY", 95.0))
+
+    response = client.cancel_replace_order("BTCUSDT", order["orderId"], "BUY", price=94.0, amount=0.1)
+
+    assert response["cancelResult"] == "SUCCESS" and response["newOrderResult"] == "SUCCESS"
+    assert response["cancelResponse"]["orderId"] == order["orderId"]
+    assert list(simulator.exchange.open_orders["BTCUSDT"]) == [response["newOrderResponse"]["orderId"]]
+    assert float(response["newOrderResponse"]["price"]) == 94.0
+
+
+def test_cancel_replace_stops_when_the_cancel_fails(simulator):
+    client = client_of(simulator)
+    order = client.new_order(**limit_order("BUY", 95.0))
+    client.cancel_order("BTCUSDT", order["orderId"])
+
+    assert client.cancel_replace_order("BTCUSDT", order["orderId"], "BUY", price=94.0, amount=0.1) is None
+    assert simulator.exchange.open_orders["BTCUSDT"] == {}
+
+    response = client.cancel_replace_order("BTCUSDT", order["orderId"], "BUY", price=94.0, amount=0.1,
+                                           mode="ALLOW_FAILURE")
+    assert response["cancelResult"] == "FAILURE" and response["newOrderResult"] == "SUCCESS"
+
+
+def test_batch_orders_cancel_replace_and_sign_after_the_rate_limiter_wait(simulator):
+    client = client_of(simulator, rate_limiter=DelayingLimiter(0.3))
+    order = client.new_order(**limit_order("BUY", 95.0))
+    requests = record_requests(simulator, "POST", "/api/v3/order/cancelReplace")
+
+    sent = int(time.time() * 1000)
+    response, = client.batch_orders([dict(limit_order("BUY", 94.0), cancel_order_id=order["orderId"])])
+
+    assert response["newOrderResult"] == "SUCCESS"
+    params = dict(requests[0])
+    assert int(params["timestamp"]) >= sent + 300
+    signature = params.pop("signature")
+    assert signature == hmac.new(b"secret", urlencode(params).encode(), hashlib.sha256).hexdigest()
+
+
+def test_grid_is_recentered_with_cancel_replace(simulator, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    price = simulator.exchange.price("BTCUSDT")
+    bot = StaticGridBot("key", "secret", False, "BTC", "USDT", units=0.1, upper_price=round(price - 2, 2),
+                        lower_price=round(price - 10, 2), num_grids=8, use_user_data_stream=False,
+                        recenter=True, base_url=simulator.base_url, wss_base_url=simulator.wss_base_url)
+    bot.buy_orders_list = bot._batch_limit_orders(bot.symbol, "BUY", bot.grid_prices[:3], bot.quantity)
+    old_ids = {order["orderId"] for order in bot.buy_orders_list}
+    requests = record_requests(simulator, "POST", "/api/v3/order/cancelReplace")
+
+    bot.recenter_grid(price)
+
+    assert len(requests) == 3
+    assert bot.lower_price < price < bot.upper_price
+    open_orders = simulator.exchange.open_orders["BTCUSDT"]
+    assert set(open_orders) == {order["orderId"] for order in bot.buy_orders_list}
+    assert not old_ids & set(open_orders)
+    # The orders moved to the buy levels closest to the price
+    assert sorted(float(order["price"]) for order in bot.buy_orders_list) == bot.buy_grid_prices[-3:]
@@ -0,0 +1,95 @@
+import pytest
+
+from connectors.binanceConnect import BinanceClient
+from connectors.exchange_info import ExchangeInfo, SymbolFilters
+from connectors.rate_limiter import RateLimiter
+from bots.grid.spot_grid import StaticGridBot
+from test_async_client import record_requests
+
+
+def filters(tick="0.01000000", step="0.00100000", min_notional="5.00000000") -> SymbolFilters:
+    return SymbolFilters({"symbol": "BTCUSDT", "status": "TRADING", "baseAsset": "BTC", "quoteAsset": "USDT",
+                          "permissions": ["SPOT"], "permissionSets": [["MARGIN", "TRD_GRP_004"]],
+                          "filters": [{"filterType": "PRICE_FILTER", "tickSize": tick, "minPrice": tick,
+                                       "maxPrice": "1000000.00000000"},
+                                      {"filterType": "LOT_SIZE", "stepSize": step, "minQty": step,
+                                       "maxQty": "9000.00000000"},
+                                      {"filterType": "NOTIONAL", "minNotional": min_notional}]})
+
+
+def client_of(simulator) -> BinanceClient:
+    return BinanceClient("key", "secret", base_url=simulator.base_url, kline_cache_dir=None, tick_store_dir=None,
+                         rate_limiter=RateLimiter())
+
+
+def test_prices_round_to_the_nearest_tick_and_quantities_down_to_the_step():
+    symbol = filters()
+    assert (symbol.price_precision, symbol.quantity_precision) == (2, 3)
+    assert symbol.round_price(100.126) == 100.13
+    assert symbol.round_price(100.124) == 100.12
+    assert symbol.round_quantity(0.0029999) == 0.002
+    # Already on a step despite the float representation
+    assert symbol.round_quantity(0.1 + 0.2) == 0.3
+    assert filters(tick="1.00000000", step="1.00000000").round_price(10.6) == 11.0
+    assert SymbolFilters.precision("1.00000000", 8) == 0
+    assert symbol.permissions == {"SPOT", "MARGIN", "TRD_GRP_004"}
+
+
+def test_orders_breaking_the_filters_are_invalid():
+    symbol = filters()
+    assert symbol.is_valid_order(100.0, 0.05)
+    assert not symbol.is_valid_order(100.0, 0.04)
+    assert not symbol.is_valid_order(100.0, 0.0005)
+    assert not symbol.is_valid_order(2000000.0, 0.001)
+
+
+def test_exchange_info_is_downloaded_once_per_ttl(simulator):
+    requests = record_requests(simulator, "GET", "/api/v3/exchangeInfo")
+    client = client_of(simulator)
+
+    assert client.round_price("btcusdt", 100.126) == 100.13
+    assert client.round_quantity("BTCUSDT", 0.123456789) == 0.12345
+    assert client.get_symbol_filters("ETHUSDT") is None
+    assert client.exchange_info.symbols(quote_asset="USDT") == ["BTCUSDT"]
+    assert client.exchange_info.symbols(permission="LEVERAGED") == []
+    assert len(requests) == 1
+
+    client.exchange_info.ttl = 0
+    client.get_symbol_filters("BTCUSDT")
+    assert len(requests) == 2
+
+
+def test_a_failed_refresh_serves_the_previous_filters_until_the_backoff_ends(simulator):
+    client = client_of(simulator)
+    info = ExchangeInfo(client, ttl=0, retry_backoff=60)
+    assert info.get("BTCUSDT").tick_size == 0.01
+
+    handler, calls = simulator.routes[("GET", "/api/v3/exchangeInfo")], []
+
+    def unavailable(params):
+        calls.append(params)
+        raise ValueError("Unavailable.")
+
+    simulator.routes[("GET", "/api/v3/exchangeInfo")] = unavailable
+    for _ in range(3):
+        assert info.get("BTCUSDT").tick_size == 0.01
+    assert len(calls) == 1
+
+    simulator.routes[("GET", "/api/v3/exchangeInfo")] = handler
+    info.failed -= 60
+    assert info.get("BTCUSDT") is not None and info.failed is None
+
+
+def test_grid_prices_and_orders_follow_the_symbol_filters(simulator, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    price = simulator.exchange.price("BTCUSDT")
+    bot = StaticGridBot("key", "secret", False, "BTC", "USDT", units=0.123456789, upper_price=price + 3.333,
+                        lower_price=price - 3.333, num_grids=7, use_user_data_stream=False,
+                        base_url=simulator.base_url, wss_base_url=simulator.wss_base_url)
+
+    assert all(grid_price == round(grid_price, 2) for grid_price in bot.grid_prices)
+    params = bot._limit_order_params(bot.symbol, "BUY", price - 1.2345, bot.quantity)
+    assert params["price"] == pytest.approx(round(price - 1.2345, 2))
+    assert params["amount"] == bot.symbol_filters.round_quantity(bot.quantity) <= bot.quantity
+    # Below the min notional of the simulator
+    assert bot._limit_order_params(bot.symbol, "BUY", price, 0.00001) is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from conftest import MINUTE, SIMULATOR_START
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from test_async_client import record_requests
+
+END = SIMULATOR_START + 119 * MINUTE
+
+
+def client_of(simulator) -> BinanceClient:
+    return BinanceClient("key", "secret", base_url=simulator.base_url, kline_cache_dir=None, tick_store_dir=None,
+                         rate_limiter=RateLimiter())
+
+
+@pytest.mark.parametrize("candles, limit", [(2500, 1000), (1000, 1000), (1, 1000), (7, 3)])
+def test_planned_pages_cover_the_range_without_overlapping(simulator, candles, limit):
+    start = SIMULATOR_START
+    end = start + (candles - 1) * MINUTE
+    pages = client_of(simulator).plan_kline_pages("1m", start, end, limit)
+
+    assert pages[0][0] == start and pages[-1][1] >= end
+    assert len(pages) == -(-candles // limit)
+    for (page_start, page_end), (next_start, _) in zip(pages, pages[1:]):
+        assert next_start == page_end + 1
+    assert all((page_end - page_start) // MINUTE + 1 <= limit for page_start, page_end in pages)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_pages_fetched_in_parallel_are_joined_in_order(simulator, workers):
+    requests = record_requests(simulator, "GET", "/api/v3/klines")
+    client = client_of(simulator)
+
+    data = client.get_historicals("BTCUSDT", "1m", SIMULATOR_START, END, limit=25, workers=workers)
+
+    assert len(requests) == 5
+    windows = sorted((int(request["startTime"]), int(request["endTime"])) for request in requests)
+    assert windows == client.plan_kline_pages("1m", SIMULATOR_START, END, 25)
+    assert data.index.is_monotonic_increasing and data.index.is_unique and len(data) == 120
+    np.testing.assert_allclose(data["Close"].to_numpy(), simulator.exchange.candles["BTCUSDT"]["close"])
+
+
+def test_a_failed_page_fails_the_download(simulator):
+    handler = simulator.routes[("GET", "/api/v3/klines")]
+
+    def fail_second_page(params):
+        if int(params["startTime"]) != SIMULATOR_START:
+            raise ValueError("Unavailable page.")
+        return handler(params)
+
+    simulator.routes[("GET", "/api/v3/klines")] = fail_second_page
+    client = client_of(simulator)
+
+    assert client.get_historicals("BTCUSDT", "1m", SIMULATOR_START, END, dataframe=False, limit=60) is None
+    candles = client.get_historicals("BTCUSDT", "1m", SIMULATOR_START, SIMULATOR_START + 59 * MINUTE,
+                                     dataframe=False, limit=60, workers=2)
+    assert [candle[0] for candle in candles] == [SIMULATOR_START + i * MINUTE for i in range(60)]
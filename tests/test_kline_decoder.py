@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+
+from conftest import MINUTE, SIMULATOR_START
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from connectors.kline_decoder import decode_kline_pages, candles_to_columns, columns_to_frame
+
+
+def kline(i: int) -> list:
+    open_time = SIMULATOR_START + i * MINUTE
+    return [open_time, f"{100 + i:.8f}", f"{101 + i:.8f}", f"{99 + i:.8f}", f"{100.5 + i:.8f}", "12.34500000",
+            open_time + MINUTE - 1, "1234.50000000", 17, "6.00000000", "600.00000000", "0"]
+
+
+def page(rows, separators=(",", ":")) -> bytes:
+    return json.dumps([kline(i) for i in rows], separators=separators).encode()
+
+
+def assert_same_columns(columns: dict, expected: dict):
+    assert list(columns) == list(expected)
+    for column, values in expected.items():
+        assert columns[column].dtype == values.dtype
+        np.testing.assert_array_equal(columns[column], values)
+
+
+def test_decoded_pages_equal_the_parsed_json(simulator):
+    client = BinanceClient("key", "secret", base_url=simulator.base_url, kline_cache_dir=None, tick_store_dir=None,
+                           rate_limiter=RateLimiter())
+    pages = client.plan_kline_pages("1m", SIMULATOR_START, SIMULATOR_START + 119 * MINUTE, 50)
+    raw = client.fetch_kline_pages("BTCUSDT", "1m", pages, 50, raw=True)
+
+    candles = [candle for body in raw for candle in json.loads(body)]
+    assert_same_columns(decode_kline_pages(raw), candles_to_columns(candles))
+    assert decode_kline_pages(raw)["open_time"].dtype == np.int64
+
+
+def test_compact_spaced_and_empty_pages():
+    expected = candles_to_columns([kline(i) for i in range(5)])
+    assert_same_columns(decode_kline_pages([page(range(3)), b"[]", page(range(3, 5), separators=(", ", ": "))]),
+                        expected)
+    assert all(len(values) == 0 for values in decode_kline_pages([b"[]"]).values())
+    assert all(len(values) == 0 for values in decode_kline_pages([]).values())
+
+
+def test_duplicates_at_page_boundaries_are_dropped():
+    columns = decode_kline_pages([page(range(4)), page(range(3, 6)), page(range(5, 7))])
+    assert_same_columns(columns, candles_to_columns([kline(i) for i in range(7)]))
+
+
+def test_only_the_last_candle_of_the_frame_is_incomplete():
+    df = columns_to_frame(candles_to_columns([kline(i) for i in range(3)]))
+    assert df.index.name == "Date" and df.index[0].value // 10 ** 6 == SIMULATOR_START
+    assert df["Complete"].tolist() == [True, True, False]
+    assert df["Close"].tolist() == [100.5, 101.5, 102.5]
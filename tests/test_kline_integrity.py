@@ -0,0 +1,28 @@
+import numpy as np
+
+from connectors.kline_integrity import find_gaps, check_klines, sort_unique
+
+HOUR = 3600000
+
+
+def test_find_gaps():
+    assert find_gaps([hour * HOUR for hour in [0, 1, 2, 5, 6, 9]], HOUR) == [(3 * HOUR, 4 * HOUR),
+                                                                               (7 * HOUR, 8 * HOUR)]
+    assert find_gaps([0, HOUR, 2 * HOUR], HOUR) == []
+
+
+def test_check_klines_reports_duplicates_order_and_missing_candles():
+    report = check_klines([hour * HOUR for hour in [0, 2, 1, 1, 5]], HOUR)
+
+    assert not report["ordered"]
+    assert list(report["duplicates"]) == [HOUR]
+    assert report["gaps"] == [(3 * HOUR, 4 * HOUR)]
+    assert report["missing"] == 2
+
+
+def test_sort_unique_keeps_the_last_duplicate():
+    columns = {"open_time": np.array([2 * HOUR, 0, HOUR, 0]), "close": np.array([1.0, 2.0, 3.0, 4.0])}
+
+    repaired = sort_unique(columns)
+    assert list(repaired["open_time"]) == [0, HOUR, 2 * HOUR]
+    assert list(repaired["close"]) == [4.0, 3.0, 1.0]
@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import numpy as np
+import pytest
+
+from storage.kline_store import KlineStore
+
+HOUR = 3600000
+
+
+def klines(hours, close=1.0) -> dict:
+    open_time = np.array([hour * HOUR for hour in hours], dtype=np.int64)
+    columns = {column: np.full(len(open_time), close) for column in ["open", "high", "low", "close", "volume"]}
+    columns["open_time"] = open_time
+    return columns
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KlineStore(str(tmp_path))
+
+
+def test_empty_store(store):
+    assert store.coverage("BTCUSDT", "1h") is None
+    assert len(store.read("BTCUSDT", "1h")["open_time"]) == 0
+    assert store.empty_ranges("BTCUSDT", "1h") == []
+
+
+def test_write_and_read_range(store):
+    store.write("BTCUSDT", "1h", klines(range(10)), 0, 9 * HOUR)
+
+    assert store.coverage("btcusdt", "1h") == (0, 9 * HOUR)
+    assert list(store.read("BTCUSDT", "1h", 3 * HOUR, 5 * HOUR)["open_time"]) == [3 * HOUR, 4 * HOUR, 5 * HOUR]
+    assert len(store.read("BTCUSDT", "1h")["close"]) == 10
+
+
+def test_write_merges_and_new_candles_replace_stored_ones(store):
+    store.write("BTCUSDT", "1h", klines(range(5, 10), close=1.0), 5 * HOUR, 9 * HOUR)
+    store.write("BTCUSDT", "1h", klines(range(0, 7), close=2.0), 0, 6 * HOUR)
+
+    columns = store.read("BTCUSDT", "1h")
+    assert list(columns["open_time"]) == [hour * HOUR for hour in range(10)]
+    assert list(columns["close"]) == [2.0] * 7 + [1.0] * 3
+    assert store.coverage("BTCUSDT", "1h") == (0, 9 * HOUR)
+
+
+def test_coverage_includes_ranges_without_candles(store):
+    store.write("BTCUSDT", "1h", klines(range(3)), 0, 5 * HOUR)
+
+    assert store.coverage("BTCUSDT", "1h") == (0, 5 * HOUR)
+    assert len(store.read("BTCUSDT", "1h")["open_time"]) == 3
+
+
+def test_empty_ranges_are_kept_inside_the_coverage(store):
+    store.write("BTCUSDT", "1h", klines([0, 1, 5, 6]), 0, 6 * HOUR)
+    store.mark_empty("BTCUSDT", "1h", [(2 * HOUR, 4 * HOUR), (10 * HOUR, 12 * HOUR)])
+    assert store.empty_ranges("BTCUSDT", "1h") == [(2 * HOUR, 4 * HOUR)]
+
+    # Extending the store keeps them
+    store.write("BTCUSDT", "1h", klines([7]), 7 * HOUR, 7 * HOUR)
+    assert store.empty_ranges("BTCUSDT", "1h") == [(2 * HOUR, 4 * HOUR)]
+
+
+def test_mark_empty_without_stored_data_is_ignored(store):
+    store.mark_empty("BTCUSDT", "1h", [(0, HOUR)])
+    assert store.coverage("BTCUSDT", "1h") is None
+
+
+def test_corrupted_meta_is_ignored(store, capsys):
+    store.write("BTCUSDT", "1h", klines(range(3)), 0, 2 * HOUR)
+    with open(store.path("BTCUSDT", "1h") + "/meta.json", "w") as f:
+        f.write("{")
+
+    assert store.coverage("BTCUSDT", "1h") is None
+    assert "Corrupted" in capsys.readouterr().out
+
+
+def write_hours(root, hours):
+    store = KlineStore(root)
+    for hour in hours:
+        store.write("BTCUSDT", "1h", klines([hour], close=float(hour)), hour * HOUR, hour * HOUR)
+
+
+def test_new_candles_are_appended_in_place(store):
+    store.write("BTCUSDT", "1h", klines(range(5)), 0, 4 * HOUR)
+    close_file = store.path("BTCUSDT", "1h") + "/close.npy"
+    inode = os.stat(close_file).st_ino
+
+    # The last candle updated (still open when it was stored) and new ones after it
+    store.write("BTCUSDT", "1h", klines(range(4, 8), close=2.0), 4 * HOUR, 7 * HOUR)
+
+    assert os.stat(close_file).st_ino == inode
+    assert list(np.load(close_file)) == [1.0] * 4 + [2.0] * 4
+    assert list(store.read("BTCUSDT", "1h")["open_time"]) == [hour * HOUR for hour in range(8)]
+    assert store.coverage("BTCUSDT", "1h") == (0, 7 * HOUR)
+
+
+def test_rows_of_an_interrupted_append_are_ignored(store):
+    store.write("BTCUSDT", "1h", klines(range(3)), 0, 2 * HOUR)
+    meta_file = store.path("BTCUSDT", "1h") + "/meta.json"
+    with open(meta_file, "rb") as f:
+        meta = f.read()
+    # Column files appended, the process died before committing meta.json
+    store.write("BTCUSDT", "1h", klines(range(3, 6), close=3.0), 3 * HOUR, 5 * HOUR)
+    with open(meta_file, "wb") as f:
+        f.write(meta)
+
+    assert len(store.read("BTCUSDT", "1h")["open_time"]) == 3
+    store.write("BTCUSDT", "1h", klines([3], close=2.0), 3 * HOUR, 3 * HOUR)
+    assert list(store.read("BTCUSDT", "1h")["close"]) == [1.0, 1.0, 1.0, 2.0]
+    assert len(np.load(store.path("BTCUSDT", "1h") + "/close.npy")) == 4
+
+
+def test_writers_of_several_processes_take_turns(tmp_path):
+    root = str(tmp_path)
+    write_hours(root, [0])
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=write_hours, args=(root, range(first, 40, 4))) for first in range(1, 5)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    columns = KlineStore(root).read("BTCUSDT", "1h")
+    assert list(columns["open_time"]) == [hour * HOUR for hour in range(40)]
+    assert list(columns["close"]) == [float(hour) for hour in range(40)]
+    assert not [file for file in os.listdir(KlineStore(root).path("BTCUSDT", "1h")) if file.endswith(".tmp")]
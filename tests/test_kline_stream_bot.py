@@ -0,0 +1,84 @@
+import time
+
+import pandas as pd
+
+from conftest import MINUTE, SIMULATOR_START
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from bots.ta_bots.ema_crossover import EMACrossoverBOT
+from time_operators.time_operator import TimeOperator
+
+
+class SimulatorTime(TimeOperator):
+    """ Clock of the bot at the last simulated candle, history requests stay inside the simulated range """
+
+    def generate_current_timestamp(self):
+        return SIMULATOR_START + 119 * MINUTE
+
+    def generate_reverse_days(self, days):
+        return int(self.generate_current_timestamp() - days * 24 * 60 * MINUTE)
+
+
+def wait_for(condition, timeout=5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def subscribed(simulator, besides=()) -> bool:
+    """ :param besides: connections that don't count, e.g. the one a reconnect is closing """
+    return any("btcusdt@kline_1m" in connection.streams and not connection.closed and connection not in besides
+               for connection in list(simulator.connections))
+
+
+def bot_of(simulator) -> EMACrossoverBOT:
+    bot = EMACrossoverBOT("key", "secret", True, "BTC", "USDT", "1m", "double_ema", units=0.5, ema_s=5, ema_l=20)
+    bot.client = BinanceClient("key", "secret", base_url=simulator.base_url, wss_base_url=simulator.wss_base_url,
+                               kline_cache_dir=None, tick_store_dir=None, use_user_data_stream=False,
+                               rate_limiter=RateLimiter())
+    bot.time = SimulatorTime()
+    return bot
+
+
+def test_stream_updates_the_data_on_the_dispatcher_and_stops(simulator):
+    bot = bot_of(simulator)
+    bot.start_trading(historical_days=1, block=False)
+    assert len(bot.data) == 120
+
+    assert wait_for(lambda: subscribed(simulator))
+    simulator.exchange.step()
+    # The subscription response and the candle
+    assert wait_for(lambda: bot.dispatcher.stats()["processed"] == 2)
+    # The replayed candle was already loaded, it's updated in place
+    candle = bot.data.loc[pd.to_datetime(SIMULATOR_START + MINUTE, unit="ms")]
+    assert len(bot.data) == 120
+    assert candle["Close"] == round(float(simulator.exchange.candles["BTCUSDT"]["close"][1]), 8)
+
+    bot.stop_kline_stream()
+    bot.stream.join(5)
+    assert not bot.stream.running
+    assert not any(thread.is_alive() for thread in bot.dispatcher.threads)
+
+
+def test_first_candle_after_a_reconnect_backfills_the_missed_ones(simulator):
+    bot = bot_of(simulator)
+    bot.start_trading(historical_days=1, block=False)
+    assert wait_for(lambda: subscribed(simulator))
+    # Candles missed while the stream was down
+    missed = bot.data.index[50:60]
+    bot.data = bot.data.drop(missed)
+
+    previous = list(simulator.connections)
+    bot.stream.reconnect()
+    assert wait_for(lambda: bot.backfill_pending)
+    assert wait_for(lambda: subscribed(simulator, besides=previous))
+    simulator.exchange.step()
+    # The flag is cleared before the backfill request, the data is replaced once it's done
+    assert wait_for(lambda: not bot.backfill_pending and len(bot.data) == 120)
+
+    assert bot.data.index.is_monotonic_increasing
+    assert bot.data.loc[missed, "Complete"].all()
+    bot.stop_kline_stream()
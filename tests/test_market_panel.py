@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from backtester.model.panel import MarketPanel
+
+
+def positions_of(backtester) -> dict:
+    """
+    Random positions of the test backtester's symbols, BBBUSDT with gaps and NaN indicator rows
+    """
+    rng = np.random.default_rng(11)
+    frames = {}
+    for symbol, data in backtester.data.items():
+        frame = data[["Close", "returns"]].copy()
+        frame["position"] = rng.choice([-1.0, 0.0, 1.0], len(frame))
+        if symbol == "BBBUSDT":
+            frame = frame.drop(frame.index[300:340]).iloc[::3].copy()
+            frame.iloc[:20, frame.columns.get_loc("position")] = np.nan
+            frame.iloc[100:105, frame.columns.get_loc("Close")] = np.nan
+        frames[symbol] = frame
+    return frames
+
+
+def loop_results(backtester, frames: dict) -> dict:
+    """
+    Backtest of every symbol on its own DataFrame, like the Backtester did before MarketPanel
+    """
+    results = {}
+    for symbol, data in frames.items():
+        data = data.copy()
+        data["strategy"] = data["position"].shift(1) * data["returns"]
+        data["trades"] = data.position.diff().fillna(0).abs()
+        data.strategy = data.strategy + data.trades * backtester.tc
+        data.dropna(inplace=True)
+        data["creturns"] = data["returns"].cumsum().apply(np.exp)
+        data["cstrategy"] = data["strategy"].cumsum().apply(np.exp)
+        results[symbol] = data
+    return results
+
+
+def test_panel_backtest_matches_the_per_symbol_loop(backtester):
+    frames = positions_of(backtester)
+    results = backtester.test_strategy({symbol: frame.copy() for symbol, frame in frames.items()})
+    expected = loop_results(backtester, frames)
+
+    for symbol in frames:
+        assert results[symbol].index.equals(expected[symbol].index)
+        pd.testing.assert_frame_equal(results[symbol][expected[symbol].columns], expected[symbol], check_exact=False,
+                                      rtol=1e-12)
+    assert len(results["BBBUSDT"]) < len(frames["BBBUSDT"])
+
+
+def test_panel_metrics_match_the_per_symbol_formulas(backtester):
+    results = backtester.test_strategy(positions_of(backtester))
+    metrics = backtester.performance_metrics(results)
+
+    for i, symbol in enumerate(metrics["symbols"]):
+        strategy = results[symbol]["strategy"]
+        days = (strategy.index[-1] - strategy.index[0]).days / backtester.PERIOD_DAYS[backtester.period_cagr]
+        assert metrics["strategy_multiple"][i] == pytest.approx(np.exp(strategy.sum()), rel=1e-12)
+        assert metrics["bh_multiple"][i] == pytest.approx(np.exp(results[symbol]["returns"].sum()), rel=1e-12)
+        assert metrics["cagr"][i] == pytest.approx(np.exp(strategy.sum()) ** (1 / days) - 1, rel=1e-9)
+        assert metrics["ann_mean"][i] == pytest.approx(strategy.mean() * backtester.tp[symbol], rel=1e-9)
+        assert metrics["ann_std"][i] == pytest.approx(strategy.std() * np.sqrt(backtester.tp[symbol]), rel=1e-9)
+
+
+def test_shift_follows_the_rows_of_every_symbol():
+    index = pd.date_range("2023-01-01", periods=5, freq="h")
+    frames = {"A": pd.DataFrame({"Close": [1.0, 2.0, 3.0, 4.0, 5.0]}, index=index),
+              "B": pd.DataFrame({"Close": [10.0, 30.0, 50.0]}, index=index[::2])}
+    panel = MarketPanel.from_frames(frames)
+
+    shifted = panel.shift(panel["Close"])
+    np.testing.assert_array_equal(shifted[:, 0], [np.nan, 1.0, 2.0, 3.0, 4.0])
+    # B's previous row is two rows up, rows it has no data in stay NaN
+    np.testing.assert_array_equal(shifted[:, 1], [np.nan, np.nan, 10.0, np.nan, 30.0])
+
+
+def test_a_duplicated_index_is_rejected():
+    index = pd.DatetimeIndex(["2023-01-01", "2023-01-01", "2023-01-02"])
+    with pytest.raises(ValueError):
+        MarketPanel.from_frames({"A": pd.DataFrame({"Close": [1.0, 2.0, 3.0]}, index=index)})
@@ -0,0 +1,163 @@
+import threading
+
+import pytest
+
+from connectors.order_book import OrderBook, OrderBookManager
+
+
+class SnapshotClient:
+    """ Client of OrderBookManager returning prepared depth snapshots """
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+
+    def get_order_book_snapshot(self, symbol, limit):
+        return self.snapshots.pop(0) if self.snapshots else None
+
+
+def snapshot(last_update_id) -> dict:
+    return {"lastUpdateId": last_update_id,
+            "bids": [["100.0", "1.0"], ["99.0", "2.0"]],
+            "asks": [["101.0", "1.5"], ["102.0", "3.0"]]}
+
+
+def depth(first_id, last_id, bids=(), asks=()) -> dict:
+    return {"e": "depthUpdate", "s": "BTCUSDT", "U": first_id, "u": last_id, "b": list(bids), "a": list(asks)}
+
+
+@pytest.fixture
+def manager():
+    manager = OrderBookManager(SnapshotClient(snapshot(100)))
+    manager.books["BTCUSDT"] = OrderBook("BTCUSDT")
+    manager.buffers["BTCUSDT"] = []
+    # Resyncs are recorded instead of downloading a snapshot in a background thread
+    manager.resyncs = []
+    manager.resync = lambda symbol: manager.resyncs.append(symbol)
+    return manager
+
+
+def test_book_levels():
+    book = OrderBook("btcusdt")
+    book.load_snapshot(snapshot(1))
+    assert book.best_bid() == (100.0, 1.0)
+    assert book.best_ask() == (101.0, 1.5)
+    assert book.mid_price() == 100.5
+
+    book.apply(depth(2, 2, bids=[["100.5", "0.5"], ["100.0", "0"]], asks=[["101.0", "0"]]))
+    assert book.best_bid() == (100.5, 0.5)
+    assert book.best_ask() == (102.0, 3.0)
+    assert book.depth_at("BUY", 99.0) == 2.0
+    assert book.depth_at("BUY", 100.0) == 0.0
+    assert book.last_update_id == 2
+
+
+def test_vwap():
+    book = OrderBook("BTCUSDT")
+    book.load_snapshot(snapshot(1))
+    assert book.vwap("BUY", 1.5) == 101.0
+    assert book.vwap("BUY", 3.0) == pytest.approx((1.5 * 101.0 + 1.5 * 102.0) / 3.0)
+    assert book.vwap("SELL", 10.0) is None
+
+
+def test_events_are_buffered_until_the_snapshot(manager):
+    manager.on_depth(depth(90, 95))
+    manager.on_depth(depth(96, 101, bids=[["100.0", "5.0"]]))
+    manager.on_depth(depth(102, 103, asks=[["101.0", "0"]]))
+    book = manager.books["BTCUSDT"]
+    assert not book.synced and len(manager.buffers["BTCUSDT"]) == 3
+
+    manager.load_snapshot("BTCUSDT")
+
+    # The first event is older than the snapshot, the second one overlaps it
+    assert book.synced
+    assert book.last_update_id == 103
+    assert book.best_bid() == (100.0, 5.0)
+    assert book.best_ask() == (102.0, 3.0)
+    assert manager.buffers["BTCUSDT"] == []
+    assert manager.resyncs == []
+
+
+def test_gap_in_the_buffered_events_resyncs(manager):
+    manager.on_depth(depth(105, 106))
+    manager.load_snapshot("BTCUSDT")
+
+    assert not manager.books["BTCUSDT"].synced
+    assert manager.resyncs == ["BTCUSDT"]
+
+
+def test_gap_in_the_live_stream_resyncs(manager):
+    manager.load_snapshot("BTCUSDT")
+    manager.on_depth(depth(101, 102, bids=[["100.2", "1.0"]]))
+    assert manager.books["BTCUSDT"].best_bid() == (100.2, 1.0)
+    assert manager.resyncs == []
+
+    manager.on_depth(depth(104, 105, bids=[["100.4", "1.0"]]))
+    assert manager.books["BTCUSDT"].best_bid() == (100.2, 1.0)
+    assert manager.resyncs == ["BTCUSDT"]
+
+
+def test_process_skips_events_contained_in_the_snapshot(manager):
+    book = manager.books["BTCUSDT"]
+    book.load_snapshot(snapshot(100))
+
+    assert manager.process(book, depth(99, 100, bids=[["100.0", "9.0"]]))
+    assert book.best_bid() == (100.0, 1.0)
+    assert manager.process(book, depth(101, 101))
+    assert not manager.process(book, depth(103, 104))
+
+
+def test_get_returns_only_synced_books(manager):
+    assert manager.get("btcusdt") is None
+    manager.load_snapshot("BTCUSDT")
+    assert manager.get("btcusdt") is manager.books["BTCUSDT"]
+
+
+def test_events_of_untracked_symbols_are_ignored(manager):
+    manager.on_depth(dict(depth(1, 2), s="ETHUSDT"))
+    assert "ETHUSDT" not in manager.buffers
+
+
+def test_stale_snapshots_back_off(manager):
+    manager.client = SnapshotClient(snapshot(100), snapshot(100), snapshot(105))
+    assert manager.resync_delay("BTCUSDT") == 0.0
+
+    # Both snapshots are older than the first buffered event
+    for failures in [1, 2]:
+        manager.on_depth(depth(105, 106))
+        manager.load_snapshot("BTCUSDT")
+        assert manager.failures["BTCUSDT"] == failures
+        delay = manager.backoff * 2 ** (failures - 1)
+        assert delay / 2 <= manager.resync_delay("BTCUSDT") <= delay
+
+    manager.on_depth(depth(105, 106))
+    manager.load_snapshot("BTCUSDT")
+    assert manager.books["BTCUSDT"].synced
+    assert manager.resync_delay("BTCUSDT") == 0.0
+    assert manager.resyncs == ["BTCUSDT", "BTCUSDT"]
+
+
+def test_resync_delay_is_capped():
+    manager = OrderBookManager(SnapshotClient(), backoff=1.0, max_backoff=4.0)
+    manager.failures["BTCUSDT"] = 10
+    assert 2.0 <= manager.resync_delay("BTCUSDT") <= 4.0
+
+
+def test_mid_price_never_mixes_two_states_of_the_book():
+    book = OrderBook("BTCUSDT")
+    book.load_snapshot({"lastUpdateId": 0, "bids": [["100.0", "1.0"]], "asks": [["101.0", "1.0"]]})
+    states = [(["100.0", "1.0"], ["101.0", "1.0"]), (["200.0", "1.0"], ["201.0", "1.0"])]
+
+    def move():
+        # Every event moves both sides from one state to the other
+        for i in range(1, 20001):
+            (old_bid, old_ask), (bid, ask) = states[(i - 1) % 2], states[i % 2]
+            book.apply(depth(i, i, bids=[[old_bid[0], "0"], bid], asks=[[old_ask[0], "0"], ask]))
+
+    writer = threading.Thread(target=move)
+    writer.start()
+    mids = set()
+    while writer.is_alive():
+        mids.add(book.mid_price())
+    writer.join()
+
+    assert mids <= {100.5, 200.5}
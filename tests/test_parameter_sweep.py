@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from backtester.model.sweep import ParameterSweep
+from backtester.ta_indicators.ema import EMA
+from backtester.ta_indicators.sma import SMA
+from backtester.ta_indicators.macd import MACD
+from backtester.ta_indicators.ichimoku_cloud import IchimokuCloud
+from backtester.ta_indicators.ichimoku_cloud_rsi import IchimokuCloudRSI
+from backtester.ta_indicators.sto_rsi_macd import STO_RSI_MACD
+
+# Indicator class, strategy and all_combinantion ranges of every crossover strategy the sweep evaluates
+CASES = [
+    (EMA, "double_ema", {"EMA_S_range": range(5, 12, 3), "EMA_L_range": range(20, 40, 9)}),
+    (EMA, "triple_ema", {"EMA_S_range": range(5, 9, 3), "EMA_M_range": range(10, 16, 5),
+                         "EMA_L_range": range(20, 40, 9)}),
+    (SMA, "double_sma", {"SMA_S_range": range(5, 12, 3), "SMA_L_range": range(20, 40, 9)}),
+    (SMA, "triple_sma", {"SMA_S_range": range(5, 9, 3), "SMA_M_range": range(10, 16, 5),
+                         "SMA_L_range": range(20, 40, 9)}),
+    (MACD, "macd", {"EMA_S_range": range(5, 12, 3), "EMA_M_range": range(20, 30, 9),
+                    "EMA_signal_range": range(5, 10, 4)}),
+]
+
+ICHIMOKU_RANGES = {"conversion_window_range": [1, 9], "base_window_range": [5, 26], "span_window_range": [30, 52],
+                   "leading_shift_range": [0, 26], "lagging_shift_range": [0, 26]}
+
+# Strategies without technical / shifting variants, with options of their all_combinantion
+OTHER_CASES = [
+    (IchimokuCloud, "ichimoku_cloud", dict(ICHIMOKU_RANGES)),
+    (IchimokuCloud, "ichimoku_cloud", dict(ICHIMOKU_RANGES, atr_window=5, own_smoothing=True)),
+    (IchimokuCloud, "ichimoku_cloud", dict(ICHIMOKU_RANGES, atr_stop_loss=False)),
+    (IchimokuCloudRSI, "ichimoku_cloud_rsi", dict(ICHIMOKU_RANGES, rsi_window=10, ema_window=200)),
+    (STO_RSI_MACD, "sto_rsi_macd", {"k_period_range": [5, 14], "smoothing_k_range": [1, 3], "d_period_range": [3],
+                                    "ema_fast_range": [12], "ema_slow_range": [26], "ema_sign_range": [5, 9],
+                                    "rsi_window_range": [14], "lags_range": [0, 1, 3],
+                                    "shift_position_range": [-2, 0, 1]}),
+]
+
+
+def assert_same_frames(result, expected):
+    assert list(result.columns) == list(expected.columns)
+    assert result["Asset"].tolist() == expected["Asset"].tolist()
+    parameters = list(expected.columns[1:-2])
+    assert result[parameters].astype(object).values.tolist() == expected[parameters].astype(object).values.tolist()
+    assert np.allclose(result[["creturns", "cstrategy"]].to_numpy(), expected[["creturns", "cstrategy"]].to_numpy(),
+                       rtol=1e-9)
+
+
+@pytest.mark.parametrize("cls, strategy, ranges", CASES, ids=[case[1] for case in CASES])
+@pytest.mark.parametrize("technical, shifting", [(True, False), (False, False), (True, True)])
+def test_vectorized_sweep_equals_the_loop(indicator, cls, strategy, ranges, technical, shifting):
+    loop = indicator(cls, strategy)
+    loop.all_combinantion(technical=technical, shifting=shifting, **ranges)
+    vectorized = indicator(cls, strategy)
+    vectorized.all_combinantion(technical=technical, shifting=shifting, vectorized=True, **ranges)
+
+    assert_same_frames(vectorized.performance_data, loop.performance_data)
+
+
+@pytest.mark.parametrize("cls, strategy, options", OTHER_CASES)
+def test_vectorized_sweep_of_other_strategies_equals_the_loop(indicator, cls, strategy, options):
+    loop = indicator(cls, strategy)
+    loop.all_combinantion(**options)
+    vectorized = indicator(cls, strategy)
+    vectorized.all_combinantion(vectorized=True, **options)
+
+    assert len(loop.performance_data) > 0
+    assert_same_frames(vectorized.performance_data, loop.performance_data)
+
+
+def test_positions_are_not_only_flat(backtester):
+    # The comparisons above would hold trivially if no combination ever took a position
+    sweep = ParameterSweep(backtester, "sto_rsi_macd")
+    series = sweep.series("AAAUSDT")
+    combinations = np.array([[14, 3, 3, 12, 26, 9, 14, 3, 1]])
+    positions, complete = sweep.positions(combinations, sweep.indicators(series, combinations), series)
+    assert set(np.unique(positions[complete])) == {-1.0, 0.0, 1.0}
+
+
+def test_block_size_does_not_change_the_results(backtester):
+    ranges = [range(5, 12, 2), range(20, 40, 5)]
+    whole = ParameterSweep(backtester, "double_ema", warmup=13).run(*ranges)
+    blocks = ParameterSweep(backtester, "double_ema", warmup=13, block_size=3).run(*ranges)
+    assert np.allclose(whole[["creturns", "cstrategy"]].to_numpy(), blocks[["creturns", "cstrategy"]].to_numpy())
+
+
+def test_unknown_strategy_and_wrong_ranges(backtester):
+    with pytest.raises(ValueError):
+        ParameterSweep(backtester, "rsi")
+    with pytest.raises(ValueError):
+        ParameterSweep(backtester, "double_ema").run(range(5, 10))
+
+
+@pytest.mark.parametrize("options", [{"workers": 2}, {"fixed_stop_loss": True}, {"trailing_stop_loss": True}])
+def test_vectorized_sweep_rejects_options_it_does_not_model(indicator, options):
+    with pytest.raises(ValueError):
+        indicator(EMA, "double_ema").all_combinantion(EMA_S_range=range(5, 8), EMA_L_range=range(20, 22),
+                                                      vectorized=True, **options)
@@ -0,0 +1,78 @@
+import pytest
+
+from connectors.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def limiter():
+    # 60 weight per minute and 10 orders per 10 s refill 1 token per second each
+    return RateLimiter(weight_per_minute=60, orders_per_10s=10, safety_margin=1.0)
+
+
+@pytest.mark.parametrize("limit, weight", [(None, 5), (100, 5), (500, 25), (1000, 50), (5000, 250)])
+def test_depth_weight_follows_limit(limiter, limit, weight):
+    data = {"symbol": "BTCUSDT"} if limit is None else {"symbol": "BTCUSDT", "limit": limit}
+    assert limiter.weight("GET", "/api/v3/depth", data) == weight
+
+
+@pytest.mark.parametrize("data, weight", [
+    ({"symbol": "BTCUSDT"}, 2),
+    ({"symbols": '["BTCUSDT", "ETHUSDT"]'}, 4),
+    ({"symbols": ["S%d" % i for i in range(20)]}, 4),
+    ({"symbols": ["S%d" % i for i in range(21)]}, 40),
+    ({"symbols": ["S%d" % i for i in range(100)]}, 40),
+    ({"symbols": ["S%d" % i for i in range(101)]}, 80),
+    (None, 80),
+])
+def test_ticker_weight_follows_symbol_count(limiter, data, weight):
+    assert limiter.weight("GET", "/api/v3/ticker/price", data) == weight
+    assert limiter.weight("GET", "/api/v3/ticker/bookTicker", data) == weight
+
+
+def test_endpoint_weights(limiter):
+    assert limiter.weight("GET", "/api/v3/openOrders", {"symbol": "BTCUSDT"}) == 6
+    assert limiter.weight("GET", "/api/v3/openOrders") == 80
+    assert limiter.weight("GET", "/api/v3/account") == 20
+    assert limiter.weight("GET", "/api/v3/unknown") == 1
+
+
+def test_reserve_within_capacity_does_not_wait(limiter):
+    for _ in range(3):
+        assert limiter.reserve("GET", "/api/v3/exchangeInfo") == 0
+
+
+def test_reserve_over_capacity_waits_for_the_refill(limiter):
+    assert limiter.reserve("GET", "/api/v3/exchangeInfo") == 0
+    assert limiter.reserve("GET", "/api/v3/exchangeInfo") == 0
+    assert limiter.reserve("GET", "/api/v3/exchangeInfo") == 0
+    # 60 tokens are used up, every next weight of 20 queues 20 s behind the previous reservation
+    assert limiter.reserve("GET", "/api/v3/exchangeInfo") == pytest.approx(20, abs=0.1)
+    assert limiter.reserve("GET", "/api/v3/exchangeInfo") == pytest.approx(40, abs=0.1)
+
+
+def test_orders_are_limited_by_the_order_count(limiter):
+    waits = [limiter.reserve("POST", "/api/v3/order") for _ in range(12)]
+    assert waits[:10] == [0] * 10
+    assert waits[10] == pytest.approx(1, abs=0.1)
+    assert waits[11] == pytest.approx(2, abs=0.1)
+
+
+def test_update_syncs_with_the_exchange_usage(limiter):
+    limiter.update({"X-MBX-USED-WEIGHT-1M": "60"})
+    assert limiter.reserve("GET", "/api/v3/klines") == pytest.approx(2, abs=0.1)
+
+    # Usage reported lower than the local count doesn't give tokens back
+    limiter.update({"X-MBX-USED-WEIGHT-1M": "0"})
+    assert limiter.reserve("GET", "/api/v3/klines") == pytest.approx(4, abs=0.1)
+
+
+def test_ban_delays_every_request(limiter):
+    limiter.ban("30")
+    assert limiter.reserve("GET", "/api/v3/klines") == pytest.approx(30, abs=0.1)
+    limiter.ban()
+    assert limiter.reserve("GET", "/api/v3/klines") == pytest.approx(60, abs=0.1)
+
+
+def test_shared_limiter_per_host():
+    assert RateLimiter.shared("https://example.test") is RateLimiter.shared("https://example.test")
+    assert RateLimiter.shared("https://example.test") is not RateLimiter.shared("https://other.test")
@@ -0,0 +1,74 @@
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+
+
+def client_of(simulator, **options) -> BinanceClient:
+    return BinanceClient("key", "secret", base_url=simulator.base_url, kline_cache_dir=None, tick_store_dir=None,
+                         rate_limiter=RateLimiter(), **options)
+
+
+def count_connections(simulator) -> list:
+    """
+    Returns a list a client address is appended to for every TCP connection the simulator accepts
+    """
+    connections, process_request = [], simulator.httpd.process_request
+
+    def record(request, client_address):
+        connections.append(client_address)
+        return process_request(request, client_address)
+
+    simulator.httpd.process_request = record
+    return connections
+
+
+def failing(simulator, method, endpoint, failures: int) -> list:
+    """
+    Makes the first requests of an endpoint fail with a 500, returns a list every request is appended to
+    """
+    calls, handler = [], simulator.routes[(method, endpoint)]
+
+    def fail(params):
+        calls.append(dict(params))
+        if len(calls) <= failures:
+            raise RuntimeError("unavailable")
+        return handler(params)
+
+    simulator.routes[(method, endpoint)] = fail
+    return calls
+
+
+def test_requests_reuse_a_pooled_keep_alive_connection(simulator):
+    connections = count_connections(simulator)
+    client = client_of(simulator)
+
+    for _ in range(20):
+        assert client.make_request("GET", "/api/v3/ping") == {}
+    assert client.get_current_price("BTCUSDT") is not None
+
+    assert len(connections) == 1
+    client.close()
+
+
+def test_idempotent_requests_are_retried_after_a_server_error(simulator):
+    calls = failing(simulator, "GET", "/api/v3/ping", failures=2)
+    client = client_of(simulator, max_retries=3, backoff_factor=0)
+
+    assert client.make_request("GET", "/api/v3/ping") == {}
+    assert len(calls) == 3
+
+
+def test_orders_are_not_retried_after_they_reached_the_server(simulator, capsys):
+    calls = failing(simulator, "POST", "/api/v3/order", failures=1)
+    client = client_of(simulator, max_retries=3, backoff_factor=0)
+
+    order = client.new_order("BTCUSDT", "BUY", price=95.0, amount=0.1)
+
+    assert order is None and len(calls) == 1
+    assert "status code: 500" in capsys.readouterr().out
+
+
+def test_error_responses_return_none(simulator, capsys):
+    client = client_of(simulator)
+    assert client.make_request("GET", "/api/v3/ticker/price", {"symbol": "NOPEUSDT"}) is None
+    assert "Invalid symbol." in capsys.readouterr().out
+    assert client.make_request("GET", "/api/v3/unknown") is None
@@ -0,0 +1,95 @@
+import multiprocessing
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.model.panel import MarketPanel
+from backtester.model.shared_data import SharedMarketData
+
+
+def frames_of(rows: int) -> dict:
+    rng = np.random.default_rng(5)
+    frames = dict()
+    for symbol, start in [("AAAUSDT", "2023-01-01"), ("BBBUSDT", "2023-01-03")]:
+        index = pd.date_range(start, periods=rows, freq="h", name="Date")
+        close = 100 + np.cumsum(rng.normal(0, 1, rows))
+        frames[symbol] = pd.DataFrame({"Close": close, "Volume": rng.integers(1, 10, rows),
+                                       "Complete": np.arange(rows) < rows - 1}, index=index)
+    return frames
+
+
+def close_sums(shared: SharedMarketData, results):
+    """ Sweep worker of another process: reads the attached frames and reports whether it could write them """
+    frames = shared.frames()
+    results.put({symbol: float(frame["Close"].sum()) for symbol, frame in frames.items()})
+    results.put(any(frame["Close"].to_numpy().flags.writeable for frame in frames.values()))
+    shared.release()
+
+
+def test_published_frames_and_panel_equal_the_originals_and_are_read_only():
+    frames = frames_of(50)
+    panel = MarketPanel.from_frames(frames)
+
+    with SharedMarketData.publish(frames, panel) as shared:
+        for symbol, frame in shared.frames().items():
+            # The frequency of the index isn't published, prepared data has none after dropna
+            pd.testing.assert_frame_equal(frame, frames[symbol], check_freq=False)
+            with pytest.raises(ValueError):
+                frame["Close"].to_numpy()[0] = 0.0
+
+        shared_panel = shared.panel()
+        pd.testing.assert_index_equal(shared_panel.index, panel.index)
+        assert shared_panel.symbols == panel.symbols
+        np.testing.assert_array_equal(shared_panel.mask, panel.mask)
+        np.testing.assert_array_equal(shared_panel.fields["Close"], panel.fields["Close"])
+        for symbol, rows in panel.rows.items():
+            np.testing.assert_array_equal(shared_panel.rows[symbol], rows)
+
+
+def test_a_pickled_handle_attaches_to_the_same_memory_without_the_data():
+    frames = frames_of(10000)
+    with SharedMarketData.publish(frames) as shared:
+        handle = pickle.dumps(shared)
+        # The block name and the layout, not the arrays
+        assert len(handle) < 2000 < frames["AAAUSDT"]["Close"].nbytes
+
+        attached = pickle.loads(handle)
+        assert attached.name == shared.name and not attached.owner and attached.panel() is None
+        # Zero copy, a value written into the block is seen by the attached frames
+        spec = shared.layout["frames"]["BBBUSDT"]["columns"]["Close"]
+        np.ndarray(spec[1], dtype=spec[2], buffer=shared.memory.buf, offset=spec[0])[3] = -1.0
+        assert attached.frames()["BBBUSDT"]["Close"].iloc[3] == -1.0
+        attached.release()
+
+
+def test_another_process_reads_the_published_frames():
+    frames = frames_of(1000)
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+
+    with SharedMarketData.publish(frames) as shared:
+        process = context.Process(target=close_sums, args=(shared, results))
+        process.start()
+        sums, writeable = results.get(timeout=60), results.get(timeout=60)
+        process.join(60)
+
+    assert process.exitcode == 0
+    assert sums == pytest.approx({symbol: frame["Close"].sum() for symbol, frame in frames.items()})
+    assert not writeable
+
+
+def test_a_released_block_can_not_be_attached_anymore():
+    shared = SharedMarketData.publish(frames_of(10))
+    handle = pickle.dumps(shared)
+    shared.release()
+    with pytest.raises(FileNotFoundError):
+        pickle.loads(handle)
+
+
+def test_object_columns_can_not_be_shared():
+    frames = frames_of(10)
+    frames["AAAUSDT"]["Note"] = "text"
+    with pytest.raises(ValueError, match="numeric and bool"):
+        SharedMarketData.publish(frames)
@@ -0,0 +1,153 @@
+import io
+import os
+import struct
+
+import pytest
+
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from bots.grid.spot_grid import StaticGridBot
+from simulator.server import WebSocketConnection
+from test_kline_stream_bot import wait_for
+
+
+def order(exchange, side, price, quantity=0.5, type="LIMIT"):
+    return exchange.new_order({"symbol": "BTCUSDT", "side": side, "type": type, "timeInForce": "GTC",
+                               "price": str(price), "quantity": str(quantity)})
+
+
+# MATCHING ENGINE ------------------------------------------------------------------------------------------------------
+
+def test_a_resting_limit_order_locks_its_funds_and_fills_when_a_candle_trades_through(simulator):
+    exchange = simulator.exchange
+    events = []
+    exchange.listeners.append(lambda stream, payload: events.append(payload) if stream == "user" else None)
+    low = float(exchange.candles["BTCUSDT"]["low"][1])
+    price = round(low + 0.01, 2)
+    assert price < exchange.price("BTCUSDT")
+
+    placed = order(exchange, "BUY", price)
+    assert placed["status"] == "NEW" and placed["orderId"] in exchange.open_orders["BTCUSDT"]
+    assert exchange.balances["USDT"] == pytest.approx({"free": 10000 - price * 0.5, "locked": price * 0.5})
+
+    exchange.step()
+
+    filled = exchange.order_status("BTCUSDT", placed["orderId"])
+    assert filled["status"] == "FILLED"
+    assert float(filled["cummulativeQuoteQty"]) == pytest.approx(price * 0.5)
+    assert exchange.balances["USDT"] == pytest.approx({"free": 10000 - price * 0.5, "locked": 0.0})
+    assert exchange.balances["BTC"]["free"] == pytest.approx(0.5 * (1 - exchange.fee))
+    assert [(event["e"], event.get("x")) for event in events] == [("executionReport", "NEW"),
+                                                                   ("outboundAccountPosition", None),
+                                                                   ("executionReport", "TRADE"),
+                                                                   ("outboundAccountPosition", None)]
+
+
+def test_a_marketable_limit_order_fills_at_the_market_price(simulator):
+    exchange = simulator.exchange
+    market = exchange.price("BTCUSDT")
+
+    filled = order(exchange, "BUY", round(market + 5, 2))
+
+    assert filled["status"] == "FILLED"
+    assert float(filled["cummulativeQuoteQty"]) == pytest.approx(market * 0.5)
+    # Locked at the limit price, the difference is released
+    assert exchange.balances["USDT"] == pytest.approx({"free": 10000 - market * 0.5, "locked": 0.0})
+
+
+def test_cancel_releases_the_funds_and_rejected_orders_change_nothing(simulator):
+    exchange = simulator.exchange
+    resting = order(exchange, "BUY", 50.0)
+    exchange.cancel_order("BTCUSDT", resting["orderId"])
+    assert exchange.balances["USDT"] == pytest.approx({"free": 10000.0, "locked": 0.0})
+    with pytest.raises(ValueError):
+        exchange.cancel_order("BTCUSDT", resting["orderId"])
+
+    with pytest.raises(ValueError, match="NOTIONAL"):
+        order(exchange, "BUY", 50.0, quantity=0.01)
+    with pytest.raises(ValueError, match="insufficient balance"):
+        order(exchange, "BUY", 50.0, quantity=1000)
+    with pytest.raises(ValueError, match="insufficient balance"):
+        order(exchange, "SELL", 150.0)
+    assert exchange.balances["USDT"] == pytest.approx({"free": 10000.0, "locked": 0.0})
+    assert exchange.open_orders["BTCUSDT"] == {}
+
+
+# WEBSOCKET FRAMING ----------------------------------------------------------------------------------------------------
+
+def masked_frame(opcode: int, payload: bytes, mask=b"\x01\x02\x03\x04") -> bytes:
+    """ Client frame (RFC 6455), the payload is always masked """
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, 0x80 | length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length)
+    return header + mask + bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+@pytest.mark.parametrize("length, header", [(125, b"\x81\x7d"), (126, b"\x81\x7e\x00\x7e"),
+                                            (65536, b"\x81\x7f" + struct.pack("!Q", 65536))])
+def test_sent_frames_use_the_length_encoding_of_their_size(length, header):
+    out = io.BytesIO()
+    WebSocketConnection(io.BytesIO(), out).send_text("x" * length)
+    assert out.getvalue() == header + b"x" * length
+
+
+@pytest.mark.parametrize("length", [5, 126, 70000])
+def test_masked_client_frames_are_decoded(length):
+    payload = os.urandom(length)
+    frames = masked_frame(0x1, payload) + masked_frame(0x9, b"ping")
+    connection = WebSocketConnection(io.BytesIO(frames), io.BytesIO())
+    assert connection.receive() == (0x1, payload)
+    assert connection.receive() == (0x9, b"ping")
+    assert connection.receive() is None
+
+
+def test_writes_after_the_socket_failed_are_dropped():
+    out = io.BytesIO()
+    connection = WebSocketConnection(io.BytesIO(), out)
+    out.close()
+    connection.send_text("lost")
+    assert connection.closed
+    connection.send_text("dropped")
+
+
+# ORDER BOOK -----------------------------------------------------------------------------------------------------------
+
+def test_a_local_order_book_syncs_from_the_depth_route_and_stream(simulator):
+    client = BinanceClient("key", "secret", base_url=simulator.base_url, wss_base_url=simulator.wss_base_url,
+                           kline_cache_dir=None, tick_store_dir=None, rate_limiter=RateLimiter())
+    snapshot = client.get_order_book_snapshot("BTCUSDT", limit=5)
+    assert len(snapshot["bids"]) == 5 and len(snapshot["asks"]) == 5
+
+    book = client.get_order_book_manager().track("BTCUSDT")
+    try:
+        assert wait_for(lambda: book.synced)
+        assert wait_for(lambda: any("btcusdt@depth@100ms" in connection.streams
+                                    for connection in list(simulator.connections)))
+        for _ in range(3):
+            simulator.exchange.step()
+        update_id = simulator.exchange.depth_ids["BTCUSDT"]
+        assert wait_for(lambda: book.last_update_id == update_id)
+
+        ticker = simulator.exchange.book_ticker("BTCUSDT")
+        assert book.best_bid()[0] == pytest.approx(float(ticker["bidPrice"]))
+        assert book.best_ask()[0] == pytest.approx(float(ticker["askPrice"]))
+        assert len(book.bid_keys) == len(book.ask_keys) == simulator.exchange.DEPTH_LEVELS
+    finally:
+        client.stream_manager.stop()
+
+
+def test_grid_bot_reads_prices_from_the_order_book(simulator, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    price = simulator.exchange.price("BTCUSDT")
+    bot = StaticGridBot("key", "secret", False, "BTC", "USDT", units=0.1, upper_price=round(price + 10, 2),
+                        lower_price=round(price - 10, 2), num_grids=8, use_user_data_stream=False,
+                        use_order_book=True, base_url=simulator.base_url, wss_base_url=simulator.wss_base_url)
+    try:
+        assert wait_for(lambda: bot.order_book.synced)
+        assert bot.order_book.mid_price() == pytest.approx(price)
+    finally:
+        bot.client.stream_manager.stop()
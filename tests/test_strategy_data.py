@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from backtester.ta_indicators.ema import EMA
+from strategies.ta_indicators.frame_utils import drop_incomplete_rows
+
+PREPARED = ["Open", "High", "Low", "Close", "Volume", "returns"]
+
+
+def assert_shared_and_read_only(frames: dict, data: dict):
+    for symbol, frame in frames.items():
+        for column in PREPARED:
+            assert np.shares_memory(frame[column].to_numpy(), data[symbol][column].to_numpy()), (symbol, column)
+        with pytest.raises(ValueError):
+            frame["Close"].to_numpy()[0] = 0.0
+
+
+def test_strategy_frames_share_the_prepared_columns_read_only(backtester):
+    frames = backtester.strategy_data()
+    assert_shared_and_read_only(frames, backtester.data)
+
+    # A new column of the strategy frame doesn't reach the prepared data
+    frames["AAAUSDT"]["position"] = 1.0
+    assert "position" not in backtester.data["AAAUSDT"]
+
+
+def test_the_columns_stay_shared_through_a_strategy_and_its_exit_rule(indicator):
+    ema = indicator(EMA, "double_ema")
+    ema.double_ema(5, 20)
+    assert set(ema.ema_data) == set(ema.backtester.data)
+    assert "position" in ema.ema_data["AAAUSDT"] and "ATR" in ema.ema_data["AAAUSDT"]
+    assert_shared_and_read_only(ema.ema_data, ema.backtester.data)
+
+
+def test_drop_incomplete_rows_only_copies_when_it_drops(backtester):
+    frame = backtester.strategy_data()["AAAUSDT"]
+    frame["EMA"] = 1.0
+    assert drop_incomplete_rows(frame) is frame
+    assert np.shares_memory(frame["Close"].to_numpy(), backtester.data["AAAUSDT"]["Close"].to_numpy())
+
+    frame["EMA"] = np.where(np.arange(len(frame)) < 3, np.nan, 1.0)
+    drop_incomplete_rows(frame)
+    assert len(frame) == len(backtester.data["AAAUSDT"]) - 3
+    pd.testing.assert_series_equal(frame["Close"], backtester.data["AAAUSDT"]["Close"].iloc[3:])
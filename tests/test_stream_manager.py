@@ -0,0 +1,115 @@
+import json
+import threading
+
+from connectors.binanceConnect import BinanceClient
+from connectors.dispatcher import MessageDispatcher
+from connectors.stream_manager import StreamManager
+from test_kline_stream_bot import wait_for
+
+
+def frame(stream, data) -> str:
+    return json.dumps({"stream": stream, "data": data})
+
+
+def depth(first_id) -> dict:
+    return {"e": "depthUpdate", "s": "BTCUSDT", "U": first_id, "u": first_id, "b": [], "a": []}
+
+
+def book_ticker(bid) -> dict:
+    return {"u": 1, "s": "BTCUSDT", "b": str(bid), "B": "1.0", "a": str(bid + 1), "A": "1.0"}
+
+
+def test_callbacks_run_on_the_dispatcher_thread():
+    manager = StreamManager("ws://127.0.0.1:9/stream")
+    release, called = threading.Event(), threading.Event()
+    threads = []
+
+    def slow_callback(data):
+        threads.append(threading.current_thread())
+        called.set()
+        release.wait(5)
+
+    manager.subscribe("btcusdt@depth@100ms", slow_callback)
+    manager.dispatcher.start()
+    # Returns while the callback is still blocked
+    manager.on_message(None, frame("btcusdt@depth@100ms", depth(1)))
+    manager.on_message(None, frame("btcusdt@depth@100ms", depth(2)))
+    assert called.wait(5)
+    assert threads == [manager.dispatcher.threads[0]]
+
+    release.set()
+    manager.dispatcher.stop()
+    assert manager.dispatcher.stats()["processed"] == 2
+
+
+def test_only_kline_and_book_ticker_frames_are_conflated():
+    manager = StreamManager("ws://127.0.0.1:9/stream")
+    received = []
+    for stream in ["btcusdt@depth@100ms", "btcusdt@bookTicker", "btcusdt@kline_1m", "btcusdt@kline_5m"]:
+        manager.subscribe(stream, lambda data, stream=stream: received.append((stream, data)))
+
+    # Queued without a worker, then processed at once
+    for i in range(1, 4):
+        manager.on_message(None, frame("btcusdt@depth@100ms", depth(i)))
+        manager.on_message(None, frame("btcusdt@bookTicker", book_ticker(100 + i)))
+        for interval in ["1m", "5m"]:
+            kline = {"e": "kline", "s": "BTCUSDT", "k": {"t": 0, "c": str(i), "x": False}}
+            manager.on_message(None, frame("btcusdt@kline_" + interval, kline))
+    manager.dispatcher.start()
+    manager.dispatcher.stop()
+
+    assert [data["U"] for stream, data in received if stream == "btcusdt@depth@100ms"] == [1, 2, 3]
+    assert [data["b"] for stream, data in received if stream == "btcusdt@bookTicker"] == ["103"]
+    assert [data["k"]["c"] for stream, data in received if stream == "btcusdt@kline_1m"] == ["3"]
+    assert [data["k"]["c"] for stream, data in received if stream == "btcusdt@kline_5m"] == ["3"]
+
+
+def test_handler_can_stop_its_dispatcher_and_drop_the_queue():
+    processed = []
+
+    def handler(ws, msg):
+        processed.append(msg)
+        dispatcher.stop(drain=False)
+
+    dispatcher = MessageDispatcher(handler)
+    for i in range(3):
+        dispatcher.on_message(None, str(i))
+    dispatcher.start()
+    dispatcher.threads[0].join(5)
+
+    assert not dispatcher.threads[0].is_alive()
+    assert processed == ["0"]
+    assert dispatcher.stats()["dropped"] == 2
+
+
+def open_connections(simulator) -> list:
+    return [connection for connection in list(simulator.connections) if not connection.closed]
+
+
+def test_subscriptions_share_one_combined_stream_connection(simulator):
+    client = BinanceClient("key", "secret", base_url=simulator.base_url, wss_base_url=simulator.wss_base_url,
+                           kline_cache_dir=None, tick_store_dir=None)
+    manager = client.get_stream_manager()
+    klines, tickers = [], []
+    manager.kline("BTCUSDT", "1m", klines.append)
+    manager.book_ticker("BTCUSDT", tickers.append)
+    try:
+        assert wait_for(lambda: [connection.streams for connection in open_connections(simulator)] ==
+                        [{"btcusdt@kline_1m", "btcusdt@bookTicker"}])
+        simulator.exchange.step()
+        assert wait_for(lambda: klines and tickers)
+        assert klines[0]["k"]["t"] == tickers[0]["u"]
+
+        manager.unsubscribe("btcusdt@bookTicker", tickers.append)
+        assert wait_for(lambda: open_connections(simulator)[0].streams == {"btcusdt@kline_1m"})
+        simulator.exchange.step()
+        assert wait_for(lambda: len(klines) == 2)
+        assert len(tickers) == 1
+
+        # A new connection subscribes the remaining streams again
+        previous = open_connections(simulator)[0]
+        manager.runner.reconnect()
+        assert wait_for(lambda: [connection.streams for connection in open_connections(simulator)
+                                 if connection is not previous] == [{"btcusdt@kline_1m"}])
+    finally:
+        manager.stop()
@@ -0,0 +1,90 @@
+import pytest
+
+from connectors import stream_runner
+from connectors.binanceConnect import BinanceClient
+from connectors.stream_runner import StreamRunner
+from test_kline_stream_bot import wait_for
+
+
+def client_of(simulator) -> BinanceClient:
+    return BinanceClient("key", "secret", base_url=simulator.base_url, wss_base_url=simulator.wss_base_url,
+                         kline_cache_dir=None, tick_store_dir=None)
+
+
+def test_reconnect_delays_double_up_to_the_max_with_half_of_them_random(monkeypatch):
+    runner = StreamRunner("ws://127.0.0.1:9/ws", print, backoff=1.0, max_backoff=8.0)
+    delays = []
+    for failures in range(6):
+        runner.failures = failures
+        delays.append(runner.reconnect_delay())
+    assert all(min(8, 2 ** failures) / 2 <= delay <= min(8, 2 ** failures) for failures, delay in enumerate(delays))
+
+    monkeypatch.setattr(stream_runner.random, "uniform", lambda low, high: high)
+    runner.failures = 2
+    assert runner.reconnect_delay() == 4.0
+    runner.failures = 10
+    assert runner.reconnect_delay() == 8.0
+
+
+def test_unreachable_urls_are_retried_with_backoff():
+    urls = []
+
+    def url():
+        urls.append(len(urls))
+        # No url yet, then a closed port
+        return None if len(urls) < 3 else "ws://127.0.0.1:9/ws"
+
+    runner = StreamRunner(url, print, backoff=0.01, max_backoff=0.02).start()
+    try:
+        assert wait_for(lambda: len(urls) >= 5)
+        assert runner.failures >= 4 and runner.connections == 0 and not runner.connected
+    finally:
+        runner.stop()
+    assert not runner.is_alive()
+
+
+def test_runners_connect_in_the_background_and_call_on_reconnect(simulator):
+    url = simulator.wss_base_url + "/ws"
+    reconnects, messages = [], []
+    runners = [StreamRunner(url, lambda ws, msg: messages.append(msg), on_reconnect=reconnects.append,
+                            backoff=0.01, name=f"Runner {i}") for i in range(2)]
+    for runner in runners:
+        assert runner.start() is runner
+    try:
+        assert wait_for(lambda: all(runner.connected for runner in runners))
+        assert reconnects == []
+
+        runners[0].reconnect()
+        assert wait_for(lambda: runners[0].connections == 2 and runners[0].connected)
+        assert reconnects == [runners[0]] and runners[0].failures == 0
+        assert runners[1].connections == 1
+
+        runners[1].send('{"method": "LIST_SUBSCRIPTIONS", "id": 7}')
+        assert wait_for(lambda: messages == ['{"result": [], "id": 7}'])
+    finally:
+        for runner in runners:
+            runner.stop()
+    for runner in runners:
+        runner.join(timeout=5)
+        assert not runner.is_alive() and not runner.connected
+
+
+def test_a_runner_stopped_from_its_callback_is_joined(simulator):
+    runner = StreamRunner(simulator.wss_base_url + "/ws", print, on_open=lambda ws: runner.close())
+    runner.start().join(timeout=5)
+    assert not runner.is_alive() and runner.connections == 1
+
+
+def test_kline_streams_of_several_clients_run_without_blocking_the_caller(simulator):
+    clients = [client_of(simulator) for _ in range(2)]
+    runners = [client.get_symbol_kline_stream("BTCUSDT", "1m") for client in clients]
+    try:
+        assert wait_for(lambda: sum("btcusdt@kline_1m" in connection.streams
+                                    for connection in list(simulator.connections)) == 2)
+        simulator.exchange.step()
+        assert wait_for(lambda: all("BTCUSDT" in client.klines for client in clients))
+        close = float(simulator.exchange.candles["BTCUSDT"]["close"][simulator.exchange.index("BTCUSDT")])
+        assert [client.klines["BTCUSDT"]["close"] for client in clients] == [pytest.approx(close)] * 2
+    finally:
+        for runner in runners:
+            runner.stop()
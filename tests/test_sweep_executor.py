@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from backtester.model.executor import SweepExecutor
+from backtester.ta_indicators.ema import EMA
+from backtester.ta_indicators.macd import MACD
+
+
+def assert_same_frames(result, expected):
+    assert list(result.columns) == list(expected.columns)
+    assert result["Asset"].tolist() == expected["Asset"].tolist()
+    parameters = list(expected.columns[1:-2])
+    assert np.array_equal(result[parameters].to_numpy(), expected[parameters].to_numpy())
+    assert np.allclose(result[["creturns", "cstrategy"]].to_numpy(), expected[["creturns", "cstrategy"]].to_numpy(),
+                       rtol=1e-12)
+
+
+@pytest.mark.parametrize("cls, strategy, ranges", [
+    (EMA, "double_ema", {"EMA_S_range": range(5, 12, 3), "EMA_L_range": range(20, 40, 9)}),
+    (MACD, "macd", {"EMA_S_range": range(5, 12, 3), "EMA_M_range": range(20, 30, 9),
+                    "EMA_signal_range": range(5, 10, 4)}),
+])
+def test_workers_equal_the_loop(indicator, cls, strategy, ranges):
+    loop = indicator(cls, strategy)
+    loop.all_combinantion(**ranges)
+    pool = indicator(cls, strategy)
+    pool.all_combinantion(workers=2, **ranges)
+
+    assert_same_frames(pool.performance_data, loop.performance_data)
+
+
+def test_workers_pass_the_stop_loss_options(indicator):
+    ranges = {"EMA_S_range": range(5, 9, 3), "EMA_L_range": range(20, 30, 9)}
+    loop = indicator(EMA, "double_ema")
+    loop.all_combinantion(trailing_stop_loss=True, **ranges)
+    pool = indicator(EMA, "double_ema")
+    pool.all_combinantion(trailing_stop_loss=True, workers=2, **ranges)
+
+    assert_same_frames(pool.performance_data, loop.performance_data)
+
+
+def test_chunk_order_and_constants_are_kept(indicator):
+    combinations = [(ema_s, ema_l) for ema_s in range(5, 12, 2) for ema_l in range(20, 30, 4)]
+    executor = SweepExecutor(indicator(EMA, "double_ema"), "double_ema", workers=2, chunk_size=3)
+    frame = executor.run(combinations, ["EMA_S", "EMA_L"], constants={"ATR": 14}, logs=False)
+
+    assert list(frame.columns) == ["Asset", "EMA_S", "EMA_L", "ATR", "creturns", "cstrategy"]
+    assert list(zip(frame["EMA_S"], frame["EMA_L"]))[::2] == combinations
+    assert (frame["ATR"] == 14).all()
+    assert executor.failures == []
+
+
+def test_failed_combinations_are_reported(indicator):
+    executor = SweepExecutor(indicator(EMA, "double_ema"), "double_ema", workers=2)
+    frame = executor.run([(5, 20), (-1, 20)], ["EMA_S", "EMA_L"], logs=False)
+
+    assert list(zip(frame["EMA_S"], frame["EMA_L"])) == [(5, 20), (5, 20)]
+    assert [combination for combination, _ in executor.failures] == [(-1, 20)]
+
+
+def test_shared_data_is_released(indicator):
+    ema = indicator(EMA, "double_ema")
+    SweepExecutor(ema, "double_ema", workers=2).run([(5, 20)], ["EMA_S", "EMA_L"], logs=False)
+    assert ema.backtester.shared_data is None
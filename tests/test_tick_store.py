@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+from storage.tick_store import TickStore, decode_agg_trades
+
+
+def trades(first_id, count, start=1000) -> dict:
+    return decode_agg_trades([{"a": first_id + i, "T": start + (first_id + i) * 10, "p": "100.5", "q": "0.1",
+                               "m": i % 2 == 0} for i in range(count)])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TickStore(str(tmp_path))
+
+
+def test_append_and_read(store):
+    assert store.append("BTCUSDT", trades(1, 5)) == 5
+
+    columns = store.read("BTCUSDT")
+    assert list(columns["agg_id"]) == [1, 2, 3, 4, 5]
+    assert list(columns["maker"]) == [True, False, True, False, True]
+    assert store.meta("BTCUSDT") == {"rows": 5, "first_id": 1, "last_id": 5, "start": 1010, "end": 1050}
+
+
+def test_read_time_range(store):
+    store.append("BTCUSDT", trades(1, 10))
+    assert list(store.read("BTCUSDT", 1030, 1050)["agg_id"]) == [3, 4, 5]
+
+
+def test_append_skips_stored_and_duplicated_trades(store):
+    store.append("BTCUSDT", trades(1, 5))
+    columns = trades(3, 6)
+    columns = {column: np.concatenate([values, values[-1:]]) for column, values in columns.items()}
+
+    assert store.append("BTCUSDT", columns) == 3
+    assert list(store.read("BTCUSDT")["agg_id"]) == list(range(1, 9))
+    assert store.append("BTCUSDT", trades(1, 8)) == 0
+
+
+def test_append_rejects_a_gap_after_the_stored_trades(store):
+    store.append("BTCUSDT", trades(1, 5))
+    with pytest.raises(ValueError):
+        store.append("BTCUSDT", trades(7, 3))
+    assert store.meta("BTCUSDT")["last_id"] == 5
+
+
+def test_append_rejects_gaps_inside_the_trades(store):
+    columns = trades(1, 5)
+    columns = {column: np.delete(values, 2) for column, values in columns.items()}
+    with pytest.raises(ValueError):
+        store.append("BTCUSDT", columns)
+    assert store.meta("BTCUSDT") is None
+
+
+def test_interrupted_append_is_overwritten(store):
+    store.append("BTCUSDT", trades(1, 3))
+    # Rows written after the last committed meta.json
+    with open(os.path.join(store.path("BTCUSDT"), "agg_id.bin"), "ab") as f:
+        f.write(np.array([99, 100], dtype=np.int64).tobytes())
+
+    assert list(store.read("BTCUSDT")["agg_id"]) == [1, 2, 3]
+    store.append("BTCUSDT", trades(4, 2))
+    assert list(store.read("BTCUSDT")["agg_id"]) == [1, 2, 3, 4, 5]
+
+
+def test_chunks(store):
+    store.append("BTCUSDT", trades(1, 10))
+    assert [len(chunk["agg_id"]) for chunk in store.chunks("BTCUSDT", rows=4)] == [4, 4, 2]
@@ -0,0 +1,127 @@
+import json
+
+from connectors.ticker_service import TickerService
+
+
+class StubStreamManager:
+    def __init__(self):
+        self.connected = True
+        self.callbacks = dict()
+
+    def book_ticker(self, symbol, callback):
+        self.callbacks[symbol] = callback
+
+
+class StubClient:
+    """ make_request of /api/v3/ticker/price answered from a dict, an unknown symbol fails the whole request """
+
+    base_url = "https://stub"
+
+    def __init__(self, prices: dict):
+        self.prices = prices
+        self.requested = []
+        self.stream_manager = StubStreamManager()
+
+    def make_request(self, method, endpoint, data=None, raw=False, signed=False):
+        symbols = json.loads(data["symbols"]) if "symbols" in data else [data["symbol"]]
+        self.requested.append(symbols)
+        if any(symbol not in self.prices for symbol in symbols):
+            return None
+        tickers = [{"symbol": symbol, "price": str(self.prices[symbol])} for symbol in symbols]
+        return tickers if "symbols" in data else tickers[0]
+
+    def get_stream_manager(self):
+        return self.stream_manager
+
+
+def service_of(prices: dict, **options):
+    """ Service of a stub client on a clock the test moves with clock["now"] (ms) """
+    clock = {"now": 0}
+    service = TickerService(StubClient(prices), **options)
+    service.now = lambda: clock["now"]
+    return service, clock
+
+
+def test_stale_symbols_are_requested_together_and_cached_for_the_ttl():
+    service, clock = service_of({"BTCUSDT": 100, "ETHUSDT": 10})
+    assert service.get_prices(["btcusdt", "ETHUSDT"]) == {"BTCUSDT": 100.0, "ETHUSDT": 10.0}
+    assert service.client.requested == [["BTCUSDT", "ETHUSDT"]]
+
+    clock["now"] = 499
+    assert service.price("BTCUSDT") == 100.0
+    assert len(service.client.requested) == 1
+
+    # Both are stale, the tracked ETHUSDT is refreshed with the symbol asked for
+    clock["now"] = 500
+    service.client.prices["BTCUSDT"] = 101
+    assert service.price("BTCUSDT") == 101.0
+    assert service.client.requested[-1] == ["BTCUSDT", "ETHUSDT"]
+
+
+def test_an_unknown_symbol_only_fails_the_calls_asking_for_it():
+    service, clock = service_of({"BTCUSDT": 100})
+    assert service.price("BTCUSDT") == 100.0
+
+    clock["now"] = 1000
+    assert service.get_prices(["BTCUSDT", "NOPEUSDT"]) == {"BTCUSDT": 100.0, "NOPEUSDT": None}
+    assert "NOPEUSDT" not in service.tracked
+
+    clock["now"] = 2000
+    assert service.price("BTCUSDT") == 100.0
+    assert service.client.requested[-1] == ["BTCUSDT"]
+
+    # Asking for it again batches it again
+    clock["now"] = 3000
+    assert service.get_prices(["BTCUSDT", "NOPEUSDT"])["NOPEUSDT"] is None
+    assert service.client.requested[-1] == ["BTCUSDT", "NOPEUSDT"]
+
+
+def test_symbols_not_read_for_expire_ms_leave_the_refreshes():
+    service, clock = service_of({"BTCUSDT": 100, "ETHUSDT": 10}, expire_ms=10000)
+    service.get_prices(["BTCUSDT", "ETHUSDT"])
+
+    clock["now"] = 6000
+    service.price("BTCUSDT")
+    assert service.client.requested[-1] == ["BTCUSDT", "ETHUSDT"]
+
+    clock["now"] = 12000
+    service.price("BTCUSDT")
+    assert service.client.requested[-1] == ["BTCUSDT"]
+    assert service.tracked == {"BTCUSDT"}
+    assert "ETHUSDT" not in service.prices
+
+    # Reading it again tracks it again
+    clock["now"] = 13000
+    assert service.price("ETHUSDT") == 10.0
+    assert service.tracked == {"BTCUSDT", "ETHUSDT"}
+
+
+def test_streamed_prices_are_served_while_the_stream_updates_them():
+    service, clock = service_of({"BTCUSDT": 100}, stream_ttl_ms=5000)
+    service.stream(["btcusdt"])
+    callback = service.client.stream_manager.callbacks["BTCUSDT"]
+    callback({"s": "BTCUSDT", "b": "99", "a": "101.5"})
+
+    clock["now"] = 4999
+    assert service.price("BTCUSDT") == 100.25
+    assert service.client.requested == []
+
+    # A stalled stream still reporting connected falls back to REST
+    clock["now"] = 5000
+    assert service.price("BTCUSDT") == 100.0
+    assert service.client.requested == [["BTCUSDT"]]
+
+    callback({"s": "BTCUSDT", "b": "102", "a": "102"})
+    assert service.price("BTCUSDT") == 102.0
+
+    service.client.stream_manager.connected = False
+    assert service.price("BTCUSDT") == 100.0
+
+
+def test_clients_of_a_host_share_one_service():
+    first, second = StubClient({}), StubClient({})
+    try:
+        assert TickerService.shared(first) is TickerService.shared(second)
+        assert TickerService.shared(first, ttl_ms=100) is not TickerService.shared(first)
+    finally:
+        TickerService.shared_services.clear()
@@ -0,0 +1,108 @@
+from connectors.binanceConnect import BinanceClient
+from connectors.rate_limiter import RateLimiter
+from connectors.user_data_stream import UserDataStream
+from bots.grid.spot_grid import StaticGridBot
+from test_async_client import record_requests
+from test_kline_stream_bot import wait_for
+
+
+def client_of(simulator) -> BinanceClient:
+    return BinanceClient("key", "secret", base_url=simulator.base_url, wss_base_url=simulator.wss_base_url,
+                         kline_cache_dir=None, tick_store_dir=None, rate_limiter=RateLimiter())
+
+
+def resting_buy_price(simulator) -> float:
+    """ Below the market, filled by the next candle """
+    return round(float(simulator.exchange.candles["BTCUSDT"]["low"][1]) + 0.01, 2)
+
+
+def test_order_and_account_events_are_published_to_subscribers(simulator):
+    client = client_of(simulator)
+    stream = UserDataStream(client)
+    reports, positions = [], []
+    stream.execution_reports(reports.append)
+    stream.account_positions(positions.append)
+    stream.start()
+    try:
+        assert wait_for(lambda: stream.connected)
+        assert stream.listen_key in simulator.listen_keys
+
+        order = client.new_order("BTCUSDT", "BUY", price=resting_buy_price(simulator), amount=0.5)
+        simulator.exchange.step()
+
+        assert wait_for(lambda: [report["X"] for report in reports] == ["NEW", "FILLED"])
+        assert all(report["i"] == order["orderId"] for report in reports)
+        assert wait_for(lambda: len(positions) == 2)
+        assert {balance["a"] for balance in positions[-1]["B"]} >= {"BTC", "USDT"}
+    finally:
+        stream.stop()
+    assert not simulator.listen_keys
+
+
+def test_an_expired_listen_key_reconnects_with_a_new_key(simulator):
+    stream = UserDataStream(client_of(simulator))
+    reports = []
+    stream.execution_reports(reports.append)
+    stream.start()
+    try:
+        assert wait_for(lambda: stream.connected)
+        expired = stream.listen_key
+
+        simulator.publish("user", {"e": "listenKeyExpired", "E": 0, "listenKey": expired})
+
+        assert wait_for(lambda: stream.connections == 2 and stream.connected)
+        assert stream.listen_key not in (None, expired)
+        client_of(simulator).new_order("BTCUSDT", "BUY", price=resting_buy_price(simulator), amount=0.5)
+        assert wait_for(lambda: len(reports) == 1)
+    finally:
+        stream.stop()
+
+
+def test_a_failed_keepalive_reconnects(simulator):
+    keepalives = record_requests(simulator, "PUT", "/api/v3/userDataStream")
+    stream = UserDataStream(client_of(simulator), keepalive_interval=0)
+    stream.start()
+    try:
+        assert wait_for(lambda: stream.connected and len(keepalives) >= 1)
+        assert stream.connections == 1
+
+        # The exchange dropped the key
+        simulator.listen_keys.clear()
+
+        assert wait_for(lambda: stream.connections == 2 and stream.connected)
+        assert stream.listen_key in simulator.listen_keys
+    finally:
+        stream.stop()
+
+
+def test_grid_fills_come_from_the_stream_instead_of_polling(simulator, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    price = simulator.exchange.price("BTCUSDT")
+    bot = StaticGridBot("key", "secret", False, "BTC", "USDT", units=0.1, upper_price=round(price + 10, 2),
+                        lower_price=round(price - 10, 2), num_grids=8, use_user_data_stream=True,
+                        base_url=simulator.base_url, wss_base_url=simulator.wss_base_url)
+    try:
+        assert wait_for(lambda: bot.user_stream.connected)
+        # Polled once after the connection, events could have been missed before it
+        bot._update_poll_orders()
+        assert bot.poll_orders
+        bot._update_poll_orders()
+        assert not bot.poll_orders
+
+        polls = record_requests(simulator, "GET", "/api/v3/order")
+        buy_order = bot._market_limit_order(bot.symbol, "BUY", resting_buy_price(simulator), bot.quantity)
+        bot.buy_orders_list, bot.sell_orders_list = [buy_order], []
+        simulator.exchange.step()
+        assert wait_for(lambda: bot.order_updates.get(buy_order["orderId"], {}).get("status") == "FILLED")
+
+        bot.check_buy_orders()
+
+        assert bot.buy_orders_list == [] and len(bot.sell_orders_list) == 1
+        assert polls == []
+
+        # Disconnected, the orders are polled again
+        bot.user_stream.runner.stop()
+        bot._update_poll_orders()
+        assert bot.poll_orders
+    finally:
+        bot.user_stream.stop()
@@ -0,0 +1,97 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from connectors.binanceConnect import BinanceClient
+from storage import ws_journal
+from storage.ws_journal import JournalWriter, JournalReader
+from test_kline_stream_bot import wait_for
+
+
+def journal_files(directory) -> list:
+    return sorted(name for name in os.listdir(directory) if name.endswith(".jsonl.gz"))
+
+
+def test_frames_are_read_back_in_the_order_they_were_recorded(tmp_path):
+    writer = JournalWriter(str(tmp_path))
+    frames = [json.dumps({"i": i}) for i in range(100)] + [b'{"bytes": true}', '{"multi":\n"line"}']
+    for frame in frames:
+        writer.record(frame)
+    writer.close()
+
+    received = list(JournalReader(str(tmp_path)).frames())
+
+    assert writer.written == len(frames) and writer.dropped == 0
+    assert [frame for _, frame in received] == frames[:100] + ['{"bytes": true}', '{"multi": "line"}']
+    times = [time for time, _ in received]
+    assert times == sorted(times)
+
+
+@pytest.mark.parametrize("options", [{"max_bytes": 100}, {"max_seconds": 0}])
+def test_journals_rotate_by_size_and_age_and_read_as_one(tmp_path, options):
+    writer = JournalWriter(str(tmp_path), prefix="klines", **options)
+    frames = [json.dumps({"i": i, "padding": "x" * 40}) for i in range(10)]
+    for frame in frames:
+        writer.record(frame)
+    writer.close()
+
+    assert len(journal_files(tmp_path)) > 1
+    assert [frame for _, frame in JournalReader(str(tmp_path), prefix="klines").frames()] == frames
+    assert list(JournalReader(str(tmp_path), prefix="ws").frames()) == []
+
+
+def test_the_flushed_part_of_a_truncated_journal_is_read(tmp_path, capsys):
+    with gzip.open(tmp_path / "ws-1.jsonl.gz", "wb") as file:
+        file.write(b"1\tfirst\n2\tsecond\n")
+    data = (tmp_path / "ws-1.jsonl.gz").read_bytes()
+    # Without the gzip trailer, as left by a killed process
+    (tmp_path / "ws-1.jsonl.gz").write_bytes(data[:-8])
+
+    assert list(JournalReader(str(tmp_path)).frames()) == [(1, "first"), (2, "second")]
+    assert "is truncated" in capsys.readouterr().out
+
+
+def test_replay_keeps_the_spacing_of_the_frames_divided_by_the_speed(tmp_path, monkeypatch):
+    with gzip.open(tmp_path / "ws-1.jsonl.gz", "wb") as file:
+        file.write(b"0\ta\n2000000000\tb\n6000000000\tc\n")
+    reader = JournalReader(str(tmp_path))
+    clock, waits = [0.0], []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(ws_journal.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(ws_journal.time, "sleep", sleep)
+
+    replayed = []
+    reader.replay(replayed.append, speed=2.0)
+    assert replayed == ["a", "b", "c"]
+    assert waits == [1.0, 2.0]
+
+    waits.clear()
+    reader.replay(replayed.append, speed=None)
+    assert waits == []
+
+
+def test_the_stream_manager_records_the_raw_frames(simulator, tmp_path):
+    writer = JournalWriter(str(tmp_path))
+    client = BinanceClient("key", "secret", base_url=simulator.base_url, wss_base_url=simulator.wss_base_url,
+                           kline_cache_dir=None, tick_store_dir=None, recorder=writer)
+    manager = client.get_stream_manager()
+    klines = []
+    manager.kline("BTCUSDT", "1m", klines.append)
+    try:
+        assert wait_for(lambda: any("btcusdt@kline_1m" in connection.streams
+                                    for connection in list(simulator.connections)))
+        for candles in (1, 2):
+            simulator.exchange.step()
+            assert wait_for(lambda: len(klines) == candles)
+    finally:
+        manager.stop()
+    writer.close()
+
+    recorded = [json.loads(frame) for _, frame in JournalReader(str(tmp_path)).frames()]
+    assert [message["data"] for message in recorded if message.get("stream") == "btcusdt@kline_1m"] == klines
@@ -87,3 +87,25 @@ class TimeOperator:
         else:
             return int(extra_delay)
 
+    def interval_to_milliseconds(self, interval) -> int:
+        """
+        Convert interval to milliseconds (length of a single candle)
+        """
+        if interval == "1M":
+            return int(86400 * 30 * 1000)
+        return int(self.interval_to_seconds(interval, 1) * 1000)
+
+    def split_period(self, start, end, interval, candles) -> list:
+        """
+        Split [start, end] into consecutive, non-overlapping (start, end) windows of a given number of candles
+        """
+        window_length = self.interval_to_milliseconds(interval) * int(candles)
+        windows = []
+
+        current_start = int(start)
+        while current_start <= end:
+            current_end = min(current_start + window_length - 1, int(end))
+            windows.append((current_start, current_end))
+            current_start = current_end + 1
+
+        return windows